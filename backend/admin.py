@@ -0,0 +1,215 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import stat
+import sys
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# 单个管理请求的最大字节数，以及等待请求和回复的最长时间（秒）
+ADMIN_REQUEST_LIMIT = 64 * 1024
+ADMIN_TIMEOUT = 30
+
+# 一次回复最多附带的文件描述符数
+ADMIN_MAX_FDS = 16
+
+# 回复的第一个字节：是否在辅助数据中附带了文件描述符
+_PLAIN = b'J'
+_WITH_FDS = b'F'
+
+
+class Reply(NamedTuple):
+    """
+    管理操作的回复。
+
+    Attributes:
+        body (dict): 回复内容，序列化为一行JSON。
+        fds (tuple[int, ...]): 随回复一起传给请求方的文件描述符（如监听套接字）。
+        then (Callable): 回复处理完毕后调用，参数为回复是否已完整发出，
+            例如交接成功后开始排空连接、失败时恢复服务。
+    """
+    body: dict[str, Any]
+    fds: tuple[int, ...] = ()
+    then: Optional[Callable[[bool], None]] = None
+
+
+AdminOp = Callable[[dict[str, Any]], Awaitable[Reply]]
+
+
+async def _read_line(sock: socket.socket, limit: int) -> bytes:
+    loop = asyncio.get_running_loop()
+    data = b''
+    while b'\n' not in data:
+        chunk = await loop.sock_recv(sock, 4096)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > limit:
+            raise ValueError("请求过长")
+    return data.split(b'\n', 1)[0]
+
+
+async def _handle(sock: socket.socket, ops: dict[str, AdminOp]) -> None:
+    loop = asyncio.get_running_loop()
+    reply: Optional[Reply] = None
+    sent = False
+    try:
+        line = await asyncio.wait_for(_read_line(sock, ADMIN_REQUEST_LIMIT), ADMIN_TIMEOUT)
+        try:
+            request = json.loads(line)
+            op = ops[request['op']]
+        except (ValueError, KeyError, TypeError):
+            reply = Reply({'ok': False, 'error': f"无效的请求: {line[:200]!r}"})
+        else:
+            logger.info(f"收到管理请求: {request['op']}")
+            try:
+                reply = await op(request)
+            except Exception as e:
+                logger.error(f"管理操作 {request['op']} 出错: {e}")
+                reply = Reply({'ok': False, 'error': str(e)})
+        body = json.dumps(reply.body, ensure_ascii=False).encode('utf-8') + b'\n'
+        if reply.fds:
+            # 文件描述符随第一个字节发出，之后的回复内容照常写入
+            socket.send_fds(sock, [_WITH_FDS], list(reply.fds))
+        else:
+            await loop.sock_sendall(sock, _PLAIN)
+        await loop.sock_sendall(sock, body)
+        sent = True
+    except (asyncio.TimeoutError, ValueError, OSError) as e:
+        logger.warning(f"管理连接出错: {e}")
+    finally:
+        sock.close()
+        if reply is not None and reply.then is not None:
+            reply.then(sent)
+
+
+class AdminServer:
+    """
+    本机管理接口，监听Unix域套接字（文件权限 0600，只有同一用户可以连接）。
+
+    每个连接发送一行JSON请求 {"op": <操作名>, ...}，收到一个标记字节和一行JSON回复后关闭；
+    回复可以通过 SCM_RIGHTS 附带文件描述符，用于把监听套接字交给新进程。
+    """
+
+    def __init__(self, path: str, ops: dict[str, AdminOp]) -> None:
+        """
+        Args:
+            path (str): 套接字文件路径，已存在的套接字文件会被替换。
+            ops (dict): 操作名到处理函数的映射。
+        """
+        self.path = path
+        self.ops = ops
+        self._listener: Optional[socket.socket] = None
+        self._inode: Optional[int] = None
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        try:
+            if stat.S_ISSOCK(os.stat(self.path).st_mode):
+                os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.path)
+        os.chmod(self.path, 0o600)
+        self._inode = os.stat(self.path).st_ino
+        listener.listen()
+        listener.setblocking(False)
+        self._listener = listener
+        self._task = asyncio.create_task(self._accept_loop())
+        logger.info(f"管理接口已启动: {self.path}")
+
+    async def _accept_loop(self) -> None:
+        assert self._listener is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            conn, _ = await loop.sock_accept(self._listener)
+            conn.setblocking(False)
+            loop.create_task(_handle(conn, self.ops))
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+            # 接管本进程的新进程可能已在同一路径上重新监听，只删除自己创建的套接字文件
+            try:
+                if os.stat(self.path).st_ino == self._inode:
+                    os.unlink(self.path)
+            except OSError:
+                pass
+
+
+def request(
+    path: str, op: str, timeout: float = ADMIN_TIMEOUT, **args: Any
+) -> tuple[dict[str, Any], list[socket.socket]]:
+    """
+    向管理接口发送一个请求并等待回复（阻塞调用）。
+
+    Args:
+        path (str): 管理接口的套接字文件路径。
+        op (str): 操作名。
+        timeout (float): 连接和等待回复的最长时间（秒）。
+        **args: 操作的参数。
+
+    Returns:
+        tuple: 回复内容，以及回复附带的套接字（按回复中的顺序）。
+
+    Raises:
+        OSError: 无法连接管理接口或连接中断。
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps({'op': op, **args}).encode('utf-8') + b'\n')
+        marker, fds, _, _ = socket.recv_fds(sock, 1, ADMIN_MAX_FDS)
+        sockets = [socket.socket(fileno=fd) for fd in fds]
+        if marker not in (_PLAIN, _WITH_FDS):
+            for s in sockets:
+                s.close()
+            raise OSError("管理接口没有返回有效的回复")
+        chunks = []
+        while True:
+            chunk = sock.recv(1 << 16)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return json.loads(b''.join(chunks)), sockets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="EzInterview 后端管理工具")
+    parser.add_argument('socket', help="管理接口的套接字文件（后端的 --admin-socket）")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help="查看房间、面试者和连接数，以及是否在接纳新面试者")
+    snapshot = commands.add_parser('snapshot', help="导出所有房间的状态，配置了状态后端时同时保存")
+    snapshot.add_argument('--output', default=None, help="写入该文件，缺省时输出到标准输出")
+    commands.add_parser('pause', help="停止接纳新面试者，已有会话仍可凭令牌重连")
+    commands.add_parser('resume', help="恢复接纳新面试者")
+    drain = commands.add_parser('drain', help="停止接纳新面试者，分批通知所有连接重连后退出进程")
+    drain.add_argument('--spread', type=float, default=None, help="重连提示分散的时间（秒）")
+    args = parser.parse_args()
+
+    options = {}
+    if args.command == 'drain' and args.spread is not None:
+        options['spread'] = args.spread
+    body, _ = request(args.socket, args.command, **options)
+    text = json.dumps(body, ensure_ascii=False, indent=2)
+    if args.command == 'snapshot' and args.output is not None and body.get('ok'):
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if not body.get('ok'):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import time
+from http import HTTPStatus
+from typing import Callable, Optional
+
+from websockets.asyncio.server import ServerConnection
+from websockets.http11 import Request, Response
+
+from metrics import Counter, Gauge
+
+
+ADMISSION_REJECTED = Counter(
+    'ezinterview_admission_rejected_total', "握手阶段因过载被拒绝的连接数", ('role', 'reason')
+)
+
+
+class TokenBucket:
+    """
+    令牌桶：每秒补充 rate 个令牌，最多积累 burst 个，每次放行消耗一个。
+    """
+
+    __slots__ = ('rate', 'burst', 'tokens', 'last')
+
+    def __init__(self, rate: float, burst: float) -> None:
+        """
+        Args:
+            rate (float): 每秒补充的令牌数，为0时不限制。
+            burst (float): 令牌上限，即允许的突发数量。
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+
+    def take(self, now: Optional[float] = None) -> bool:
+        """
+        尝试取走一个令牌。
+
+        Returns:
+            bool: 是否放行。
+        """
+        if self.rate <= 0:
+            return True
+        if now is None:
+            now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class MessageLimiter:
+    """
+    单个连接的消息限流：先检查连接自己的令牌桶，再检查同类连接共享的全局令牌桶。
+
+    检查在解码消息之前进行，被限流的消息不会被解析，也不会触发任何刷新；
+    连接累计被限流的消息达到 strikes 条后应断开该连接，此后的消息全部拒绝。
+    """
+
+    __slots__ = ('bucket', 'shared', 'strikes', 'limited')
+
+    def __init__(
+        self, rate: float, burst: float, strikes: int, shared: Optional[TokenBucket] = None
+    ) -> None:
+        """
+        Args:
+            rate (float): 该连接每秒最多处理的消息数，为0时不限制。
+            burst (float): 该连接允许的突发消息数。
+            strikes (int): 累计被限流多少条消息后断开连接，为0时不断开。
+            shared (TokenBucket): 同类连接共享的令牌桶，为 None 时不检查。
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.shared = shared
+        self.strikes = strikes
+        self.limited = 0
+
+    def check(self) -> Optional[str]:
+        """
+        Returns:
+            str: 消息被拒绝的原因（'rate_limited' 或 'overloaded'），放行时为 None。
+        """
+        if self.exhausted or not self.bucket.take():
+            self.limited += 1
+            return 'rate_limited'
+        if self.shared is not None and not self.shared.take():
+            return 'overloaded'
+        return None
+
+    @property
+    def exhausted(self) -> bool:
+        """
+        连接是否已经因为持续超速而应被断开。
+        """
+        return self.strikes > 0 and self.limited >= self.strikes
+
+
+class AdmissionControl:
+    """
+    一个WebSocket服务器的准入控制：限制并发连接数和新建连接的速率。
+
+    检查在握手之前的 process_request 阶段进行，过载时直接返回 503 和 Retry-After，
+    不会建立WebSocket连接，也不会进入房间和状态机。
+    并发连接数按处理函数登记的连接计算，各进程分别统计。
+    暂停接纳（paused）期间也以 503 拒绝新连接，满足 exempt 的请求（如断线重连）除外。
+    """
+
+    def __init__(
+        self,
+        role: str,
+        max_connections: int,
+        connect_rate: float,
+        retry_after: int = 5,
+        exempt: Optional[Callable[[str], bool]] = None,
+    ) -> None:
+        """
+        Args:
+            role (str): 连接角色，用于指标标签。
+            max_connections (int): 最大并发连接数，为0时不限制。
+            connect_rate (float): 每秒最多接受的新连接数，为0时不限制。
+            retry_after (int): 拒绝时建议客户端等待的秒数。
+            exempt (Callable): 按请求路径判断连接在暂停接纳期间是否仍然接受。
+        """
+        self.role = role
+        self.max_connections = max_connections
+        self.connect_bucket = TokenBucket(connect_rate, max(connect_rate, 1))
+        self.retry_after = retry_after
+        self.exempt = exempt
+        self.paused = False
+        self.active = 0
+        self._full = ADMISSION_REJECTED.labels(role, 'max_connections')
+        self._rate = ADMISSION_REJECTED.labels(role, 'connect_rate')
+        self._paused = ADMISSION_REJECTED.labels(role, 'paused')
+
+    def enter(self) -> None:
+        """
+        连接进入处理函数时调用。
+        """
+        self.active += 1
+
+    def leave(self) -> None:
+        """
+        连接的处理函数结束时调用。
+        """
+        self.active -= 1
+
+    def process_request(
+        self, connection: ServerConnection, request: Request
+    ) -> Optional[Response]:
+        """
+        作为 websockets.serve 的 process_request 参数，过载时拒绝握手。
+        """
+        if self.paused and not (self.exempt is not None and self.exempt(request.path)):
+            self._paused.inc()
+            return self.overloaded(connection)
+        if self.max_connections and self.active >= self.max_connections:
+            self._full.inc()
+            return self.overloaded(connection)
+        if not self.connect_bucket.take():
+            self._rate.inc()
+            return self.overloaded(connection)
+        return None
+
+    def overloaded(self, connection: ServerConnection) -> Response:
+        response = connection.respond(HTTPStatus.SERVICE_UNAVAILABLE, "server overloaded\n")
+        response.headers['Retry-After'] = str(self.retry_after)
+        return response
+
+
+# 角色 -> 该角色服务器当前使用的准入控制
+controls: dict[str, AdmissionControl] = {}
+
+
+def register_admission(control: AdmissionControl) -> AdmissionControl:
+    """
+    登记角色的准入控制（替换同一角色之前的），其连接数上限会导出为指标。
+    """
+    controls[control.role] = control
+    return control
+
+
+Gauge(
+    'ezinterview_admission_max_connections', "并发连接数上限，0表示不限制", ('role',),
+    callback=lambda: {(role,): c.max_connections for role, c in controls.items()},
+)
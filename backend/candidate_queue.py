@@ -0,0 +1,148 @@
+from collections import OrderedDict
+from typing import Generic, Hashable, Iterator, TypeVar
+
+
+T = TypeVar('T', bound=Hashable)
+
+
+class CandidateQueue(Generic[T]):
+    """
+    带位置索引的先进先出队列。
+
+    - 入队、出队、成员判断均为 O(1)
+    - 从队列中间移除为 O(log N)
+    - 查询成员在队列中的位置为 O(log N)
+    - 原地替换成员（保持其位置）为 O(1)
+
+    每个成员分配一个递增的序号，序号 -> 成员按入队顺序保存在 OrderedDict 中；
+    序号上维护一棵树状数组（Fenwick 树），用于统计某个序号之前仍在队列中的成员数量。
+    序号用尽时整体重新编号，均摊代价为 O(1)。
+    """
+
+    def __init__(self) -> None:
+        self._items: OrderedDict[int, T] = OrderedDict()  # 序号 -> 成员，按入队顺序
+        self._seq: dict[T, int] = {}  # 成员 -> 序号
+        self._capacity = 64
+        self._tree = [0] * (self._capacity + 1)  # 树状数组，下标从1开始
+        self._next_seq = 1
+
+    def __len__(self) -> int:
+        return len(self._seq)
+
+    def __bool__(self) -> bool:
+        return bool(self._seq)
+
+    def __contains__(self, item: object) -> bool:
+        return item in self._seq
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._items.values())
+
+    def __repr__(self) -> str:
+        return f"CandidateQueue({list(self._items.values())!r})"
+
+    def _update(self, seq: int, delta: int) -> None:
+        while seq <= self._capacity:
+            self._tree[seq] += delta
+            seq += seq & -seq
+
+    def _prefix(self, seq: int) -> int:
+        total = 0
+        while seq > 0:
+            total += self._tree[seq]
+            seq -= seq & -seq
+        return total
+
+    def _rebuild(self) -> None:
+        """
+        按当前顺序为所有成员重新编号并重建树状数组。
+        """
+        self._capacity = max(64, 2 * len(self._seq))
+        self._tree = [0] * (self._capacity + 1)
+        items = list(self._items.values())
+        self._items = OrderedDict(enumerate(items, start=1))
+        for i, item in self._items.items():
+            self._seq[item] = i
+            self._tree[i] = 1
+        for i in range(1, self._capacity + 1):
+            parent = i + (i & -i)
+            if parent <= self._capacity:
+                self._tree[parent] += self._tree[i]
+        self._next_seq = len(self._seq) + 1
+
+    def append(self, item: T) -> None:
+        """
+        将成员加入队尾。
+
+        Raises:
+            ValueError: 成员已经在队列中。
+        """
+        if item in self._seq:
+            raise ValueError(f"{item!r} 已经在队列中")
+        if self._next_seq > self._capacity:
+            self._rebuild()
+        seq = self._next_seq
+        self._next_seq += 1
+        self._seq[item] = seq
+        self._items[seq] = item
+        self._update(seq, 1)
+
+    def popleft(self) -> T:
+        """
+        取出并返回队首成员。
+
+        Raises:
+            IndexError: 队列为空。
+        """
+        if not self._seq:
+            raise IndexError("队列为空")
+        seq, item = self._items.popitem(last=False)
+        del self._seq[item]
+        self._update(seq, -1)
+        return item
+
+    def remove(self, item: T) -> None:
+        """
+        从队列任意位置移除成员。
+
+        Raises:
+            KeyError: 成员不在队列中。
+        """
+        seq = self._seq.pop(item)
+        del self._items[seq]
+        self._update(seq, -1)
+
+    def discard(self, item: T) -> bool:
+        """
+        如果成员在队列中则将其移除。
+
+        Returns:
+            bool: 成员是否在队列中。
+        """
+        if item not in self._seq:
+            return False
+        self.remove(item)
+        return True
+
+    def position(self, item: T) -> int:
+        """
+        查询成员在队列中的位置，队首为0。
+
+        Raises:
+            KeyError: 成员不在队列中。
+        """
+        return self._prefix(self._seq[item]) - 1
+
+    def replace(self, old: T, new: T) -> None:
+        """
+        用新成员替换队列中的旧成员，新成员占据旧成员原来的位置。
+
+        Raises:
+            KeyError: 旧成员不在队列中。
+            ValueError: 新成员已经在队列中。
+        """
+        if new in self._seq:
+            raise ValueError(f"{new!r} 已经在队列中")
+        seq = self._seq.pop(old)
+        self._seq[new] = seq
+        self._items[seq] = new
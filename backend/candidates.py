@@ -0,0 +1,172 @@
+import asyncio
+import enum
+from typing import Any, Iterator, Optional
+
+from websockets.asyncio.server import ServerConnection
+
+from candidate_queue import CandidateQueue
+
+
+class CandidateState(enum.Enum):
+    """
+    面试者所处的阶段。
+    """
+    PREPARING = 'preparing'  # 已连接，尚未准备好
+    WAITING = 'waiting'  # 已准备好，正在排队
+    INTERVIEWING = 'interviewing'  # 正在面试（包括开始前的倒计时）
+    FINISHED = 'finished'  # 面试已结束，连接尚未断开
+
+
+class Candidate:
+    """
+    一位面试者的会话记录，断线重连后仍是同一条记录，只替换其中的连接。
+    """
+
+    __slots__ = (
+        'id', 'token', 'websocket', 'state', 'joined', 'changed', 'view', 'detached', 'booked'
+    )
+
+    def __init__(self, id: str, token: str, websocket: ServerConnection, now: float) -> None:
+        """
+        Args:
+            id (str): 稳定的面试者ID，取会话中第一个连接的ID。
+            token (str): 恢复令牌。
+            websocket (ServerConnection): 当前（或断线前最后）的连接。
+            now (float): 创建时间（单调时钟）。
+        """
+        self.id = id
+        self.token = token
+        self.websocket = websocket
+        self.state = CandidateState.PREPARING
+        self.joined = now  # 进入房间的时间
+        self.changed = now  # 最近一次改变阶段的时间
+        # 最近一次收到的队列视图，用于计算增量；为 None 时下一次发送完整视图
+        self.view: Optional[dict[str, Any]] = None
+        # 断线后等待重连的过期定时器，在线时为 None
+        self.detached: Optional[asyncio.TimerHandle] = None
+        # 预约面试时段时的预计开始时间（Unix 时间戳），未预约时为 None
+        self.booked: Optional[int] = None
+
+    def __repr__(self) -> str:
+        return f"Candidate({self.id!r}, {self.state.value})"
+
+
+class HandedOffConnection:
+    """
+    从旧进程交接过来、尚未重连到本进程的面试者所使用的占位连接。
+
+    占位连接没有发送队列，发给它的消息都会被丢弃；面试者凭恢复令牌重连后换成真实连接。
+    """
+
+    __slots__ = ('id',)
+
+    subprotocol = None
+
+    def __init__(self, id: str) -> None:
+        self.id = id
+
+    async def close(self, code: int = 1000, reason: str = '') -> None:
+        pass
+
+
+class CandidateRegistry:
+    """
+    房间内所有面试者的登记处：每位面试者一条记录，按连接和恢复令牌索引。
+
+    各阶段另有各自的索引，便于按阶段遍历：准备中的集合、排队队列、各通道正在面试的面试者，
+    以及按结束先后排列的已完成集合。阶段之间的转换都是 O(1)，
+    只有从队列中间离开为 O(log N)。
+    """
+
+    def __init__(self) -> None:
+        self.by_connection: dict[ServerConnection, Candidate] = {}
+        self.by_token: dict[str, Candidate] = {}
+        self.preparing: set[Candidate] = set()
+        self.queue: CandidateQueue[Candidate] = CandidateQueue()
+        self.interviewing: set[Candidate] = set()
+        self.finished: dict[Candidate, None] = {}  # 按结束先后排列
+
+    def __len__(self) -> int:
+        return len(self.by_token)
+
+    def __iter__(self) -> Iterator[Candidate]:
+        return iter(self.by_token.values())
+
+    def get(self, websocket: ServerConnection) -> Optional[Candidate]:
+        return self.by_connection.get(websocket)
+
+    def session(self, token: str) -> Optional[Candidate]:
+        return self.by_token.get(token)
+
+    def add(self, websocket: ServerConnection, token: str, now: float) -> Candidate:
+        """
+        为新连接创建处于准备阶段的记录。
+        """
+        candidate = Candidate(str(websocket.id), token, websocket, now)
+        self.by_connection[websocket] = candidate
+        self.by_token[token] = candidate
+        self.preparing.add(candidate)
+        return candidate
+
+    def rebind(self, candidate: Candidate, websocket: ServerConnection) -> None:
+        """
+        将记录换到新连接上，所处阶段和排队位置不变。
+        """
+        if self.by_connection.get(candidate.websocket) is candidate:
+            del self.by_connection[candidate.websocket]
+        candidate.websocket = websocket
+        self.by_connection[websocket] = candidate
+
+    def _leave(self, candidate: Candidate) -> None:
+        match candidate.state:
+            case CandidateState.PREPARING:
+                self.preparing.discard(candidate)
+            case CandidateState.WAITING:
+                self.queue.discard(candidate)
+            case CandidateState.INTERVIEWING:
+                self.interviewing.discard(candidate)
+            case CandidateState.FINISHED:
+                self.finished.pop(candidate, None)
+
+    def move(self, candidate: Candidate, state: CandidateState, now: float) -> None:
+        """
+        将面试者转到新的阶段，进入排队时排在队尾。
+        """
+        self._leave(candidate)
+        candidate.state = state
+        candidate.changed = now
+        match state:
+            case CandidateState.PREPARING:
+                self.preparing.add(candidate)
+            case CandidateState.WAITING:
+                self.queue.append(candidate)
+            case CandidateState.INTERVIEWING:
+                self.interviewing.add(candidate)
+            case CandidateState.FINISHED:
+                self.finished[candidate] = None
+
+    def remove(self, candidate: Candidate) -> None:
+        """
+        删除面试者的记录，之后其恢复令牌失效。
+        """
+        self._leave(candidate)
+        if self.by_connection.get(candidate.websocket) is candidate:
+            del self.by_connection[candidate.websocket]
+        self.by_token.pop(candidate.token, None)
+
+    def oldest_finished(self) -> Optional[Candidate]:
+        """
+        最早结束面试且仍在登记中的面试者。
+        """
+        return next(iter(self.finished), None)
+
+    def counts(self) -> dict[str, int]:
+        """
+        各阶段的面试者人数。
+        """
+        return {
+            CandidateState.PREPARING.value: len(self.preparing),
+            CandidateState.WAITING.value: len(self.queue),
+            CandidateState.INTERVIEWING.value: len(self.interviewing),
+            CandidateState.FINISHED.value: len(self.finished),
+        }
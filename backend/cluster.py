@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import zlib
+from typing import Any, Callable, Optional
+
+from rooms import parse_room_id
+
+
+logger = logging.getLogger(__name__)
+
+# 传递连接时附带的角色标记
+ROLE_INTERVIEWEE = b'e'
+ROLE_INTERVIEWER = b'r'
+
+# 读取请求行的最长时间（秒）和最大字节数
+PEEK_TIMEOUT = 10
+PEEK_LIMIT = 4096
+
+
+def worker_index(room_id: str, workers: int) -> int:
+    """
+    计算房间所属的工作进程编号，同一房间总是落在同一个工作进程上。
+
+    Args:
+        room_id (str): 房间号。
+        workers (int): 工作进程数量。
+    """
+    return zlib.crc32(room_id.encode('utf-8')) % workers
+
+
+async def _wait_readable(sock: socket.socket) -> None:
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def on_readable():
+        if not future.done():
+            future.set_result(None)
+
+    loop.add_reader(sock.fileno(), on_readable)
+    try:
+        await future
+    finally:
+        loop.remove_reader(sock.fileno())
+
+
+async def peek_request_path(sock: socket.socket) -> Optional[str]:
+    """
+    在不消耗数据的前提下读取HTTP请求行中的路径，
+    之后接手该连接的工作进程仍能读到完整的握手请求。
+
+    Returns:
+        Optional[str]: 请求路径，连接关闭或请求行不合法时返回 None。
+    """
+    while True:
+        await _wait_readable(sock)
+        data = sock.recv(PEEK_LIMIT, socket.MSG_PEEK)
+        if not data:
+            return None
+        if b'\r\n' in data:
+            parts = data.split(b'\r\n', 1)[0].split()
+            if len(parts) != 3 or parts[0] != b'GET':
+                return None
+            return parts[1].decode('latin-1')
+        if len(data) >= PEEK_LIMIT:
+            return None
+        # 请求行尚未完整到达，稍后再看
+        await asyncio.sleep(0.005)
+
+
+async def _dispatch(role: bytes, conn: socket.socket, channels: list[socket.socket]) -> None:
+    try:
+        path = await asyncio.wait_for(peek_request_path(conn), PEEK_TIMEOUT)
+    except (asyncio.TimeoutError, OSError):
+        path = None
+    if path is None:
+        conn.close()
+        return
+
+    # 非法的房间路径交给默认房间所在的进程，由其拒绝握手
+    room_id = parse_room_id(path) or ''
+    index = worker_index(room_id, len(channels))
+    try:
+        socket.send_fds(channels[index], [role], [conn.fileno()])
+    except OSError as e:
+        logger.error(f"向工作进程 {index} 传递连接失败: {e}")
+    finally:
+        conn.close()
+
+
+async def _accept_loop(
+    role: bytes, listener: socket.socket, channels: list[socket.socket]
+) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        conn, _ = await loop.sock_accept(listener)
+        conn.setblocking(False)
+        loop.create_task(_dispatch(role, conn, channels))
+
+
+async def run_acceptor(
+    listeners: dict[bytes, socket.socket], channels: list[socket.socket]
+) -> None:
+    """
+    前端接收进程：接受连接，读取请求路径中的房间号，
+    再通过Unix域套接字把连接的文件描述符交给负责该房间的工作进程。
+
+    Args:
+        listeners (dict): 角色标记到监听套接字的映射。
+        channels (list): 与各工作进程通信的套接字。
+    """
+    for listener in listeners.values():
+        listener.setblocking(False)
+    await asyncio.gather(*(
+        _accept_loop(role, listener, channels)
+        for role, listener in listeners.items()
+    ))
+
+
+async def receive_connections(
+    channel: socket.socket, factories: dict[bytes, Callable[[], asyncio.Protocol]]
+) -> None:
+    """
+    工作进程：从接收进程收取连接，用对应角色的连接工厂创建协议对象并开始处理。
+
+    Args:
+        channel (socket.socket): 与接收进程通信的套接字。
+        factories (dict): 角色标记到连接工厂的映射，工厂创建的连接由工作进程的WebSocket服务器管理。
+    """
+    loop = asyncio.get_running_loop()
+    channel.setblocking(False)
+    while True:
+        await _wait_readable(channel)
+        try:
+            role, fds, _, _ = socket.recv_fds(channel, 1, 1)
+        except BlockingIOError:
+            continue
+        if not role and not fds:
+            logger.warning("接收进程已退出")
+            return
+        for fd in fds:
+            sock = socket.socket(fileno=fd)
+            sock.setblocking(False)
+            factory = factories.get(role)
+            if factory is None:
+                sock.close()
+                continue
+            await loop.connect_accepted_socket(factory, sock)
+
+
+def _worker_entry(
+    target: Callable[[int, socket.socket], None],
+    index: int,
+    channel: socket.socket,
+    inherited: list[socket.socket],
+) -> None:
+    for sock in inherited:
+        sock.close()
+    target(index, channel)
+
+
+def run_cluster(
+    workers: int,
+    ports: dict[bytes, int],
+    target: Callable[[int, socket.socket], None],
+    host: str = '0.0.0.0',
+    forward_signals: tuple[int, ...] = (),
+    backlog: int = 1024,
+    reuse_port: bool = False,
+) -> None:
+    """
+    以多进程模式运行：当前进程负责接受连接并按房间分发，
+    target 在每个工作进程中运行，参数为进程编号和通信套接字。
+
+    Args:
+        workers (int): 工作进程数量。
+        ports (dict): 角色标记到监听端口的映射。
+        target (Callable): 工作进程入口。
+        host (str): 监听地址。
+        forward_signals (tuple[int, ...]): 当前进程收到后转发给所有工作进程的信号。
+        backlog (int): 监听套接字的连接等待队列长度。
+        reuse_port (bool): 监听套接字是否设置 SO_REUSEPORT。
+    """
+    if not hasattr(socket, 'send_fds'):
+        raise RuntimeError("当前平台不支持在进程间传递连接，无法使用多进程模式")
+
+    listeners = {
+        role: socket.create_server((host, port), backlog=backlog, reuse_port=reuse_port)
+        for role, port in ports.items()
+    }
+    context = multiprocessing.get_context('fork')
+    processes = []
+    channels = []
+    for i in range(workers):
+        parent_end, child_end = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        inherited = [*listeners.values(), *channels, parent_end]
+        process = context.Process(
+            target=_worker_entry, args=(target, i, child_end, inherited),
+            name=f'interview-worker-{i}', daemon=True,
+        )
+        process.start()
+        child_end.close()
+        processes.append(process)
+        channels.append(parent_end)
+
+    def forward(signum: int, frame: Any) -> None:
+        for process in processes:
+            if process.pid is not None:
+                os.kill(process.pid, signum)
+
+    for signum in forward_signals:
+        signal.signal(signum, forward)
+
+    logger.info(f"已启动 {workers} 个工作进程")
+    try:
+        asyncio.run(run_acceptor(listeners, channels))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
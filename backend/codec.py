@@ -0,0 +1,115 @@
+import json
+from typing import Any, Callable, Optional, Sequence, Union
+
+from websockets.asyncio.server import ServerConnection
+from websockets.typing import Subprotocol
+
+try:
+    import msgpack
+except ImportError:  # 未安装时不提供 MessagePack 编码
+    msgpack = None  # type: ignore[assignment]
+
+try:
+    import cbor2
+except ImportError:  # 未安装时不提供 CBOR 编码
+    cbor2 = None  # type: ignore[assignment]
+
+
+# 发给客户端的消息帧：JSON 为文本帧，二进制编码为二进制帧
+Frame = Union[str, bytes]
+
+
+class Codec:
+    """
+    一种消息编码方式，由客户端在握手时通过WebSocket子协议选择。
+
+    服务端内部的消息帧统一以JSON字符串构造（便于拼接预先编码好的片段），
+    发给选择了二进制编码的连接前再转换一次。
+    """
+
+    def __init__(
+        self,
+        subprotocol: str,
+        encode: Callable[[Any], Frame],
+        decode: Callable[[bytes], Any],
+        binary: bool,
+    ) -> None:
+        """
+        Args:
+            subprotocol (str): 对应的WebSocket子协议名称。
+            encode (Callable): 将对象编码为消息帧。
+            decode (Callable): 将二进制消息解码为对象。
+            binary (bool): 是否为二进制编码。
+        """
+        self.subprotocol = subprotocol
+        self.binary = binary
+        self._encode = encode
+        self._decode = decode
+
+    def __repr__(self) -> str:
+        return f"Codec({self.subprotocol!r})"
+
+    def encode(self, payload: Any) -> Frame:
+        return self._encode(payload)
+
+    def decode(self, message: Frame) -> Any:
+        """
+        解码客户端发来的消息。二进制编码的连接发来文本帧时按JSON解析。
+
+        Raises:
+            ValueError: 消息无法解码。
+        """
+        try:
+            if isinstance(message, str):
+                return json.loads(message)
+            return self._decode(message)
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(str(e)) from e
+
+    def transcode(self, frame: str) -> Frame:
+        """
+        将JSON字符串形式的消息帧转换为本编码。
+        """
+        if not self.binary:
+            return frame
+        return self._encode(json.loads(frame))
+
+
+JSON_CODEC = Codec('ezinterview.json', json.dumps, json.loads, binary=False)
+
+# 子协议名称 -> 编码方式；二进制编码仅在安装了对应的库时可用
+CODECS: dict[str, Codec] = {JSON_CODEC.subprotocol: JSON_CODEC}
+if msgpack is not None:
+    CODECS['ezinterview.msgpack'] = Codec(
+        'ezinterview.msgpack',
+        lambda payload: msgpack.packb(payload, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False),
+        binary=True,
+    )
+if cbor2 is not None:
+    CODECS['ezinterview.cbor'] = Codec('ezinterview.cbor', cbor2.dumps, cbor2.loads, binary=True)
+
+
+def select_subprotocol(
+    connection: ServerConnection, subprotocols: Sequence[Subprotocol]
+) -> Optional[Subprotocol]:
+    """
+    握手时按客户端的偏好顺序选择第一个支持的子协议。
+
+    客户端没有请求子协议或请求的都不支持时不选择子协议，连接使用JSON编码。
+    """
+    for subprotocol in subprotocols:
+        if subprotocol in CODECS:
+            return subprotocol
+    return None
+
+
+def codec_for(websocket: ServerConnection) -> Codec:
+    """
+    连接使用的编码方式。
+    """
+    if websocket.subprotocol is None:
+        return JSON_CODEC
+    return CODECS.get(websocket.subprotocol, JSON_CODEC)
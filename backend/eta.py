@@ -0,0 +1,175 @@
+import heapq
+import math
+from typing import Any, Iterable, Optional
+
+from metrics import Histogram
+
+
+# 还没有任何统计数据时，每道题和倒计时阶段的预估耗时（秒）
+DEFAULT_QUESTION_SECONDS = 180.0
+DEFAULT_COUNTING_SECONDS = 15.0
+
+# 指数加权移动平均的平滑系数，越大越偏向最近的面试
+ETA_SMOOTHING = 0.2
+
+# 预计开始时间的取整粒度（秒）；预估的小幅波动不会产生新的消息
+ETA_GRANULARITY = 30
+
+INTERVIEW_SECONDS = Histogram(
+    'ezinterview_interview_duration_seconds', "正常结束的面试从开始倒计时到结束的耗时（秒）",
+    buckets=(60.0, 120.0, 300.0, 600.0, 900.0, 1200.0, 1800.0, 2700.0, 3600.0, 5400.0, 7200.0),
+)
+
+
+class InterviewTimer:
+    """
+    记录一场面试中倒计时阶段和每道题各自花费的时间。
+
+    同一道题可能因为面试官来回切换而分多次计时，累计到同一道题上。
+    题目以稳定标识（Question.id）计时，题库重新加载后仍能对应到同一道题。
+    """
+
+    __slots__ = ('started', 'question', 'phase_started', 'counting', 'spent')
+
+    def __init__(self, now: float) -> None:
+        self.started = now
+        self.question: Optional[str] = None  # 正在计时的题目，为 None 时处于倒计时阶段
+        self.phase_started = now
+        self.counting = 0.0
+        self.spent: dict[str, float] = {}
+
+    def switch(self, question: Optional[str], now: float) -> None:
+        """
+        结束当前阶段的计时，开始为 question 计时（为 None 时停止计时）。
+        """
+        elapsed = now - self.phase_started
+        if self.question is None:
+            self.counting += elapsed
+        else:
+            self.spent[self.question] = self.spent.get(self.question, 0.0) + elapsed
+        self.question = question
+        self.phase_started = now
+
+    def spent_on(self, question: str, now: float) -> float:
+        """
+        目前为止在某道题上花费的总时间，包括正在进行的这一段。
+        """
+        spent = self.spent.get(question, 0.0)
+        if question == self.question:
+            spent += now - self.phase_started
+        return spent
+
+
+class DurationStats:
+    """
+    房间内面试耗时的滚动统计：每道题、所有题目整体以及倒计时阶段的指数加权移动平均。
+
+    没有某道题的数据时使用所有题目的平均值，完全没有数据时使用默认值。
+    每道题的统计按题目的稳定标识保存。
+    """
+
+    __slots__ = ('alpha', 'questions', 'question_mean', 'counting', 'interviews')
+
+    def __init__(self, alpha: float = ETA_SMOOTHING) -> None:
+        self.alpha = alpha
+        self.questions: dict[str, float] = {}
+        self.question_mean: Optional[float] = None
+        self.counting: Optional[float] = None
+        self.interviews = 0  # 已统计的面试场数
+
+    def _smooth(self, old: Optional[float], value: float) -> float:
+        return value if old is None else old + self.alpha * (value - old)
+
+    def observe(self, timer: InterviewTimer) -> None:
+        """
+        将一场正常结束的面试计入统计，timer 应已停止计时。
+        """
+        self.counting = self._smooth(self.counting, timer.counting)
+        for question, seconds in timer.spent.items():
+            self.questions[question] = self._smooth(self.questions.get(question), seconds)
+            self.question_mean = self._smooth(self.question_mean, seconds)
+        self.interviews += 1
+        INTERVIEW_SECONDS.labels().observe(timer.counting + sum(timer.spent.values()))
+
+    def question_estimate(self, question: str) -> float:
+        estimate = self.questions.get(question)
+        if estimate is None:
+            estimate = self.question_mean
+        return DEFAULT_QUESTION_SECONDS if estimate is None else estimate
+
+    def counting_estimate(self) -> float:
+        return DEFAULT_COUNTING_SECONDS if self.counting is None else self.counting
+
+    def interview_estimate(self, questions: Iterable[str]) -> float:
+        """
+        按给定的题目标识列表预估一场完整面试的耗时（秒）。
+        """
+        return self.counting_estimate() + sum(self.question_estimate(q) for q in questions)
+
+    def remaining(
+        self,
+        timer: InterviewTimer,
+        questions: list[str],
+        current: int,
+        now: float,
+    ) -> float:
+        """
+        预估正在进行的面试还需要多少秒。
+
+        Args:
+            timer (InterviewTimer): 当前面试的计时器。
+            questions (list[str]): 当前面试的题目标识列表。
+            current (int): 当前题目在列表中的位置，倒计时阶段为 -1。
+            now (float): 当前时间。
+        """
+        if current < 0:
+            left = max(self.counting_estimate() - (now - timer.phase_started), 0.0)
+            return left + sum(self.question_estimate(q) for q in questions)
+        question = questions[current]
+        left = max(self.question_estimate(question) - timer.spent_on(question, now), 0.0)
+        return left + sum(self.question_estimate(q) for q in questions[current + 1:])
+
+    def export(self) -> dict[str, Any]:
+        """
+        导出统计数据，结果可被JSON序列化。
+        """
+        return {
+            'questions': dict(self.questions),
+            'questionMean': self.question_mean,
+            'counting': self.counting,
+            'interviews': self.interviews,
+        }
+
+    def restore(self, data: dict[str, Any]) -> None:
+        self.questions = {q: float(v) for q, v in data.get('questions', {}).items()}
+        self.question_mean = data.get('questionMean')
+        self.counting = data.get('counting')
+        self.interviews = data.get('interviews', 0)
+
+
+def start_offsets(free_in: list[float], per_interview: float, count: int) -> list[float]:
+    """
+    预估排队中前 count 位面试者各自还要等待多少秒才能开始面试。
+
+    每条通道空闲后立即从队首取下一位面试者，因此排在第 i 位的面试者
+    会在第 i 次有通道空闲时开始，复杂度为 O(count log K)。
+
+    Args:
+        free_in (list[float]): 每条通道还需多少秒空闲，空闲的通道为 0。
+        per_interview (float): 一场完整面试的预估耗时。
+        count (int): 需要预估的人数。
+    """
+    heap = sorted(free_in)
+    offsets = []
+    for _ in range(count):
+        start = heap[0]
+        offsets.append(start)
+        heapq.heapreplace(heap, start + per_interview)
+    return offsets
+
+
+def round_eta(timestamp: float) -> int:
+    """
+    将预计开始时间（Unix 时间戳）向上取整到 ETA_GRANULARITY 秒。
+    """
+    return int(math.ceil(timestamp / ETA_GRANULARITY) * ETA_GRANULARITY)
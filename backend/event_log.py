@@ -0,0 +1,227 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Iterator, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# 所有事件日志共用的写入线程池；同一日志同时最多只有一批在写
+_writer = concurrent.futures.ThreadPoolExecutor(thread_name_prefix='event-log')
+
+
+class EventLog:
+    """
+    只追加的事件日志，记录房间内的每一次状态变化，用于崩溃后恢复。
+
+    - 追加事件只写入内存缓冲区，不会阻塞事件循环；
+      缓冲区中的事件在提交窗口结束后由后台线程一次性写入并 fsync（组提交）
+    - 每追加一定数量的事件写一次状态快照，快照记录对应的事件序号和安全的文件偏移，
+      启动时从快照开始只需重放少量事件
+    - 日志本身从不截断，已完成面试的评分和评语会一直保留在日志中
+    """
+
+    def __init__(
+        self,
+        path: str,
+        commit_interval: float = 0.005,
+        snapshot_interval: int = 500,
+    ) -> None:
+        """
+        Args:
+            path (str): 日志文件路径，快照保存在同目录的 <path>.snapshot 中。
+            commit_interval (float): 组提交窗口（秒）。
+            snapshot_interval (int): 每追加多少个事件写一次快照。
+        """
+        self.path = path
+        self.snapshot_path = path + '.snapshot'
+        self.commit_interval = commit_interval
+        self.snapshot_interval = snapshot_interval
+        self.seq = 0  # 最后一个事件的序号
+        self._buffer: list[str] = []
+        self._committed_offset = 0  # 已写入磁盘的字节数
+        self._pending_snapshot: Optional[dict[str, Any]] = None
+        self._since_snapshot = 0
+        self._snapshot_seq = 0
+        self._commit_task: Optional[asyncio.Task[None]] = None
+        self._inflight: Optional[concurrent.futures.Future[None]] = None  # 正在后台写入的一批
+        self._write_lock = threading.Lock()  # 保证后台写入与 close 不会交错
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'ab')
+
+    def load_snapshot(self) -> Optional[dict[str, Any]]:
+        """
+        读取最近一次的状态快照。
+
+        Returns:
+            Optional[dict]: 快照中的房间状态，没有快照时返回 None。
+        """
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"读取快照 {self.snapshot_path} 失败，将从头重放日志: {e}")
+            return None
+        self._snapshot_seq = snapshot['seq']
+        self.seq = snapshot['seq']
+        self._committed_offset = snapshot['offset']
+        return snapshot['state']
+
+    def replay(self) -> Iterator[dict[str, Any]]:
+        """
+        依次返回快照之后的事件；应在 load_snapshot 之后、追加新事件之前调用。
+
+        文件末尾因崩溃而写了一半的事件会被截掉。
+        """
+        offset = self._committed_offset
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"事件日志 {self.path} 在偏移 {offset} 处损坏，丢弃之后的内容")
+                    break
+                offset += len(line)
+                if event['seq'] <= self._snapshot_seq:
+                    continue
+                self.seq = event['seq']
+                yield event
+        if offset != os.path.getsize(self.path):
+            self._file.truncate(offset)
+        self._committed_offset = offset
+
+    def append(self, event: dict[str, Any]) -> int:
+        """
+        追加一个事件，返回其序号。事件会在提交窗口结束后写入磁盘。
+
+        Args:
+            event (dict): 可JSON序列化的事件内容。
+        """
+        self.seq += 1
+        record = {'seq': self.seq, 'ts': time.time(), **event}
+        self._buffer.append(json.dumps(record, ensure_ascii=False) + '\n')
+        self._since_snapshot += 1
+        self._schedule_commit()
+        return self.seq
+
+    @property
+    def snapshot_due(self) -> bool:
+        """
+        自上次快照以来追加的事件是否已达到快照间隔。
+        """
+        return self._since_snapshot >= self.snapshot_interval
+
+    def snapshot(self, state: dict[str, Any]) -> None:
+        """
+        记录当前状态的快照，与下一批事件一起写入磁盘。
+
+        Args:
+            state (dict): 反映了至今所有已追加事件的房间状态。
+        """
+        # 已写入磁盘的内容只包含序号不超过 self.seq 的事件，重放时据此跳过
+        self._pending_snapshot = {
+            'seq': self.seq,
+            'offset': self._committed_offset,
+            'state': state,
+        }
+        self._since_snapshot = 0
+        self._schedule_commit()
+
+    def _schedule_commit(self) -> None:
+        if self._commit_task is None:
+            self._commit_task = asyncio.get_running_loop().create_task(self._commit())
+
+    async def _commit(self) -> None:
+        try:
+            await asyncio.sleep(self.commit_interval)
+            while self._buffer or self._pending_snapshot is not None:
+                batch = ''.join(self._buffer).encode('utf-8')
+                self._buffer = []
+                snapshot = self._pending_snapshot
+                self._pending_snapshot = None
+                self._inflight = _writer.submit(self._write, batch, snapshot)
+                # 任务被取消时不能连带取消这次写入，close 会等待它完成
+                await asyncio.shield(asyncio.wrap_future(self._inflight))
+                self._inflight = None
+        except Exception as e:
+            logger.error(f"写入事件日志 {self.path} 出错: {e}")
+        finally:
+            self._commit_task = None
+
+    def _write(self, batch: bytes, snapshot: Optional[dict[str, Any]]) -> None:
+        with self._write_lock:
+            self._write_locked(batch, snapshot)
+
+    def _write_locked(self, batch: bytes, snapshot: Optional[dict[str, Any]]) -> None:
+        if batch:
+            self._file.write(batch)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._committed_offset += len(batch)
+        if snapshot is not None:
+            tmp_path = self.snapshot_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            self._snapshot_seq = snapshot['seq']
+
+    async def flush(self) -> None:
+        """
+        等待缓冲区中的事件和快照提交完成。写入在后台线程中进行，等待期间不阻塞事件循环。
+        """
+        while self._commit_task is not None:
+            # 等待方被取消时不取消提交，提交任务总会写完它取走的事件
+            await asyncio.shield(self._commit_task)
+
+    def close(self) -> None:
+        """
+        同步写入尚未提交的事件和快照并关闭日志文件，用于进程退出前；
+        回收房间时先调用 flush 在后台写完，这里就不再有需要等待的写入。
+
+        正在后台写入的一批会先写完，剩余的事件接在它之后写入。
+        """
+        if self._commit_task is not None:
+            self._commit_task.cancel()
+            self._commit_task = None
+        if self._inflight is not None:
+            try:
+                self._inflight.result()
+            except Exception as e:
+                logger.error(f"写入事件日志 {self.path} 出错: {e}")
+            self._inflight = None
+        batch = ''.join(self._buffer).encode('utf-8')
+        self._buffer = []
+        snapshot = self._pending_snapshot
+        self._pending_snapshot = None
+        with self._write_lock:
+            self._write_locked(batch, snapshot)
+            self._file.close()
+
+
+def log_path(directory: str, room_id: str) -> str:
+    """
+    房间事件日志的文件路径。
+    """
+    return os.path.join(directory, f'room-{room_id}.log')
+
+
+def logged_rooms(directory: str) -> list[str]:
+    """
+    列出目录中保存了事件日志的房间号。
+    """
+    if not os.path.isdir(directory):
+        return []
+    return [
+        name[len('room-'):-len('.log')]
+        for name in os.listdir(directory)
+        if name.startswith('room-') and name.endswith('.log')
+    ]
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from metrics import Counter, Histogram, span
+from profiling import set_activity
+
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SECONDS = Histogram(
+    'ezinterview_flush_seconds', "每次刷新视图的耗时（秒）", ('view',)
+)
+FLUSH_MARKS = Counter(
+    'ezinterview_flush_marks_total', "视图被标记为需要刷新的次数，与刷新次数之比即合并程度", ('view',)
+)
+FLUSH_ERRORS = Counter(
+    'ezinterview_flush_errors_total', "刷新视图时出错的次数", ('view',)
+)
+
+
+class FlushScheduler:
+    """
+    合并刷新调度器。
+
+    消息处理函数只需把需要刷新的视图标记为“脏”，调度器会在下一个事件循环周期
+    （或者经过设定的时间窗口后）统一刷新一次。同一窗口内对同一视图的多次标记
+    只会触发一次刷新，广播也因此不再阻塞消息处理流程。
+    """
+
+    def __init__(
+        self,
+        flushers: dict[str, Callable[[], Awaitable[None]]],
+        window: float = 0.0,
+    ) -> None:
+        """
+        Args:
+            flushers (dict): 视图名到刷新函数的映射，刷新时按字典顺序依次执行。
+            window (float): 合并窗口（秒），为0时在下一个事件循环周期刷新。
+        """
+        self.flushers = flushers
+        self.window = window
+        self._marks = {view: FLUSH_MARKS.labels(view) for view in flushers}
+        self._seconds = {view: FLUSH_SECONDS.labels(view) for view in flushers}
+        self._errors = {view: FLUSH_ERRORS.labels(view) for view in flushers}
+        self._dirty: set[str] = set()
+        self._task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def pending(self) -> bool:
+        """
+        是否有尚未刷新的视图。
+        """
+        return bool(self._dirty)
+
+    def mark(self, *views: str) -> None:
+        """
+        将视图标记为需要刷新，并在尚未调度时安排一次刷新。
+
+        Args:
+            *views (str): 需要刷新的视图名。
+        """
+        for view in views:
+            if view not in self.flushers:
+                raise KeyError(f"未知的视图: {view}")
+            self._marks[view].inc()
+        self._dirty.update(views)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def flush_now(self) -> None:
+        """
+        立即刷新所有被标记的视图，直到没有新的标记为止。
+        """
+        while self._dirty:
+            dirty = self._dirty
+            self._dirty = set()
+            for name, flusher in self.flushers.items():
+                if name not in dirty:
+                    continue
+                try:
+                    with span(f'flush.{name}', self._seconds[name]):
+                        await flusher()
+                except Exception as e:
+                    self._errors[name].inc()
+                    logger.error(f"刷新视图 {name} 出错: {e}")
+
+    async def _run(self) -> None:
+        set_activity('flush')
+        try:
+            await asyncio.sleep(self.window)
+            await self.flush_now()
+        finally:
+            self._task = None
+
+    def close(self) -> None:
+        """
+        取消尚未执行的刷新并清空标记。
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._dirty.clear()
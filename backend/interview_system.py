@@ -0,0 +1,1642 @@
+from websockets.asyncio.server import ServerConnection
+
+import asyncio
+import concurrent.futures
+import json
+import logging
+import os
+import secrets
+import time
+from typing import Callable, Coroutine, Iterable, Optional, Any, Literal
+
+from candidates import Candidate, CandidateRegistry, CandidateState, HandedOffConnection
+from lanes import Lane
+from text_patch import apply_patch
+from flush_scheduler import FlushScheduler
+from outbox import get_outbox
+from state_backend import StateBackend
+from event_log import EventLog
+from results_store import ResultsStore
+from eta import DurationStats, InterviewTimer, round_eta, start_offsets
+from codec import Codec, Frame, codec_for
+from question_catalog import QuestionCatalog
+from log_pipeline import RateLimitedLogger
+from metrics import Counter, Histogram
+
+
+logger = logging.getLogger(__name__)
+
+# 每次发送和广播都会执行的调试日志，按调用位置限流
+_no_outbox_log = RateLimitedLogger(logger)
+_send_log = RateLimitedLogger(logger)
+_broadcast_log = RateLimitedLogger(logger)
+_interviewer_log = RateLimitedLogger(logger)
+
+SESSIONS_RESUMED = Counter('ezinterview_sessions_resumed_total', "面试者凭令牌恢复会话的次数")
+SESSIONS_EXPIRED = Counter('ezinterview_sessions_expired_total', "面试者断线后未在宽限期内重连的次数")
+INTERVIEWS_FINISHED = Counter('ezinterview_interviews_finished_total', "完成的面试场次")
+CANDIDATES_EVICTED = Counter(
+    'ezinterview_finished_evicted_total', "按保留策略关闭并清理的已完成面试者连接数"
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    'ezinterview_queue_wait_seconds', "面试者从加入排队到开始面试的等待时间（秒）",
+    buckets=(1.0, 10.0, 30.0, 60.0, 300.0, 600.0, 1800.0, 3600.0, 7200.0, 14400.0),
+)
+FRAMES_UNSENT = Counter(
+    'ezinterview_frames_unsent_total', "未能放入发送队列的消息帧数", ('reason',)
+)
+_frames_no_outbox = FRAMES_UNSENT.labels('no_outbox')
+_frames_rejected = FRAMES_UNSENT.labels('rejected')
+
+
+# 定义面试者状态类型，限定为五种状态之一
+IntervieweeStateType = Literal[
+    'preparing', 'waiting', 'counting', 'interviewing', 'finished'
+]
+
+# 每个房间的面试通道数，即可以同时进行的面试场数
+LANES = 1
+
+# 状态刷新的合并窗口（秒），为0时在下一个事件循环周期刷新
+FLUSH_WINDOW = 0.0
+
+# 房间状态写入状态后端的最短间隔（秒），期间的多次变化合并为一次写入
+STATE_INTERVAL = 1.0
+
+# 默认题库文件
+QUESTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'questions.json')
+
+# 面试者断线后为其保留排队位置或面试的时间（秒），为0时断线立即移除
+RESUME_GRACE = 30
+
+# 事件日志中面试者会话的事件：创建会话、加入排队、预约时段和离开房间，不属于任何通道
+SESSION_EVENTS = frozenset({'session', 'queue', 'book', 'leave'})
+
+# 预约了面试时段的面试者断线后保留其排队位置的最长时间（秒），为0时不接受预约
+BOOKING_HOLD = 2 * 3600
+
+# 预约的面试者在预计开始时间之前多少秒重新连接
+BOOKING_LEAD = 120
+
+# 有面试者在等待时，定期重新计算预计开始时间的间隔（秒）
+ETA_REFRESH_INTERVAL = 30
+
+# 会话被新连接恢复时关闭旧连接所用的关闭码，前端收到后不再自动重连
+CLOSE_SESSION_RESUMED = 4001
+
+# 已完成面试者的连接被清理时使用的关闭码
+CLOSE_FINISHED = 4002
+
+# 已完成面试者的连接在结束后保留多久（秒）再关闭，以及每个房间最多保留多少个，为0时不限制
+FINISHED_LINGER = 300
+MAX_FINISHED = 1000
+
+
+# 没有指定题库的面试系统使用的默认题库，第一次使用时加载
+_default_catalog: Optional[QuestionCatalog] = None
+
+
+def default_catalog() -> QuestionCatalog:
+    """
+    获取默认题库文件对应的题库，服务按启动参数创建房间时会传入自己的题库。
+    """
+    global _default_catalog
+    if _default_catalog is None:
+        _default_catalog = QuestionCatalog(QUESTIONS_PATH)
+    return _default_catalog
+
+
+def put_frame(websocket: ServerConnection, frame: Frame, droppable: bool = True):
+    """
+    将已经按连接的编码方式编码好的消息帧放入其发送队列，不等待网络写入。
+
+    Args:
+        websocket (ServerConnection): 目标WebSocket连接。
+        frame (Frame): 已编码的消息帧。
+        droppable (bool): 该帧是否为可被后续快照取代的状态帧，
+            'finish'、'reject' 等一次性通知应设为 False。
+    """
+    outbox = get_outbox(websocket)
+    if outbox is None:
+        _frames_no_outbox.inc()
+        _no_outbox_log.debug("连接 %s 没有发送队列，丢弃消息", websocket.id)
+        return
+    if not outbox.put(frame, droppable):
+        _frames_rejected.inc()
+
+
+def send_frame(websocket: ServerConnection, frame: str, droppable: bool = True):
+    """
+    将已经序列化好的JSON消息帧发送给指定连接，
+    连接选择了二进制编码时先转换为对应的编码。
+
+    Args:
+        websocket (ServerConnection): 目标WebSocket连接。
+        frame (str): 已序列化的JSON字符串。
+        droppable (bool): 该帧是否为可被后续快照取代的状态帧。
+    """
+    put_frame(websocket, codec_for(websocket).transcode(frame), droppable)
+
+
+def send_payload(websocket: ServerConnection, payload: Any, droppable: bool = True):
+    """
+    将给定的payload对象按连接的编码方式序列化并发送给指定的WebSocket连接，
+    同时在调试日志中记录发送的消息内容和目标连接ID（消息在日志线程中才格式化）。
+
+    Args:
+        websocket (ServerConnection): 目标WebSocket连接。
+        payload (Any): 要发送的数据。
+        droppable (bool): 该帧是否为可被后续快照取代的状态帧。
+    """
+    frame = codec_for(websocket).encode(payload)
+    _send_log.debug("发送消息到%s: %s", websocket.id, payload)
+    put_frame(websocket, frame, droppable)
+
+
+def broadcast_frame(connections: list[ServerConnection], frame: str):
+    """
+    将已经序列化好的消息帧一次性推送给多个WebSocket连接。
+
+    消息帧对每种编码方式只编码一次，使用同一编码的接收者共享同一份数据。
+
+    Args:
+        connections (list[ServerConnection]): 目标WebSocket连接列表。
+        frame (str): 已序列化的JSON字符串。
+    """
+    if not connections:
+        return
+    _broadcast_log.debug("广播消息到%d个连接: %s", len(connections), frame)
+    encoded: dict[Codec, Frame] = {}
+    for c in connections:
+        codec = codec_for(c)
+        data = encoded.get(codec)
+        if data is None:
+            data = encoded[codec] = codec.transcode(frame)
+        put_frame(c, data)
+
+
+def broadcast_payload(connections: list[ServerConnection], payload: Any):
+    """
+    将payload序列化一次后广播给多个WebSocket连接。
+
+    Args:
+        connections (list[ServerConnection]): 目标WebSocket连接列表。
+        payload (Any): 要发送的数据（将被JSON序列化）。
+    """
+    broadcast_frame(connections, json.dumps(payload))
+
+
+class InterviewSystem:
+    """
+    面试系统类，管理面试者的准备、排队、面试和完成状态，
+    以及各面试通道的题目状态、面试官和旁观者连接。
+    """
+    def __init__(
+        self,
+        room_id: str = '',
+        flush_window: float = FLUSH_WINDOW,
+        state_backend: Optional[StateBackend] = None,
+        state_interval: float = STATE_INTERVAL,
+        event_log: Optional[EventLog] = None,
+        results_store: Optional[ResultsStore] = None,
+        resume_grace: float = RESUME_GRACE,
+        catalog: Optional[QuestionCatalog] = None,
+        booking_hold: float = BOOKING_HOLD,
+        booking_lead: float = BOOKING_LEAD,
+        finished_linger: float = FINISHED_LINGER,
+        max_finished: int = MAX_FINISHED,
+        lanes: int = LANES,
+    ) -> None:
+        """
+        初始化面试系统，包含不同状态的面试者集合和各面试通道。
+
+        Args:
+            room_id (str): 所属房间号，默认房间为空字符串。
+            flush_window (float): 状态刷新的合并窗口（秒）。
+            state_backend (StateBackend): 保存房间状态的后端，为 None 时不持久化。
+            state_interval (float): 房间状态写入状态后端的最短间隔（秒）。
+            event_log (EventLog): 记录状态变化的事件日志，为 None 时不记录。
+            results_store (ResultsStore): 保存面试结果的存储，为 None 时不保存。
+            resume_grace (float): 面试者断线后保留其排队位置或面试的时间（秒）。
+            catalog (QuestionCatalog): 题库，默认使用默认题库文件。
+            booking_hold (float): 预约的面试者断线后保留其排队位置的最长时间（秒），为0时不接受预约。
+            booking_lead (float): 预约的面试者在预计开始时间之前多少秒重新连接。
+            finished_linger (float): 已完成面试者的连接在结束后保留的时间（秒），为0时不限制。
+            max_finished (int): 房间内最多保留的已完成面试者连接数，为0时不限制。
+            lanes (int): 面试通道数，即可以同时进行的面试场数。
+        """
+        super().__init__()
+        self.room_id = room_id
+        self.state_backend = state_backend
+        self.state_interval = state_interval
+        # 房间状态有变化、尚未写入状态后端；写入由 _state_task 在后台按间隔进行
+        self._state_dirty = False
+        self._state_task: Optional[asyncio.Task[None]] = None
+        self.event_log = event_log
+        self.results_store = results_store
+        self.resume_grace = resume_grace
+        self.booking_hold = booking_hold
+        self.booking_lead = booking_lead
+        self.finished_linger = finished_linger
+        self.max_finished = max_finished
+        self.catalog = catalog if catalog is not None else default_catalog()
+        self._replaying = False
+        # 所有面试者的会话记录，按连接和恢复令牌索引，并按阶段分别组织；
+        # 面试者凭恢复令牌断线重连，找回原来的排队位置或面试
+        self.candidates = CandidateRegistry()
+        # 面试通道，每条通道有各自的面试官、当前面试者和面试进度，共享同一个排队队列
+        self.lanes = [Lane(i, self.catalog.current) for i in range(max(lanes, 1))]
+        self._queue_titles: list[str] = []
+        self.detached_count = 0  # 断线后等待重连的面试者人数
+        self._finished_sweep: Optional[asyncio.TimerHandle] = None
+        # 面试耗时的滚动统计，所有通道共享，用于预估排队面试者的开始时间
+        self.durations = DurationStats()
+        self._eta_refresh: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task[Any]] = set()
+        # 合并刷新调度器，按 当前面试者 -> 面试官 -> 旁观者 -> 队列 的顺序刷新；
+        # 前三种视图按通道刷新，只处理在 Lane.dirty 中标记过的通道。
+        # 状态存储不随视图刷新，由 persist_state 按 state_interval 单独节流写入
+        self.flusher = FlushScheduler({
+            'current': self.flush_current,
+            'interviewer': self.flush_interviewer,
+            'observers': self.flush_observers,
+            'queue': self.flush_queue,
+        }, flush_window)
+
+        if state_backend is not None:
+            saved = state_backend.load(room_id)
+            if saved is not None:
+                self.restore_state(saved)
+                logger.info(f"房间 '{room_id}' 已从状态后端恢复")
+
+        if event_log is not None:
+            self.replay_event_log()
+
+        # 进程重启前的面试者会话，等待其凭恢复令牌重连
+        self.hold_sessions(self.resume_grace)
+
+    def get_startup_question_list(self) -> list[int]:
+        """
+        新的一场面试默认使用的题目列表。
+        """
+        return list(self.catalog.current.startup)
+
+    def lane_of(self, candidate: Candidate) -> Optional[Lane]:
+        """
+        面试者正在其中面试的通道，不在面试中时为 None。
+        """
+        for lane in self.lanes:
+            if lane.candidate is candidate:
+                return lane
+        return None
+
+    def idle_lane(self) -> Optional[Lane]:
+        """
+        编号最小的空闲通道，所有通道都在面试时为 None。
+        """
+        for lane in self.lanes:
+            if lane.candidate is None:
+                return lane
+        return None
+
+    def interviewer_lane(self, websocket: ServerConnection) -> Optional[Lane]:
+        """
+        连接作为面试官所在的通道。
+        """
+        for lane in self.lanes:
+            if lane.interviewer is websocket:
+                return lane
+        return None
+
+    def init_interview(self, lane: Lane) -> None:
+        """
+        初始化或重置通道的面试状态，设置为计数状态并重置题目索引。
+        """
+        lane.reset(self.catalog.current, self.get_startup_question_list())
+        lane.timer = InterviewTimer(time.monotonic())
+        self.record_event({
+            'event': 'start_interview',
+            'lane': lane.index,
+            'candidate': None if lane.candidate is None else lane.candidate.id,
+            'token': None if lane.candidate is None else lane.candidate.token,
+        })
+        logger.info(f"通道 {lane.name} 的面试状态已初始化")
+
+    def record_event(self, event: dict[str, Any]) -> None:
+        """
+        将一次状态变化写入事件日志，并在需要时记录快照。
+        重放日志的过程中不会重复记录。
+
+        Args:
+            event (dict): 事件内容，'event' 字段为事件类型，'lane' 字段为所属通道。
+        """
+        if self.event_log is None or self._replaying:
+            return
+        self.event_log.append(event)
+        if self.event_log.snapshot_due:
+            self.event_log.snapshot(self.export_state())
+
+    def store_result(self, lane: Lane, question: int) -> None:
+        """
+        将通道当前面试者在某道题上的评分、评语和提示情况写入结果存储，
+        同时记录题目的稳定标识，题库重新加载后仍能按题汇总。
+
+        Args:
+            lane (Lane): 面试所在的通道。
+            question (int): 题目在题库中的绝对索引。
+        """
+        if self.results_store is None or lane.candidate is None:
+            return
+        self.results_store.record(
+            self.room_id,
+            lane.candidate.id,
+            question,
+            lane.bank[question].id,
+            lane.ratings.get(question),
+            lane.comments.get(question, ''),
+            lane.hints.get(question, False),
+        )
+
+    def apply_event(self, event: dict[str, Any]) -> None:
+        """
+        将事件日志中的一个事件应用到当前状态，用于崩溃后重放。
+        没有 'lane' 字段的旧事件属于第一条通道。
+
+        Args:
+            event (dict): record_event 记录的事件。
+        """
+        if event['event'] in SESSION_EVENTS:
+            self.apply_session_event(event)
+            return
+        index = event.get('lane', 0)
+        if not 0 <= index < len(self.lanes):
+            logger.warning(f"忽略不存在的通道上的事件: {event!r}")
+            return
+        lane = self.lanes[index]
+        match event['event']:
+            case 'start_interview':
+                candidate = self.candidates.session(event.get('token') or '')
+                if candidate is not None:
+                    self.begin_interview(lane, candidate, time.monotonic())
+                else:
+                    # 旧版本的日志没有记录面试者的会话
+                    self.init_interview(lane)
+            case 'start':
+                lane.interviewing_state = 'interviewing'
+            case 'answer':
+                lane.ratings[event['question']] = event['rating']
+                lane.set_comment(event['question'], event['comment'])
+            case 'comment':
+                question = event['question']
+                lane.set_comment(question, apply_patch(lane.comments.get(question, ''), event['ops']))
+            case 'move':
+                lane.current_question = event['current']
+            case 'select':
+                lane.current_questions_list = list(event['list'])
+                lane.current_question = event['current']
+            case 'hint':
+                lane.hints[event['question']] = True
+            case 'finish':
+                # 已完成面试的面试者不再恢复，其评分和评语保留在日志和结果存储中
+                if lane.candidate is not None:
+                    self.candidates.remove(lane.candidate)
+                    lane.candidate = None
+                lane.timer = None
+            case _:
+                logger.warning(f"忽略未知事件: {event!r}")
+
+    def apply_session_event(self, event: dict[str, Any]) -> None:
+        """
+        重放面试者会话的变化：创建会话、加入排队、预约时段和离开房间。
+        进入通道开始面试随 'start_interview' 事件重放，结束面试随 'finish' 事件重放。
+        """
+        now = time.monotonic()
+        if event['event'] == 'session':
+            connection = HandedOffConnection(event['candidate'])
+            self.candidates.add(connection, event['token'], now)  # type: ignore[arg-type]
+            return
+        candidate = self.candidates.session(event['token'])
+        if candidate is None:
+            return
+        match event['event']:
+            case 'queue':
+                self.candidates.move(candidate, CandidateState.WAITING, now)
+            case 'book':
+                candidate.booked = event['booked']
+            case 'leave':
+                lane = self.lane_of(candidate)
+                if lane is not None:
+                    lane.candidate = None
+                self.candidates.remove(candidate)
+
+    def replay_event_log(self) -> None:
+        """
+        从事件日志的最近快照开始重放，重建房间状态。
+        """
+        assert self.event_log is not None
+        self._replaying = True
+        try:
+            snapshot = self.event_log.load_snapshot()
+            if snapshot is not None:
+                self.restore_state(snapshot)
+            count = 0
+            for event in self.event_log.replay():
+                if count == 0 and snapshot is None:
+                    # 从头重放时面试者会话完全由日志重建，不保留从状态后端恢复的会话
+                    self.restore_sessions([])
+                self.apply_event(event)
+                count += 1
+        finally:
+            self._replaying = False
+        logger.info(
+            f"房间 '{self.room_id}' 已从事件日志恢复，重放 {count} 个事件，"
+            f"最新序号 {self.event_log.seq}"
+        )
+
+    def schedule_flush(self, *views: str) -> None:
+        """
+        标记需要刷新的视图，由调度器在稍后合并刷新。
+
+        Args:
+            *views (str): 'current'、'interviewer'、'observers' 或 'queue'。
+        """
+        self.flusher.mark(*views)
+        self.mark_state()
+
+    def mark_state(self) -> None:
+        """
+        房间状态有变化时安排写入状态后端；只改变了面试者会话、不需要刷新视图时直接调用。
+        """
+        if self.state_backend is None:
+            return
+        self._state_dirty = True
+        if self._state_task is None:
+            self._state_task = asyncio.get_running_loop().create_task(self.persist_state())
+
+    def mark_lane(self, lane: Lane, *views: str) -> None:
+        """
+        标记某条通道需要刷新的视图。
+
+        Args:
+            lane (Lane): 目标通道。
+            *views (str): 'current' 或 'interviewer'。
+        """
+        lane.dirty.update(views)
+        self.schedule_flush(*views)
+
+    def export_state(self) -> dict[str, Any]:
+        """
+        导出房间的权威状态，结果可被JSON序列化。
+
+        连接对象无法跨进程保存，面试者只记录其会话（恢复令牌、所处阶段、所在通道和预约），
+        恢复后面试者凭令牌重连即可回到原来的位置。
+
+        Returns:
+            dict: 房间状态。
+        """
+        return {
+            'lanes': [lane.export() for lane in self.lanes],
+            'sessions': self.export_sessions(),
+            'durations': self.durations.export(),
+        }
+
+    def restore_state(self, state: dict[str, Any]) -> None:
+        """
+        从 export_state 导出的状态恢复各通道的题目进度、评分、评语和提示，以及面试者的会话。
+        旧版本只有一条通道，其状态直接保存在顶层，恢复到第一条通道；
+        没有保存会话的旧状态不恢复面试者。
+
+        Args:
+            state (dict): 房间状态。
+        """
+        saved = state.get('lanes', [state])
+        if len(saved) > len(self.lanes):
+            logger.warning(
+                f"房间 '{self.room_id}' 保存了 {len(saved)} 条通道的状态，"
+                f"只恢复前 {len(self.lanes)} 条"
+            )
+        for lane, lane_state in zip(self.lanes, saved):
+            lane.restore(lane_state, self.get_startup_question_list())
+        if 'durations' in state:
+            self.durations.restore(state['durations'])
+        if 'sessions' in state:
+            self.restore_sessions(state['sessions'])
+
+    async def persist_state(self):
+        """
+        每隔 state_interval 秒将有变化的房间状态写入状态后端，直到状态不再变化。
+
+        状态在事件循环中导出并序列化，写入数据库在后台线程中进行；
+        写入期间的变化留到下一个间隔再写。
+        """
+        try:
+            while self._state_dirty and self.state_backend is not None:
+                await asyncio.sleep(self.state_interval)
+                self._state_dirty = False
+                raw = json.dumps(self.export_state(), ensure_ascii=False)
+                # 任务被取消时不取消已提交的写入，之后的写入总是排在它后面
+                await asyncio.shield(asyncio.wrap_future(
+                    self.state_backend.save_in_background(self.room_id, raw)
+                ))
+        except Exception as e:
+            logger.error(f"保存房间 '{self.room_id}' 的状态出错: {e}")
+        finally:
+            # 被取消后可能已经有新的写入任务，不能覆盖
+            if self._state_task is asyncio.current_task():
+                self._state_task = None
+
+    def _submit_state(self) -> tuple[dict[str, Any], Optional[concurrent.futures.Future[None]]]:
+        """
+        取消尚未进行的节流写入，导出当前状态并提交到后台写入线程。
+
+        Returns:
+            tuple: 导出的房间状态，以及写入的 Future（没有状态后端时为 None）；
+                写入线程按提交顺序执行，这次写入完成时之前提交的写入也都已完成。
+        """
+        if self._state_task is not None:
+            self._state_task.cancel()
+            self._state_task = None
+        self._state_dirty = False
+        state = self.export_state()
+        if self.state_backend is None:
+            return state, None
+        raw = json.dumps(state, ensure_ascii=False)
+        return state, self.state_backend.save_in_background(self.room_id, raw)
+
+    def save_state(self) -> dict[str, Any]:
+        """
+        立即保存当前状态，并阻塞等待包括之前在后台提交的所有写入完成，用于进程退出和排空。
+
+        Returns:
+            dict: 导出的房间状态，没有状态后端时只导出不保存。
+        """
+        state, future = self._submit_state()
+        if future is not None:
+            future.result()
+        return state
+
+    async def checkpoint(self) -> dict[str, Any]:
+        """
+        与 save_state 相同，但等待写入完成时不阻塞事件循环。
+        """
+        state, future = self._submit_state()
+        if future is not None:
+            await asyncio.wrap_future(future)
+        return state
+
+    async def flush(self) -> None:
+        """
+        房间被回收之前调用：写入尚未保存的状态并等待事件日志提交，等待期间不阻塞事件循环，
+        之后的 close 不再需要等待磁盘写入。
+        """
+        if self._state_dirty:
+            await self.checkpoint()
+        if self.event_log is not None:
+            await self.event_log.flush()
+
+    def close(self) -> None:
+        """
+        房间被回收时调用，取消尚未执行的刷新，写入尚未保存的状态并写完事件日志。
+        """
+        self.flusher.close()
+        if self._state_dirty:
+            self.save_state()
+        if self._eta_refresh is not None:
+            self._eta_refresh.cancel()
+            self._eta_refresh = None
+        if self._finished_sweep is not None:
+            self._finished_sweep.cancel()
+            self._finished_sweep = None
+        for candidate in self.candidates:
+            if candidate.detached is not None:
+                candidate.detached.cancel()
+                candidate.detached = None
+        self.detached_count = 0
+        if self.event_log is not None:
+            # 之后断开的连接不再记录事件
+            self.event_log.close()
+            self.event_log = None
+
+    def retire(self) -> None:
+        """
+        进程开始排空时调用：写入最终状态，停止刷新和所有定时器，并断开与各存储的联系。
+        此后房间状态由接管的新进程（或之后从存储恢复的进程）维护，本进程不再修改任何存储。
+        """
+        self.save_state()
+        self.close()
+        if self.results_store is not None:
+            self.results_store.flush()
+        self.state_backend = None
+        self.results_store = None
+
+    def export_sessions(self) -> list[dict[str, Any]]:
+        """
+        导出尚未结束面试的面试者会话（包括恢复令牌），作为房间状态的一部分保存或交接给新进程。
+        正在面试的在前，其后按排队顺序，最后是准备中的面试者。
+        """
+        def session(candidate: Candidate, lane: Optional[int] = None) -> dict[str, Any]:
+            return {
+                'id': candidate.id,
+                'token': candidate.token,
+                'state': candidate.state.value,
+                'lane': lane,
+                'booked': candidate.booked,
+            }
+
+        sessions = [
+            session(lane.candidate, lane.index) for lane in self.lanes if lane.candidate is not None
+        ]
+        sessions.extend(session(c) for c in self.candidates.queue)
+        sessions.extend(session(c) for c in self.candidates.preparing)
+        return sessions
+
+    def restore_sessions(self, sessions: list[dict[str, Any]]) -> None:
+        """
+        按 export_sessions 导出的会话重建面试者记录，替换现有的全部记录，由 restore_state 调用。
+
+        恢复的面试者还没有连接到本进程，使用占位连接；正在面试的面试者回到原来的通道，
+        通道不存在或已被占用时重新排队。之后应调用 hold_sessions 等待其凭恢复令牌重连。
+
+        Args:
+            sessions (list[dict]): export_sessions 导出的会话。
+        """
+        for candidate in self.candidates:
+            if candidate.detached is not None:
+                candidate.detached.cancel()
+                candidate.detached = None
+                self.detached_count -= 1
+        self.candidates = CandidateRegistry()
+        for lane in self.lanes:
+            lane.candidate = None
+        now = time.monotonic()
+        for session in sessions:
+            connection = HandedOffConnection(session['id'])
+            candidate = self.candidates.add(connection, session['token'], now)  # type: ignore[arg-type]
+            state = CandidateState(session['state'])
+            if state is CandidateState.INTERVIEWING:
+                index = session.get('lane')
+                if index is not None and index < len(self.lanes) and self.lanes[index].candidate is None:
+                    self.candidates.move(candidate, state, now)
+                    self.lanes[index].candidate = candidate
+                else:
+                    logger.warning(f"面试者 {candidate.id} 所在的通道已不存在，重新排队")
+                    state = CandidateState.WAITING
+            if state is CandidateState.WAITING:
+                self.candidates.move(candidate, state, now)
+                candidate.booked = session.get('booked')
+
+    def hold_sessions(self, hold: float) -> None:
+        """
+        为恢复的面试者会话保留位置：在 hold 秒内（预约了时段的排队者为 booking_hold 秒）
+        凭原来的恢复令牌重连，即可回到原来的排队位置或面试中，到期未重连的会话被移除。
+
+        Args:
+            hold (float): 等待重连的时间（秒）。
+        """
+        if not len(self.candidates):
+            return
+        loop = asyncio.get_running_loop()
+        for candidate in self.candidates:
+            if candidate.detached is not None:
+                candidate.detached.cancel()
+                self.detached_count -= 1
+            wait = hold if candidate.booked is None else max(self.booking_hold, hold)
+            candidate.detached = loop.call_later(wait, self.expire_session, candidate)
+            self.detached_count += 1
+        logger.info(f"房间 '{self.room_id}' 恢复了 {len(self.candidates)} 个面试者会话，等待其重连")
+        self.schedule_flush('queue')
+
+    def resync(self, websocket: ServerConnection) -> None:
+        """
+        连接的发送队列丢弃了过期状态帧后调用：
+        清除该连接的视图缓存，并安排一次刷新以重新发送完整快照。
+
+        Args:
+            websocket (ServerConnection): 需要重新同步的连接。
+        """
+        candidate = self.candidates.get(websocket)
+        if candidate is not None:
+            candidate.view = None
+            lane = self.lane_of(candidate)
+            if lane is not None:
+                self.mark_lane(lane, 'current')
+        lane = self.interviewer_lane(websocket)
+        if lane is not None:
+            lane.interviewer_bank = None
+            lane.interviewer_comments = {}
+            self.mark_lane(lane, 'interviewer')
+        self.schedule_flush('queue')
+
+    def choose_lane(self, number: Optional[int]) -> Lane:
+        """
+        为新连接的面试官选择通道。
+
+        Args:
+            number (int): 请求的通道编号（从1开始），为 None 时选择第一条没有面试官的通道，
+                所有通道都有面试官时选择第一条通道。
+        """
+        if number is not None:
+            return self.lanes[number - 1]
+        for lane in self.lanes:
+            if lane.interviewer is None:
+                return lane
+        return self.lanes[0]
+
+    def attach_interviewer(self, websocket: ServerConnection, lane: Lane) -> None:
+        """
+        将新连接设为通道的面试官，并安排向其发送完整状态。
+        """
+        lane.interviewer = websocket
+        lane.interviewer_bank = None
+        lane.interviewer_comments = {}
+        self.mark_lane(lane, 'interviewer')
+
+    def detach_interviewer(self, websocket: ServerConnection) -> None:
+        lane = self.interviewer_lane(websocket)
+        if lane is not None:
+            lane.interviewer = None
+
+    async def next_candidate(self, lane: Lane) -> None:
+        """
+        让通道切换到下一个面试者：
+        - 将当前面试者加入已完成集合（如果存在）
+        - 从排队列表取出下一个面试者作为当前面试者
+        - 初始化面试状态
+        """
+        candidate = lane.candidate
+        if candidate is not None:
+            if self.results_store is not None:
+                for q in lane.current_questions_list:
+                    self.store_result(lane, q)
+                self.results_store.finish(self.room_id, candidate.id)
+            lane.candidate = None
+            self.candidates.move(candidate, CandidateState.FINISHED, time.monotonic())
+            # 在面试者离开通道之后记录，此时写入的快照不再包含其会话
+            self.record_event({
+                'event': 'finish',
+                'lane': lane.index,
+                'candidate': candidate.id,
+                'questions': lane.current_questions_list,
+                'ratings': [lane.ratings.get(i) for i in lane.current_questions_list],
+                'comments': [lane.comments.get(i, '') for i in lane.current_questions_list],
+                'hints': [lane.hints.get(i, False) for i in lane.current_questions_list],
+            })
+            INTERVIEWS_FINISHED.inc()
+            send_payload(candidate.websocket, {'type': 'finish'}, droppable=False)
+            logger.info(f"面试者 {candidate.id} 已在通道 {lane.name} 完成面试")
+            self.retire_finished()
+        lane.timer = None
+        self.start_next_in_line(lane)
+
+    def begin_interview(self, lane: Lane, candidate: Candidate, now: float) -> None:
+        """
+        面试者进入空闲的通道开始面试。
+        """
+        self.candidates.move(candidate, CandidateState.INTERVIEWING, now)
+        lane.candidate = candidate
+        candidate.booked = None
+        candidate.view = None
+        self.init_interview(lane)
+
+    def start_next_in_line(self, lane: Lane) -> bool:
+        """
+        让排在最前面且在线的面试者在空闲的通道开始面试。预约了时段且仍未重连的面试者
+        保留其位置，由后面的面试者先面试，重连后再轮到。
+
+        Returns:
+            bool: 是否有面试者开始面试。
+        """
+        for candidate in self.candidates.queue:
+            if candidate.booked is None or candidate.detached is None:
+                break
+        else:
+            return False
+        now = time.monotonic()
+        QUEUE_WAIT_SECONDS.labels().observe(now - candidate.changed)
+        self.begin_interview(lane, candidate, now)
+        logger.info(f"通道 {lane.name} 切换到新面试者 {candidate.id}")
+        return True
+
+    async def flush_interviewer(self):
+        """
+        向有变化的通道的面试官和旁观者发送该通道当前的面试状态。
+
+        题目正文、要点和提示使用题库中预先编码好的片段拼接；
+        所有题目正文组成的 questionMains 只在接收方尚未收到当前题库时附带，
+        当前题目的评语正文只在面试官尚未持有其最新版本时附带（旁观者总是附带）。
+        每条通道每次变化对每种组合只构造一次状态帧，旁观者之间共享同一份编码后的数据。
+        """
+        for lane in self.lanes:
+            if 'interviewer' not in lane.dirty:
+                continue
+            lane.dirty.discard('interviewer')
+            if lane.interviewer is None and not lane.observers:
+                continue
+
+            frames: dict[tuple[bool, bool], str] = {}
+
+            def view(with_mains: bool, with_comment: bool = True, lane: Lane = lane) -> str:
+                frame = frames.get((with_mains, with_comment))
+                if frame is None:
+                    frame = frames[with_mains, with_comment] = self.interviewer_view(
+                        lane, with_mains, with_comment
+                    )
+                return frame
+
+            if lane.interviewer is not None:
+                with_mains = lane.interviewer_bank is not lane.bank
+                lane.interviewer_bank = None if lane.state == 'idle' else lane.bank
+                with_comment = True
+                if lane.state == 'interviewing':
+                    i = lane.current_questions_list[lane.current_question]
+                    version = lane.comment_versions.get(i, 0)
+                    with_comment = lane.interviewer_comments.get(i) != version
+                    lane.interviewer_comments[i] = version
+                _interviewer_log.debug("发送消息到%s", lane.interviewer.id)
+                send_frame(lane.interviewer, view(with_mains, with_comment))
+            self.send_observer_view(lane, lane.observers, view)
+            lane.pending_observers.clear()
+
+    def interviewer_view(self, lane: Lane, with_mains: bool, with_comment: bool = True) -> str:
+        """
+        构造通道的面试官视图的状态帧。
+
+        Args:
+            lane (Lane): 目标通道。
+            with_mains (bool): 是否附带所有题目正文组成的 questionMains。
+            with_comment (bool): 是否附带当前题目的评语正文；不附带时接收方沿用本地的评语，
+                commentVersion 总是附带。
+
+        Returns:
+            str: 已序列化的JSON字符串；空闲时为 'idle'，面试官端收到后会清空题目列表。
+        """
+        if lane.state == 'idle':
+            return '{"type": "idle"}'
+
+        titles = [str(i+1) for i in range(len(lane.current_questions_list))]
+        if lane.state == 'counting':
+            parts = [json.dumps({
+                'type': 'counting',
+                'questionTitles': titles,
+                'availableQuestions': lane.current_questions_list,
+            })[1:-1]]
+        else:
+            ptr = lane.current_question
+            i = lane.current_questions_list[ptr]
+            view = {
+                'type': 'interviewing',
+                'currentQuestion': ptr,
+                'questionTitles': titles,
+                'rating': lane.ratings.get(i),
+                'commentVersion': lane.comment_versions.get(i, 0),
+                'hint': lane.hints.get(i, False),
+                'availableQuestions': lane.current_questions_list,
+                'realCurrentQuestion': i,
+            }
+            if with_comment:
+                view['comment'] = lane.comments.get(i, '')
+            parts = [json.dumps(view)[1:-1], lane.bank.fragment(i)]
+        if with_mains:
+            parts.append(lane.bank.mains_fragment())
+        return '{' + ', '.join(parts) + '}'
+
+    def send_observer_view(
+        self, lane: Lane, observers: Iterable[ServerConnection], view: Callable[[bool], str]
+    ) -> None:
+        """
+        将通道的面试官视图广播给旁观者：已有当前题库的旁观者共享不带 questionMains 的帧，
+        其余的共享带 questionMains 的帧。
+
+        Args:
+            lane (Lane): 旁观者所在的通道。
+            observers (Iterable[ServerConnection]): 目标旁观者连接。
+            view (Callable[[bool], str]): 按是否附带 questionMains 返回状态帧。
+        """
+        bank = None if lane.state == 'idle' else lane.bank
+        synced: list[ServerConnection] = []
+        stale: list[ServerConnection] = []
+        for observer in observers:
+            if lane.observers[observer] is bank:
+                synced.append(observer)
+            else:
+                stale.append(observer)
+                lane.observers[observer] = bank
+        if synced:
+            broadcast_frame(synced, view(False))
+        if stale:
+            broadcast_frame(stale, view(bank is not None))
+
+    async def flush_observers(self):
+        """
+        只向新加入或需要重新同步的旁观者发送其通道的面试官视图，不影响面试官和其他旁观者。
+        """
+        for lane in self.lanes:
+            if not lane.pending_observers:
+                continue
+            pending = [o for o in lane.pending_observers if o in lane.observers]
+            lane.pending_observers.clear()
+            self.send_observer_view(
+                lane, pending, lambda with_mains, lane=lane: self.interviewer_view(lane, with_mains)
+            )
+
+    def attach_observer(self, websocket: ServerConnection, lane: Lane) -> None:
+        """
+        在通道上登记一个只读的旁观者连接，并安排向其发送完整状态。
+        """
+        lane.observers[websocket] = None
+        self.resync_observer(websocket)
+
+    def detach_observer(self, websocket: ServerConnection) -> None:
+        for lane in self.lanes:
+            lane.observers.pop(websocket, None)
+            lane.pending_observers.discard(websocket)
+
+    def resync_observer(self, websocket: ServerConnection) -> None:
+        """
+        旁观者的发送队列丢弃了过期状态帧后调用，只重新向该旁观者发送完整快照。
+        """
+        for lane in self.lanes:
+            if websocket in lane.observers:
+                lane.observers[websocket] = None
+                lane.pending_observers.add(websocket)
+                self.flusher.mark('observers')
+
+    async def flush_current(self):
+        """
+        向有变化的通道中正在面试的面试者发送当前状态和题目索引。
+        """
+        for lane in self.lanes:
+            if 'current' not in lane.dirty:
+                continue
+            lane.dirty.discard('current')
+            candidate = lane.candidate
+            if candidate is not None and candidate.detached is None:
+                send_payload(candidate.websocket, self.current_view(lane))
+
+    def current_view(self, lane: Lane) -> dict[str, Any]:
+        """
+        通道的当前面试者应当看到的完整视图：面试状态、题目索引和已展示的提示。
+        """
+        ptr = lane.current_question
+        i = lane.current_questions_list[ptr]
+        return {
+            'type': lane.interviewing_state,
+            'currentQuestion': lane.current_question,
+            'questionHint': lane.bank[i].hint if lane.hints.get(i, False) else '',
+            'questionTitles': [str(i+1) for i in range(len(lane.current_questions_list))],
+        }
+
+    def queue_view_changes(
+        self, candidate: Candidate, view: dict[str, Any]
+    ) -> tuple[str, ...]:
+        """
+        将新的队列视图与该面试者上一次收到的视图比较，返回发生变化的字段名。
+
+        首次发送时返回全部字段；视图完全没有变化时返回空元组。
+
+        Args:
+            candidate (Candidate): 目标面试者。
+            view (dict): 该面试者当前应当看到的完整视图。
+
+        Returns:
+            tuple[str, ...]: 发生变化的字段名，顺序与视图一致。
+        """
+        last = candidate.view
+        candidate.view = view
+        if last is None:
+            return tuple(view)
+        return tuple(
+            k for k, v in view.items()
+            if last.get(k) is not v and last.get(k) != v
+        )
+
+    def get_queue_titles(self) -> list[str]:
+        """
+        获取排队视图中的题目标题列表。
+
+        列表按题目数量缓存，同一个列表对象会被所有视图共享，
+        这样比较视图时通常只需判断对象是否相同。
+        """
+        count = len(self.catalog.current.startup)
+        if len(self._queue_titles) != count:
+            self._queue_titles = [str(i+1) for i in range(count)]
+        return self._queue_titles
+
+    def queue_shared_data(self) -> dict[str, Any]:
+        """
+        所有准备中和排队中的面试者共享的视图字段。
+        queueQuestionCount 为最快结束的那场面试剩余的题目数，没有面试在进行时为0。
+        """
+        remaining = [
+            len(lane.current_questions_list) - lane.current_question
+            for lane in self.lanes if lane.candidate is not None
+        ]
+        return {
+            'questionTitles': self.get_queue_titles(),
+            'queueQuestionCount': min(remaining, default=0),
+        }
+
+    def eta_offsets(self, count: int, now: float) -> list[float]:
+        """
+        预估排队中前 count 位面试者（第 count 位即现在准备好的面试者）各自还要等待的秒数。
+
+        每条通道按其当前面试的剩余时间空闲，之后每场面试按默认题目列表预估耗时；
+        没有面试官连接的通道同样计入，面试者在其中照常开始面试。
+
+        Args:
+            count (int): 需要预估的人数。
+            now (float): 当前的单调时钟时间。
+        """
+        per_interview = self.durations.interview_estimate(
+            self.catalog.current.ids(self.get_startup_question_list())
+        )
+        free_in: list[float] = []
+        for lane in self.lanes:
+            if lane.candidate is None:
+                free_in.append(0.0)
+            elif lane.timer is None:
+                free_in.append(per_interview)
+            else:
+                current = -1 if lane.interviewing_state == 'counting' else lane.current_question
+                free_in.append(self.durations.remaining(
+                    lane.timer, lane.bank.ids(lane.current_questions_list), current, now
+                ))
+        return start_offsets(free_in, per_interview, count)
+
+    def total_queue_count(self) -> int:
+        """
+        现在准备好的面试者之前的人数：排队人数，所有通道都在面试时再加上正在面试的人数。
+        """
+        total = len(self.candidates.queue)
+        if self.idle_lane() is None:
+            total += len(self.candidates.interviewing)
+        return total
+
+    async def flush_queue(self):
+        """
+        向所有准备中和排队中的面试者广播当前题目标题及其排队信息，
+        包括最快结束的那场面试剩余的题目数量。
+
+        准备中的面试者收到 'preparing' 状态和队列总数。
+        排队中的面试者收到 'waiting' 状态和其在队列中的位置。
+
+        两种视图都带有按耗时统计预估的开始时间 estimatedStart（Unix 时间戳，
+        准备中的面试者为现在准备好时的预计开始时间），按所有通道的总容量计算。
+
+        每个连接只会收到相对上一次发送发生变化的字段，
+        视图没有变化的连接不会收到任何消息。
+        相同的消息帧只序列化一次，排队位置帧由预先编码好的片段拼接而成。
+        """
+        shared_data = self.queue_shared_data()
+        offsets = self.eta_offsets(len(self.candidates.queue) + 1, time.monotonic())
+        wall = time.time()
+
+        # 已编码的共享字段片段，按变化的字段名缓存
+        fragments: dict[tuple[str, ...], str] = {}
+
+        def encode_frame(
+            message_type: str, changes: tuple[str, ...], view: dict[str, Any]
+        ) -> str:
+            shared_keys = tuple(k for k in changes if k in shared_data)
+            fragment = fragments.get(shared_keys)
+            if fragment is None:
+                fragment = json.dumps({k: shared_data[k] for k in shared_keys})[1:-1]
+                fragments[shared_keys] = fragment
+            parts = [f'"type": "{message_type}"']
+            if 'queueCount' in changes:
+                parts.append(f'"queueCount": {view["queueCount"]}')
+            if 'estimatedStart' in changes:
+                parts.append(f'"estimatedStart": {view["estimatedStart"]}')
+            if fragment:
+                parts.append(fragment)
+            return '{' + ', '.join(parts) + '}'
+
+        total_queue_count = self.total_queue_count()
+
+        # 给准备中的面试者发送准备状态及队列信息，相同的增量合并为一次广播
+        preparing_view = {
+            'type': 'preparing',
+            'queueCount': total_queue_count,
+            'estimatedStart': round_eta(wall + offsets[-1]),
+            **shared_data
+        }
+        groups: dict[tuple[str, ...], list[ServerConnection]] = {}
+        for c in self.candidates.preparing:
+            changes = self.queue_view_changes(c, preparing_view)
+            if changes:
+                groups.setdefault(changes, []).append(c.websocket)
+        for changes, connections in groups.items():
+            frame = encode_frame('preparing', changes, preparing_view)
+            broadcast_frame(connections, frame)
+
+        # 给排队中的面试者发送等待状态及其排队位置，断线的面试者重连时会收到完整快照
+        for i, c in enumerate(self.candidates.queue):
+            if c.detached is not None:
+                continue
+            view = {
+                'type': 'waiting',
+                'queueCount': i + 1,
+                'estimatedStart': round_eta(wall + offsets[i]),
+                **shared_data
+            }
+            changes = self.queue_view_changes(c, view)
+            if changes:
+                broadcast_frame([c.websocket], encode_frame('waiting', changes, view))
+
+        # 当前面试超出预估时，等待者的预计开始时间会逐渐推迟，需要定期重新计算
+        if self._eta_refresh is None and self.candidates.interviewing and (
+            self.candidates.queue or self.candidates.preparing
+        ):
+            self._eta_refresh = asyncio.get_running_loop().call_later(
+                ETA_REFRESH_INTERVAL, self.refresh_eta
+            )
+
+    def refresh_eta(self) -> None:
+        self._eta_refresh = None
+        self.flusher.mark('queue')
+
+    async def add_interviewee(
+        self, websocket: ServerConnection, token: Optional[str] = None
+    ):
+        """
+        为新连接创建面试者记录并进入准备状态，并刷新队列状态。
+
+        连接携带有效的恢复令牌时，改为恢复该令牌对应的会话，
+        面试者回到断线前的排队位置或面试中，且不会触发队列广播。
+
+        Args:
+            websocket (ServerConnection): 新连接的面试者WebSocket。
+            token (str): 连接请求中携带的恢复令牌。
+        """
+        if token is not None:
+            candidate = self.candidates.session(token)
+            if candidate is not None:
+                self.resume_session(websocket, candidate)
+                return
+        if self.candidates.get(websocket) is None:
+            token = secrets.token_urlsafe(16)
+            candidate = self.candidates.add(websocket, token, time.monotonic())
+            self.record_event({'event': 'session', 'candidate': candidate.id, 'token': token})
+            send_payload(websocket, {'type': 'session', 'token': token}, droppable=False)
+            logger.info(f"新增面试者 {candidate.id} 进入准备状态")
+            self.schedule_flush('queue')
+
+    def snapshot_view(self, candidate: Candidate) -> dict[str, Any]:
+        """
+        面试者当前应当看到的完整视图，用于断线重连后一次性恢复。
+        """
+        match candidate.state:
+            case CandidateState.INTERVIEWING:
+                lane = self.lane_of(candidate)
+                assert lane is not None
+                return self.current_view(lane)
+            case CandidateState.FINISHED:
+                return {'type': 'finish'}
+        if candidate.state is CandidateState.WAITING:
+            position = self.candidates.queue.position(candidate)
+            offsets = self.eta_offsets(position + 1, time.monotonic())
+            view = {
+                'type': 'waiting',
+                'queueCount': position + 1,
+                'estimatedStart': round_eta(time.time() + offsets[-1]),
+                **self.queue_shared_data(),
+            }
+        else:
+            offsets = self.eta_offsets(len(self.candidates.queue) + 1, time.monotonic())
+            view = {
+                'type': 'preparing',
+                'queueCount': self.total_queue_count(),
+                'estimatedStart': round_eta(time.time() + offsets[-1]),
+                **self.queue_shared_data(),
+            }
+        # 完整视图同时作为之后增量计算的基准
+        candidate.view = view
+        return view
+
+    def resume_session(self, websocket: ServerConnection, candidate: Candidate) -> None:
+        """
+        将面试者的记录换到新连接上，并向新连接发送一帧完整快照。
+
+        旧连接如果仍未断开（网络中断尚未被察觉，或在另一个页面中打开），
+        会被关闭并由新连接接管。
+
+        Args:
+            websocket (ServerConnection): 面试者的新连接。
+            candidate (Candidate): 恢复令牌对应的面试者。
+        """
+        if candidate.detached is not None:
+            candidate.detached.cancel()
+            candidate.detached = None
+            self.detached_count -= 1
+        else:
+            self.spawn(candidate.websocket.close(CLOSE_SESSION_RESUMED, 'session resumed'))
+        self.candidates.rebind(candidate, websocket)
+
+        if candidate.booked is not None:
+            candidate.booked = None
+            self.record_event({'event': 'book', 'token': candidate.token, 'booked': None})
+            self.mark_state()
+            lane = self.idle_lane()
+            if lane is not None and self.start_next_in_line(lane):
+                # 预约的面试者断线期间没有其他人可以面试，重连后直接开始
+                self.mark_lane(lane, 'current', 'interviewer')
+                self.schedule_flush('queue')
+
+        send_payload(websocket, self.snapshot_view(candidate))
+        SESSIONS_RESUMED.inc()
+        logger.info(f"面试者 {candidate.id} 通过连接 {websocket.id} 恢复会话")
+
+    def spawn(self, coro: Coroutine[Any, Any, Any]) -> None:
+        """
+        在后台运行协程，并保留任务引用直到其结束。
+        """
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def expire_session(self, candidate: Candidate) -> None:
+        """
+        宽限期内没有重连，按断开处理该面试者。
+        """
+        candidate.detached = None
+        self.detached_count -= 1
+        if self.candidates.session(candidate.token) is candidate:
+            SESSIONS_EXPIRED.inc()
+            logger.info(f"面试者 {candidate.id} 未能在保留期限内重连，会话过期")
+            self.spawn(self.remove_interviewee(candidate))
+
+    async def pop_interviewee(self, websocket: ServerConnection):
+        """
+        面试者断开连接时调用。
+
+        排队中和面试中的面试者会在宽限期内保留原来的位置，等待其凭令牌重连，
+        期间不刷新任何视图；预约了时段的排队者保留 booking_hold 秒；其余面试者立即移除。
+
+        Args:
+            websocket (ServerConnection): 断开连接的面试者WebSocket。
+        """
+        candidate = self.candidates.get(websocket)
+        if candidate is None or candidate.websocket is not websocket:
+            # 会话已被其他连接接管，或已完成的面试者已被清理
+            return
+        if candidate.booked is not None and candidate.state is CandidateState.WAITING:
+            hold = self.booking_hold
+            logger.info(f"预约的面试者 {candidate.id} 断开连接，保留其位置 {hold} 秒等待重连")
+        elif self.resume_grace > 0 and candidate.state in (
+            CandidateState.WAITING, CandidateState.INTERVIEWING
+        ):
+            hold = self.resume_grace
+            logger.info(f"面试者 {candidate.id} 断线，保留其位置 {hold} 秒等待重连")
+        else:
+            await self.remove_interviewee(candidate)
+            return
+        candidate.detached = asyncio.get_running_loop().call_later(
+            hold, self.expire_session, candidate
+        )
+        self.detached_count += 1
+
+    async def remove_interviewee(self, candidate: Candidate):
+        """
+        删除面试者的记录，并根据需要更新其所在通道的当前面试者及刷新状态。
+
+        Args:
+            candidate (Candidate): 要移除的面试者。
+        """
+        match candidate.state:
+            case CandidateState.PREPARING:
+                logger.info(f"准备中的面试者 {candidate.id} 已断开连接")
+            case CandidateState.WAITING:
+                position = self.candidates.queue.position(candidate)
+                logger.info(f"排队中的面试者 {candidate.id}（第 {position + 1} 位）已断开连接")
+                self.schedule_flush('queue')
+            case CandidateState.INTERVIEWING:
+                lane = self.lane_of(candidate)
+                assert lane is not None
+                logger.info(f"通道 {lane.name} 的当前面试者 {candidate.id} 已断开连接")
+                await self.next_candidate(lane)
+                self.mark_lane(lane, 'current', 'interviewer')
+                self.schedule_flush('queue')
+            case CandidateState.FINISHED:
+                logger.info(f"已完成面试者 {candidate.id} 已断开连接")
+        self.candidates.remove(candidate)
+        self.record_event({'event': 'leave', 'token': candidate.token})
+        self.mark_state()
+
+    def retire_finished(self) -> None:
+        """
+        按保留策略清理已完成面试的面试者：超过 max_finished 人时立即关闭最早结束的连接，
+        其余的在结束 finished_linger 秒后关闭。关闭的连接的记录随即删除。
+        """
+        now = time.monotonic()
+        while True:
+            candidate = self.candidates.oldest_finished()
+            if candidate is None:
+                return
+            if not (
+                (self.max_finished and len(self.candidates.finished) > self.max_finished) or
+                (self.finished_linger and now - candidate.changed >= self.finished_linger)
+            ):
+                break
+            self.evict(candidate)
+        if self.finished_linger and self._finished_sweep is None:
+            self._finished_sweep = asyncio.get_running_loop().call_later(
+                candidate.changed + self.finished_linger - now, self._sweep_finished
+            )
+
+    def _sweep_finished(self) -> None:
+        self._finished_sweep = None
+        self.retire_finished()
+
+    def evict(self, candidate: Candidate) -> None:
+        """
+        关闭已完成面试者的连接并删除其记录。
+        """
+        self.candidates.remove(candidate)
+        CANDIDATES_EVICTED.inc()
+        self.spawn(candidate.websocket.close(CLOSE_FINISHED, 'interview finished'))
+        logger.info(f"已完成面试者 {candidate.id} 的连接已关闭")
+
+    async def parse_interviewee_message(
+        self, websocket: ServerConnection, data: dict[Any, Any]
+    ) -> bool:
+        """
+        解析来自面试者的消息，根据消息类型更新系统状态。
+
+        支持的消息类型：
+        - {'type': 'ready'}: 表示面试者准备好，有空闲通道时直接进入面试，否则加入排队
+        - {'type': 'start'}: 表示面试者开始正式面试，状态转为interviewing
+        - {'type': 'book'}: 排队中的面试者预约面试时段，之后可以断开连接，到时再重连
+
+        Args:
+            websocket (ServerConnection): 发送消息的面试者连接。
+            data (dict): 解析后的JSON消息内容。
+
+        Returns:
+            bool: 是否成功处理该消息。
+        """
+        candidate = self.candidates.get(websocket)
+        if candidate is None:
+            return False
+        match data:
+            case {'type': 'ready'}:
+                if candidate.state is CandidateState.PREPARING:
+                    logger.info(f'面试者 {candidate.id} 已经准备好')
+                    lane = self.idle_lane()
+                    if lane is not None:
+                        # 有空闲的通道，直接开始面试
+                        self.begin_interview(lane, candidate, time.monotonic())
+                        logger.info(f'面试者 {candidate.id} 进入通道 {lane.name}')
+                        self.mark_lane(lane, 'current', 'interviewer')
+                    else:
+                        # 所有通道都在面试，加入排队列表
+                        self.candidates.move(candidate, CandidateState.WAITING, time.monotonic())
+                        self.record_event({'event': 'queue', 'token': candidate.token})
+                        logger.info(
+                            f'面试者 {candidate.id} 加入排队，当前位置: {len(self.candidates.queue)}'
+                        )
+                    self.schedule_flush('queue')
+                else:
+                    return False
+            case {'type': 'start'}:
+                lane = self.lane_of(candidate)
+                if lane is not None and lane.interviewing_state != 'interviewing':
+                    # 当前面试者开始正式面试（重复的 start 不再触发刷新）
+                    lane.interviewing_state = 'interviewing'
+                    self.switch_timer(lane)
+                    self.record_event({'event': 'start', 'lane': lane.index})
+                    logger.info(f'面试者 {candidate.id} 在通道 {lane.name} 开始正式面试')
+                    self.mark_lane(lane, 'current', 'interviewer')
+            case {'type': 'book'}:
+                return self.book(candidate)
+            case _:
+                return False
+        return True
+
+    def book(self, candidate: Candidate) -> bool:
+        """
+        排队中的面试者预约面试时段：告知其预计开始时间和应当重新连接的时间，
+        之后断开连接也会保留其排队位置，最长 booking_hold 秒。
+
+        轮到预约的面试者时如果其仍未重连，后面在线的面试者先开始面试，
+        预约的面试者重连后排在最前面。
+
+        Returns:
+            bool: 是否预约成功。
+        """
+        if self.booking_hold <= 0 or candidate.state is not CandidateState.WAITING:
+            return False
+        now = time.time()
+        position = self.candidates.queue.position(candidate)
+        start = round_eta(now + self.eta_offsets(position + 1, time.monotonic())[-1])
+        candidate.booked = start
+        self.record_event({'event': 'book', 'token': candidate.token, 'booked': start})
+        self.mark_state()
+        send_payload(candidate.websocket, {
+            'type': 'booked',
+            'estimatedStart': start,
+            'reconnectAt': max(int(now), int(start - self.booking_lead)),
+        }, droppable=False)
+        logger.info(f"面试者 {candidate.id} 预约了面试时段，预计开始时间 {time.ctime(start)}")
+        return True
+
+    def switch_timer(self, lane: Lane) -> None:
+        """
+        面试官切换题目后，开始为通道的新的当前题目计时。
+        """
+        if lane.timer is not None and lane.interviewing_state == 'interviewing':
+            lane.timer.switch(
+                lane.bank[lane.current_questions_list[lane.current_question]].id, time.monotonic()
+            )
+
+    def change_selection(self, lane: Lane, selection: list[int]):
+        # 1. 不能为空
+        if len(selection) == 0:
+            return False
+
+        # 2. 保存“当前正在显示的那道题”的绝对索引
+        old_abs = lane.current_questions_list[lane.current_question]
+
+        # 3. 检查传入列表里的每个元素：必须是 int 且在合法范围内
+        for s in selection:
+            if not isinstance(s, int):  # type:ignore
+                return False
+            if s < 0 or s >= len(lane.bank):
+                return False
+
+        # 4. 去重并升序排序
+        new_list = sorted(set(selection))
+
+        # 5. 如果去重之后没有任何题，则无效
+        if len(new_list) == 0:
+            return False
+
+        # 6. 检查 old_abs 是否在 new_list 中，如果不在就无法保持当前题，返回 False
+        if old_abs not in new_list:
+            return False
+
+        # 7. 更新题目列表，并把指针设置到 new_list 中 old_abs 的位置
+        lane.current_questions_list = new_list
+        lane.current_question = new_list.index(old_abs)
+
+        return True
+
+    def update_comment(self, lane: Lane, question: int, comment: Any) -> str:
+        """
+        用面试官随 next、last、finish 发来的完整评语更新某道题的评语。
+        通过 comment_patch 同步评语的面试官不再附带评语，此时保留已有的评语。
+
+        Returns:
+            str: 这道题的当前评语。
+        """
+        if isinstance(comment, str):
+            # 评语来自面试官本身，之后的状态帧不必再回传
+            lane.interviewer_comments[question] = lane.set_comment(question, comment)
+        return lane.comments.get(question, '')
+
+    def patch_comment(self, websocket: ServerConnection, lane: Lane, data: dict[Any, Any]) -> bool:
+        """
+        处理面试官输入评语时发来的增量补丁：
+        {"type": "comment_patch", "question": <题目索引>, "version": <基准版本>, "ops": [[start, end, insert], ...]}
+
+        补丁基于面试官持有的 version 版本，与服务端版本一致时应用补丁并只回复新的版本号
+        （comment_ack）；不一致时（例如面试官重连或被挤掉）不应用补丁，回复完整评语和当前版本
+        （comment_sync），面试官以此为准继续编辑。补丁只写入事件日志，不写入结果存储，
+        也不向面试官重发状态帧，只把新的评语推送给旁观者。
+
+        Returns:
+            bool: 消息是否有效。
+        """
+        question = data.get('question')
+        version = data.get('version')
+        if lane.state == 'idle' or question not in lane.current_questions_list or type(version) is not int:
+            return False
+        current = lane.comment_versions.get(question, 0)
+        if version != current:
+            lane.interviewer_comments[question] = current
+            send_payload(websocket, {
+                'type': 'comment_sync',
+                'question': question,
+                'version': current,
+                'comment': lane.comments.get(question, ''),
+            }, droppable=False)
+            return True
+        ops = data.get('ops')
+        try:
+            comment = apply_patch(lane.comments.get(question, ''), ops)
+        except ValueError:
+            return False
+        current = lane.interviewer_comments[question] = lane.set_comment(question, comment)
+        self.record_event({'event': 'comment', 'lane': lane.index, 'question': question, 'ops': ops})
+        send_payload(websocket, {'type': 'comment_ack', 'question': question, 'version': current}, droppable=False)
+        lane.pending_observers.update(lane.observers)
+        self.schedule_flush('observers')
+        return True
+
+    async def parse_interviewer_message(
+        self, websocket: ServerConnection, data: dict[Any, Any]
+    ) -> bool:
+        lane = self.interviewer_lane(websocket)
+        if lane is None or lane.state == 'idle':
+            # 通道上没有面试在进行（没有题目列表），面试官的指令都无效
+            return False
+
+        message_type = data.get('type', None)
+        rating = data.get('rating', None)
+        comment = data.get('comment')
+        selection = data.get('selection', [])
+
+        ret = True
+
+        match message_type:
+            case 'next':
+                # 只在 next 分支修改 rating 和 comment
+                ptr = lane.current_question
+                i = lane.current_questions_list[ptr]
+                lane.ratings[i] = rating
+                comment = self.update_comment(lane, i, comment)
+                self.record_event({
+                    'event': 'answer', 'lane': lane.index, 'question': i, 'rating': rating, 'comment': comment
+                })
+                self.store_result(lane, i)
+
+                if lane.current_question + 1 >= len(lane.current_questions_list):
+                    return False
+                lane.current_question += 1
+                self.switch_timer(lane)
+                self.record_event({'event': 'move', 'lane': lane.index, 'current': lane.current_question})
+                logger.info(
+                    f"通道 {lane.name} 的面试官切换到下一题，当前题目索引: {lane.current_questions_list[lane.current_question]}"
+                )
+
+            case 'last':
+                # 只在 last 分支修改 rating 和 comment
+                ptr = lane.current_question
+                i = lane.current_questions_list[ptr]
+                lane.ratings[i] = rating
+                comment = self.update_comment(lane, i, comment)
+                self.record_event({
+                    'event': 'answer', 'lane': lane.index, 'question': i, 'rating': rating, 'comment': comment
+                })
+                self.store_result(lane, i)
+
+                if lane.current_question - 1 < 0:
+                    return False
+                lane.current_question -= 1
+                self.switch_timer(lane)
+                self.record_event({'event': 'move', 'lane': lane.index, 'current': lane.current_question})
+                logger.info(
+                    f"通道 {lane.name} 的面试官切换到上一题，当前题目索引: {lane.current_questions_list[lane.current_question]}"
+                )
+
+            case 'finish':
+                # 只在 finish 分支修改 rating 和 comment
+                ptr = lane.current_question
+                i = lane.current_questions_list[ptr]
+                lane.ratings[i] = rating
+                comment = self.update_comment(lane, i, comment)
+                self.record_event({
+                    'event': 'answer', 'lane': lane.index, 'question': i, 'rating': rating, 'comment': comment
+                })
+
+                logger.info(f"通道 {lane.name} 的面试官结束当前面试")
+                if lane.timer is not None and lane.interviewing_state == 'interviewing':
+                    lane.timer.switch(None, time.monotonic())
+                    self.durations.observe(lane.timer)
+                await self.next_candidate(lane)
+
+            case 'select':
+                # 只在 select 分支修改 selection
+                # 也可以按标签或分类选题，当前题目总是保留
+                tag = data.get('tag')
+                category = data.get('category')
+                if isinstance(tag, str) or isinstance(category, str):
+                    current = lane.current_questions_list[lane.current_question]
+                    if isinstance(tag, str):
+                        selection = lane.bank.with_tag(tag) + [current]
+                    else:
+                        selection = lane.bank.in_category(category) + [current]
+                ret = self.change_selection(lane, selection)
+                if ret:
+                    self.record_event({
+                        'event': 'select',
+                        'lane': lane.index,
+                        'list': lane.current_questions_list,
+                        'current': lane.current_question,
+                    })
+
+            case 'hint':
+                ptr = lane.current_question
+                i = lane.current_questions_list[ptr]
+                lane.hints[i] = True
+                self.record_event({'event': 'hint', 'lane': lane.index, 'question': i})
+
+            case 'comment_patch':
+                return self.patch_comment(websocket, lane, data)
+
+            case _:
+                return False
+
+        self.mark_lane(lane, 'current', 'interviewer')
+        self.schedule_flush('queue')
+
+        return ret
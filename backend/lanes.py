@@ -0,0 +1,141 @@
+from typing import Any, Literal, Optional
+
+from websockets.asyncio.server import ServerConnection
+
+from candidates import Candidate
+from eta import InterviewTimer
+from question_catalog import QuestionBank
+
+
+# 面试通道的状态：没有面试者时为 'idle'，否则为当前面试者所处的阶段
+SystemStateType = Literal['idle', 'counting', 'interviewing']
+
+
+class Lane:
+    """
+    一条面试通道：一位面试官和其当前面试者，以及这场面试的题目列表、进度、评分、评语和提示。
+
+    房间内的多条通道共享同一个排队队列，每条通道空闲时从队首取下一位面试者。
+    面试官可以在面试者之后才连接，通道没有面试官时照常开始面试。
+    """
+
+    def __init__(self, index: int, bank: QuestionBank) -> None:
+        """
+        Args:
+            index (int): 通道序号，从0开始。
+            bank (QuestionBank): 初始题库。
+        """
+        self.index = index
+        self.interviewer: Optional[ServerConnection] = None  # 当前连接的面试官
+        # 面试官已经收到过哪个题库的 questionMains，题库不变时不再重复发送
+        self.interviewer_bank: Optional[QuestionBank] = None
+        # 只读的旁观者连接 -> 该旁观者已经收到过 questionMains 的题库
+        self.observers: dict[ServerConnection, Optional[QuestionBank]] = {}
+        self.pending_observers: set[ServerConnection] = set()  # 等待单独发送完整状态的旁观者
+        self.candidate: Optional[Candidate] = None  # 当前面试者
+        # 当前面试使用的题库；题库热重载后，从下一场面试开始使用新题库
+        self.bank = bank
+        self.interviewing_state: SystemStateType = 'counting'  # 当前面试者的面试状态
+        self.current_question: int = 0  # 当前题目在题目列表中的位置，从0开始
+        self.current_questions_list: list[int] = []  # 当前面试的题目索引列表
+        # 以下三项只保存有过评分、评语或提示的题目
+        self.ratings: dict[int, Optional[int]] = {}
+        self.comments: dict[int, str] = {}
+        self.hints: dict[int, bool] = {}
+        # 每道题评语的版本号，评语每次变化加一；没有记录的题目为 0
+        self.comment_versions: dict[int, int] = {}
+        # 当前面试官已经持有的每道题评语的版本，版本一致时状态帧中不再附带评语正文
+        self.interviewer_comments: dict[int, int] = {}
+        self.timer: Optional[InterviewTimer] = None  # 当前面试的计时器
+        self.dirty: set[str] = set()  # 等待刷新的本通道视图：'current'、'interviewer'
+
+    def __repr__(self) -> str:
+        return f"Lane({self.index}, {self.state})"
+
+    @property
+    def name(self) -> str:
+        """
+        日志和前端中显示的通道编号，从1开始。
+        """
+        return str(self.index + 1)
+
+    @property
+    def state(self) -> SystemStateType:
+        """
+        通道的当前状态：没有面试者时为 'idle'，否则为当前面试状态。
+        """
+        if self.candidate is None:
+            return 'idle'
+        return self.interviewing_state
+
+    def reset(self, bank: QuestionBank, questions: list[int]) -> None:
+        """
+        为新的一场面试重置进度、评分、评语和提示，设置为倒计时状态。
+        """
+        self.bank = bank
+        self.interviewing_state = 'counting'
+        self.current_question = 0
+        self.current_questions_list = questions
+        self.ratings = {}
+        self.comments = {}
+        self.hints = {}
+        self.comment_versions = {}
+        self.interviewer_comments = {}
+
+    def set_comment(self, question: int, comment: str) -> int:
+        """
+        设置某道题的评语，评语有变化时版本号加一。
+
+        Returns:
+            int: 评语的当前版本号。
+        """
+        version = self.comment_versions.get(question, 0)
+        if self.comments.get(question, '') != comment:
+            self.comments[question] = comment
+            version = self.comment_versions[question] = version + 1
+        return version
+
+    def export(self) -> dict[str, Any]:
+        """
+        导出本通道的面试进度，结果可被JSON序列化。
+        评分、评语和提示只导出有记录的题目，以题目索引的字符串为键。
+        """
+        return {
+            'interviewingState': self.interviewing_state,
+            'currentQuestion': self.current_question,
+            'currentQuestionsList': self.current_questions_list,
+            'ratings': {str(i): v for i, v in self.ratings.items()},
+            'comments': {str(i): v for i, v in self.comments.items()},
+            'hints': {str(i): v for i, v in self.hints.items()},
+            'commentVersions': {str(i): v for i, v in self.comment_versions.items()},
+            'interviewingCandidate': None if self.candidate is None else self.candidate.id,
+        }
+
+    def restore(self, state: dict[str, Any], startup: list[int]) -> None:
+        """
+        从 export 导出的状态恢复题目进度、评分、评语和提示。
+
+        Args:
+            state (dict): 通道状态。
+            startup (list[int]): 题目列表为空时使用的默认题目列表。
+        """
+        count = len(self.bank)
+
+        def by_index(values: Any) -> dict[int, Any]:
+            # 旧版本按题库顺序导出完整列表，新版本只导出有记录的题目
+            if isinstance(values, list):
+                return dict(enumerate(values[:count]))
+            return {int(k): v for k, v in values.items() if int(k) < count}
+
+        self.interviewing_state = state['interviewingState']
+        self.current_question = state['currentQuestion']
+        self.current_questions_list = [i for i in state['currentQuestionsList'] if i < count]
+        if not self.current_questions_list:
+            self.current_questions_list = startup
+            self.current_question = 0
+        self.current_question = min(self.current_question, len(self.current_questions_list) - 1)
+        self.ratings = by_index(state['ratings'])
+        self.comments = by_index(state['comments'])
+        self.hints = by_index(state['hints'])
+        self.comment_versions = by_index(state.get('commentVersions', {}))
+        self.interviewer_comments = {}
@@ -0,0 +1,360 @@
+from websockets.asyncio.client import connect
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Optional
+
+from codec import CODECS, JSON_CODEC, Codec
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+
+def percentile(samples: list[float], p: float) -> Optional[float]:
+    """
+    计算样本的百分位数（最近秩法），样本为空时返回 None。
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered) + 0.5) - 1))
+    return ordered[k]
+
+
+class ServerProbe:
+    """
+    通过 /proc 读取被测服务进程的CPU时间和常驻内存，仅支持Linux。
+    """
+
+    def __init__(self, pid: Optional[int]) -> None:
+        self.pid = pid
+        self._ticks = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+        self.start_cpu = self.cpu_seconds()
+
+    def cpu_seconds(self) -> Optional[float]:
+        if self.pid is None:
+            return None
+        try:
+            with open(f'/proc/{self.pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            return None
+        # utime 和 stime 分别是第14、15个字段，去掉前两个字段后下标为11、12
+        return (int(fields[11]) + int(fields[12])) / self._ticks
+
+    def rss_bytes(self) -> Optional[int]:
+        if self.pid is None:
+            return None
+        try:
+            with open(f'/proc/{self.pid}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            return None
+        return None
+
+
+class LoadStats:
+    """
+    压测过程中的统计数据。
+
+    扇出延迟：面试官每发出一个操作记录一次时间，
+    之后每个等候中的面试者第一次收到排队更新时记录与该时间的差值。
+    """
+
+    def __init__(self) -> None:
+        self.received = 0
+        self.bytes_received = 0
+        self.sent = 0
+        self.connects = 0
+        self.disconnects = 0
+        self.errors = 0
+        self.finished = 0
+        self.fanout_latencies: list[float] = []
+        self.action_latencies: list[float] = []
+        self.action_id = 0
+        self.action_t0 = 0.0
+        self.ack_pending = False  # 面试官是否仍在等待上一个操作的响应
+
+    def start_action(self) -> None:
+        self.action_id += 1
+        self.action_t0 = time.perf_counter()
+        self.ack_pending = True
+
+
+def frame_size(message: str | bytes) -> int:
+    """
+    消息解压后的字节数。
+    """
+    return len(message.encode('utf-8')) if isinstance(message, str) else len(message)
+
+
+def codec_options(codec: Codec) -> dict[str, Any]:
+    if codec is JSON_CODEC:
+        return {}
+    return {'subprotocols': [codec.subprotocol]}
+
+
+async def run_candidate(
+    url: str, stats: LoadStats, stop: asyncio.Event, disconnect_rate: float, codec: Codec
+) -> None:
+    """
+    模拟一位面试者：准备 -> 等待 -> 倒计时结束后开始 -> 完成；
+    等待期间按 disconnect_rate（每秒断开概率）随机断线，并凭恢复令牌重连。
+    """
+    token: Optional[str] = None
+    while not stop.is_set():
+        seen_action = -1
+        try:
+            resume_url = url if token is None else f'{url}?token={token}'
+            async with connect(resume_url, open_timeout=30, **codec_options(codec)) as ws:
+                stats.connects += 1
+                while not stop.is_set():
+                    timeout = (
+                        random.expovariate(disconnect_rate) if disconnect_rate > 0 else None
+                    )
+                    try:
+                        message = await asyncio.wait_for(ws.recv(), timeout)
+                    except asyncio.TimeoutError:
+                        stats.disconnects += 1
+                        break
+                    stats.received += 1
+                    stats.bytes_received += frame_size(message)
+                    data = codec.decode(message)
+                    kind = data.get('type')
+                    if kind == 'session':
+                        # 新会话（首次连接或令牌已过期），重新准备
+                        token = data['token']
+                        await ws.send(codec.encode({'type': 'ready'}))
+                        stats.sent += 1
+                    elif kind in ('preparing', 'waiting'):
+                        if seen_action != stats.action_id and stats.action_id > 0:
+                            seen_action = stats.action_id
+                            stats.fanout_latencies.append(
+                                time.perf_counter() - stats.action_t0
+                            )
+                    elif kind == 'counting':
+                        await ws.send(codec.encode({'type': 'start'}))
+                        stats.sent += 1
+                        disconnect_rate = 0  # 面试中不再随机断线
+                    elif kind == 'finish':
+                        stats.finished += 1
+                        return
+        except Exception:
+            stats.errors += 1
+            await asyncio.sleep(0.5)
+
+
+async def run_interviewer(
+    url: str, stats: LoadStats, stop: asyncio.Event, think_time: float, codec: Codec
+) -> None:
+    """
+    模拟面试官：面试者开始后逐题点击“下一题”，最后一题结束面试。
+    """
+    async with connect(url, open_timeout=30, **codec_options(codec)) as ws:
+        epoch = 0
+        acted: Optional[tuple[int, int]] = None
+        while not stop.is_set():
+            try:
+                message = await asyncio.wait_for(ws.recv(), 1)
+            except asyncio.TimeoutError:
+                continue
+            stats.received += 1
+            stats.bytes_received += frame_size(message)
+            received_at = time.perf_counter()
+            data = codec.decode(message)
+            kind = data.get('type')
+            if stats.ack_pending:
+                stats.action_latencies.append(received_at - stats.action_t0)
+                stats.ack_pending = False
+            if kind == 'counting':
+                epoch += 1
+                continue
+            if kind != 'interviewing':
+                continue
+            current = data['currentQuestion']
+            if acted == (epoch, current):
+                continue
+            acted = (epoch, current)
+            await asyncio.sleep(think_time)
+            if current + 1 >= len(data['questionTitles']):
+                action = {'type': 'finish', 'rating': random.randint(1, 5), 'comment': ''}
+            else:
+                action = {'type': 'next', 'rating': random.randint(1, 5), 'comment': ''}
+            stats.start_action()
+            await ws.send(codec.encode(action))
+            stats.sent += 1
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def wait_for_server(url: str, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            async with connect(url):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    room = args.room.strip('/')
+    interviewee_url = f'ws://{args.host}:{args.interviewee_port}/{room}'
+    interviewer_url = f'ws://{args.host}:{args.interviewer_port}/{room}'
+
+    server: Optional[subprocess.Popen[bytes]] = None
+    pid = args.server_pid
+    if args.spawn:
+        server = subprocess.Popen(
+            [sys.executable, 'main.py', *args.server_args],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        pid = server.pid
+    try:
+        await wait_for_server(interviewer_url)
+        probe = ServerProbe(pid)
+        stats = LoadStats()
+        stop = asyncio.Event()
+
+        started = time.perf_counter()
+        codec = CODECS[f'ezinterview.{args.protocol}']
+        interviewer = asyncio.create_task(
+            run_interviewer(interviewer_url, stats, stop, args.think_time, codec)
+        )
+        candidates = []
+        for _ in range(args.candidates):
+            candidates.append(asyncio.create_task(
+                run_candidate(interviewee_url, stats, stop, args.disconnect_rate, codec)
+            ))
+            if args.ramp > 0:
+                await asyncio.sleep(args.ramp / args.candidates)
+
+        peak_rss = probe.rss_bytes()
+        deadline = started + args.duration
+        while time.perf_counter() < deadline and not all(c.done() for c in candidates):
+            await asyncio.sleep(0.5)
+            rss = probe.rss_bytes()
+            if rss is not None and (peak_rss is None or rss > peak_rss):
+                peak_rss = rss
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        for task in [interviewer, *candidates]:
+            task.cancel()
+        await asyncio.gather(interviewer, *candidates, return_exceptions=True)
+
+        end_cpu = probe.cpu_seconds()
+        cpu = None
+        if end_cpu is not None and probe.start_cpu is not None:
+            cpu = end_cpu - probe.start_cpu
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        'commit': git_commit(),
+        'timestamp': time.time(),
+        'params': {
+            'candidates': args.candidates,
+            'duration': args.duration,
+            'thinkTime': args.think_time,
+            'disconnectRate': args.disconnect_rate,
+            'protocol': args.protocol,
+            'serverArgs': args.server_args if args.spawn else None,
+        },
+        'metrics': {
+            'elapsedSeconds': round(elapsed, 3),
+            'messagesReceived': stats.received,
+            'messagesSent': stats.sent,
+            'messagesPerSecond': round(stats.received / elapsed, 1),
+            'bytesReceived': stats.bytes_received,
+            'interviewerActions': stats.action_id,
+            'fanoutSamples': len(stats.fanout_latencies),
+            'fanoutP50Ms': ms(percentile(stats.fanout_latencies, 50)),
+            'fanoutP95Ms': ms(percentile(stats.fanout_latencies, 95)),
+            'fanoutP99Ms': ms(percentile(stats.fanout_latencies, 99)),
+            'actionP50Ms': ms(percentile(stats.action_latencies, 50)),
+            'actionP99Ms': ms(percentile(stats.action_latencies, 99)),
+            'connects': stats.connects,
+            'randomDisconnects': stats.disconnects,
+            'errors': stats.errors,
+            'finishedInterviews': stats.finished,
+            'serverCpuSeconds': None if cpu is None else round(cpu, 3),
+            'serverPeakRssBytes': peak_rss,
+        },
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="EzInterview WebSocket 后端压测工具")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--interviewee-port', type=int, default=9009)
+    parser.add_argument('--interviewer-port', type=int, default=9008)
+    parser.add_argument('--room', default='loadtest', help="压测使用的房间号")
+    parser.add_argument('--candidates', type=int, default=1000, help="模拟的面试者数量")
+    parser.add_argument('--duration', type=float, default=30, help="压测时长（秒）")
+    parser.add_argument('--ramp', type=float, default=2, help="所有面试者连接完成所用的时间（秒）")
+    parser.add_argument('--think-time', type=float, default=0.05, help="面试官每次操作前的等待时间（秒）")
+    parser.add_argument(
+        '--disconnect-rate', type=float, default=0.0,
+        help="等待中的面试者每秒随机断线重连的概率"
+    )
+    parser.add_argument(
+        '--protocol', choices=[name.split('.', 1)[1] for name in CODECS], default='json',
+        help="消息编码方式（二进制编码需要安装对应的库）"
+    )
+    parser.add_argument('--spawn', action='store_true', help="由压测工具启动被测服务")
+    parser.add_argument(
+        '--server-args', nargs=argparse.REMAINDER, default=[],
+        help="--spawn 时传给 main.py 的参数，必须放在最后"
+    )
+    parser.add_argument('--server-pid', type=int, default=None, help="被测服务的进程号，用于采集CPU和内存")
+    parser.add_argument('--output', default=None, help="将结果以JSON Lines格式追加写入该文件")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    # 数千个连接需要足够的文件描述符
+    if resource is not None:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    result = asyncio.run(run(args))
+    line = json.dumps(result, ensure_ascii=False)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.output is not None:
+        with open(args.output, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+if __name__ == '__main__':
+    main()
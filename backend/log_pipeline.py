@@ -0,0 +1,218 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Optional
+
+
+LOG_FORMAT = "[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 日志队列最多积压的记录数，写盘跟不上时丢弃新记录而不是阻塞事件循环
+LOG_QUEUE_SIZE = 10000
+
+# 每个调用位置每秒最多输出的调试日志条数
+DEBUG_LOG_RATE = 20.0
+
+# 当前进程的调试日志限流速率，由 setup_logging 设置，为0时不限流
+_debug_rate = DEBUG_LOG_RATE
+
+# 日志参数全部是这些不可变类型时，消息的格式化可以推迟到监听线程中进行
+_IMMUTABLE_ARGS = (str, int, float, bytes, uuid.UUID, type(None))
+
+
+class ColorFormatter(logging.Formatter):
+    COLORS = {
+        'DEBUG': '\033[37m',     # 白色
+        'INFO': '\033[32m',      # 绿色
+        'WARNING': '\033[33m',   # 黄色
+        'ERROR': '\033[31m',     # 红色
+        'CRITICAL': '\033[41m',  # 红底白字
+    }
+    RESET = '\033[0m'
+
+    def format(self, record):
+        original_levelname = record.levelname
+        color = self.COLORS.get(record.levelname, self.RESET)
+        record.levelname = f"{color}{original_levelname}{self.RESET}"
+        formatted = super().format(record)
+        record.levelname = original_levelname
+        return formatted
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    每条日志输出为一行JSON，包含时间戳、级别、记录器名称和消息，
+    以及通过 extra 传入的字段；异常堆栈放在 exc 字段中。
+    """
+
+    # LogRecord 自带的属性，不作为附加字段输出
+    RESERVED = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in self.RESERVED and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitedLogger:
+    """
+    热点路径（每次发送、每次广播）和可由客户端任意触发的日志（异常消息）使用的包装，
+    每个实例对应一处调用位置。日志只在这里限流，日志队列本身不限流。
+
+    先用令牌桶判断是否记录，再创建日志记录，被限流的调用几乎没有开销；
+    放行的记录在 suppressed 字段中带上期间丢弃的条数。
+    """
+
+    def __init__(self, logger: logging.Logger) -> None:
+        self.logger = logger
+        self._tokens = float('inf')  # 第一次调用时按速率上限补满
+        self._last = time.monotonic()
+        self._suppressed = 0
+
+    def debug(self, msg: str, *args: Any) -> None:
+        self._log(logging.DEBUG, msg, args)
+
+    def warning(self, msg: str, *args: Any) -> None:
+        self._log(logging.WARNING, msg, args)
+
+    def _log(self, level: int, msg: str, args: tuple[Any, ...]) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        extra = None
+        rate = _debug_rate
+        if rate > 0:
+            now = time.monotonic()
+            self._tokens = min(rate, self._tokens + (now - self._last) * rate)
+            self._last = now
+            if self._tokens < 1:
+                self._suppressed += 1
+                return
+            self._tokens -= 1
+            if self._suppressed:
+                extra = {'suppressed': self._suppressed}
+                self._suppressed = 0
+        self.logger.log(level, msg, *args, extra=extra, stacklevel=3)
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    将日志记录放入队列，参数都是不可变的标量时消息的格式化推迟到监听线程中进行。
+
+    记录不会跨进程传递，因此无需像标准 QueueHandler 那样总是提前格式化；
+    参数中有可变对象（如消息字典）时在放入队列前格式化，之后修改该对象不会影响日志内容。
+    队列已满时丢弃记录并计数，不会阻塞调用方。
+    """
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and not (
+            isinstance(args, tuple) and all(isinstance(arg, _IMMUTABLE_ARGS) for arg in args)
+        ):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LazyQueueHandler.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_listener_pid: Optional[int] = None
+
+
+def stop_logging() -> None:
+    """
+    停止日志监听线程，写完队列中剩余的记录。
+    """
+    global _listener, _listener_pid
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+    _listener = None
+    _listener_pid = None
+
+
+def setup_logging(
+    log_file: str = 'interview_system.log',
+    json_lines: bool = False,
+    debug_rate: float = DEBUG_LOG_RATE,
+    console_level: int = logging.INFO,
+    file_level: int = logging.DEBUG,
+    library_level: int = logging.INFO,
+) -> QueueListener:
+    """
+    配置根日志记录器：事件循环中只把记录放入队列，
+    由后台线程负责格式化并写入控制台和滚动日志文件。
+
+    可以重复调用（例如多进程模式下在工作进程中重新配置），之前的配置会被替换。
+
+    Args:
+        log_file (str): 日志文件路径。
+        json_lines (bool): 日志文件是否使用每行一个JSON对象的格式。
+        debug_rate (float): 每个 RateLimitedLogger 每秒最多输出的日志条数，为0时不限流。
+        console_level (int): 控制台输出的最低级别。
+        file_level (int): 日志文件的最低级别。
+        library_level (int): websockets 库日志的最低级别，默认不输出其逐帧的调试日志。
+
+    Returns:
+        QueueListener: 已启动的日志监听器。
+    """
+    global _listener, _listener_pid, _debug_rate
+    _debug_rate = debug_rate
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    stop_logging()
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(ColorFormatter(LOG_FORMAT, datefmt=DATE_FORMAT))
+
+    file_handler = RotatingFileHandler(
+        log_file,
+        maxBytes=10*1024*1024,  # 10MB
+        backupCount=5,          # 最多保留5个备份文件
+        encoding='utf-8'
+    )
+    file_handler.setLevel(file_level)
+    if json_lines:
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT))
+
+    log_queue: queue.Queue[logging.LogRecord] = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = LazyQueueHandler(log_queue)
+
+    root.setLevel(min(console_level, file_level))
+    logging.getLogger('websockets').setLevel(library_level)
+    root.addHandler(queue_handler)
+
+    _listener = QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    _listener.start()
+    _listener_pid = os.getpid()
+    return _listener
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,404 @@
+import asyncio
+import contextvars
+import logging
+import math
+import random
+import secrets
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Optional, Union
+
+
+logger = logging.getLogger(__name__)
+
+# 追踪记录使用的日志记录器，以 DEBUG 级别写入日志文件
+trace_logger = logging.getLogger('trace')
+
+# 默认的耗时直方图分桶（秒），覆盖 0.1ms 到 2.5s
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+
+# 回调返回单个数值，或者 标签值元组 -> 数值 的映射
+CallbackResult = Union[float, dict[tuple[str, ...], float]]
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{n}="{escape_label(v)}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Metric:
+    """
+    指标的公共部分：名称、说明、标签，以及按标签值保存的子指标。
+
+    没有标签的指标直接调用 inc/set/observe；有标签的指标先用 labels() 取得子指标，
+    热点路径上应在模块加载时取好子指标并保存，避免每次查找。
+    """
+
+    type = 'untyped'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        callback: Optional[Callable[[], CallbackResult]] = None,
+        registry: Optional['Registry'] = None,
+    ) -> None:
+        """
+        Args:
+            name (str): 指标名称。
+            documentation (str): 指标说明，输出在 HELP 行中。
+            labelnames (tuple[str, ...]): 标签名称。
+            callback (Callable): 导出时调用以读取当前值，用于统计已经在别处维护的数值。
+            registry (Registry): 注册到的指标集合，默认为全局的 REGISTRY。
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.callback = callback
+        self._children: dict[tuple[str, ...], Any] = {}
+        (registry if registry is not None else REGISTRY).register(self)
+        if not labelnames and callback is None:
+            self.labels()  # 没有标签的指标从0开始导出
+
+    def labels(self, *values: str) -> Any:
+        """
+        取得指定标签值对应的子指标，不存在时创建。
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要 {len(self.labelnames)} 个标签值")
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def _default(self) -> Any:
+        if self.labelnames:
+            raise ValueError(f"指标 {self.name} 带有标签，需要先调用 labels()")
+        return self.labels()
+
+    def collect(self) -> list[str]:
+        """
+        按 Prometheus 文本格式输出该指标的所有样本行。
+        """
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+        if self.callback is not None:
+            result = self.callback()
+            if not isinstance(result, dict):
+                result = {(): result}
+            for values, value in result.items():
+                lines.append(
+                    f'{self.name}{format_labels(self.labelnames, values)} {format_value(value)}'
+                )
+            return lines
+        for values, child in self._children.items():
+            lines.extend(self._collect_child(format_labels(self.labelnames, values), values, child))
+        return lines
+
+    def _collect_child(self, labels: str, values: tuple[str, ...], child: Any) -> list[str]:
+        return [f'{self.name}{labels} {format_value(child.value)}']
+
+
+class _Value:
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(Metric):
+    """
+    只增不减的计数器。
+    """
+
+    type = 'counter'
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self._default().inc(amount)
+
+
+class Gauge(Metric):
+    """
+    可增可减的当前值。
+    """
+
+    type = 'gauge'
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self._default().dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+
+class _HistogramValue:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 每个分桶（不累计）的样本数，最后一个为 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(Metric):
+    """
+    按分桶统计样本分布的直方图，用于记录耗时。
+    """
+
+    type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+        registry: Optional['Registry'] = None,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry=registry)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def _collect_child(
+        self, labels: str, values: tuple[str, ...], child: _HistogramValue
+    ) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), child.counts):
+            cumulative += count
+            bucket_labels = format_labels(
+                self.labelnames + ('le',), values + (format_value(bound),)
+            )
+            lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+        lines.append(f'{self.name}_sum{labels} {format_value(child.sum)}')
+        lines.append(f'{self.name}_count{labels} {child.count}')
+        return lines
+
+
+class Registry:
+    """
+    一组指标，按注册顺序导出。
+    """
+
+    def __init__(self) -> None:
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self.metrics:
+            raise ValueError(f"指标 {metric.name} 已注册")
+        self.metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """
+        按 Prometheus 文本格式（0.0.4）导出所有指标。
+        """
+        lines = []
+        for metric in self.metrics.values():
+            try:
+                lines.extend(metric.collect())
+            except Exception as e:
+                logger.error(f"导出指标 {metric.name} 出错: {e}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+# 是否记录追踪区间，以及根区间被采样记录的比例，由启动参数设置
+tracing_enabled = False
+trace_sample = 1.0
+
+# 未被采样的根区间在上下文中的标记，其子区间同样不记录
+_UNSAMPLED = ('', '')
+
+# 当前所在的追踪区间 (trace_id, span_id)；新建的任务会继承创建时的值，
+# 因此由消息处理安排的刷新会记录为该消息区间的子区间
+_current_span: contextvars.ContextVar[Optional[tuple[str, str]]] = contextvars.ContextVar(
+    'current_span', default=None
+)
+
+
+def enable_tracing(enabled: bool = True, sample: float = 1.0) -> None:
+    """
+    Args:
+        enabled (bool): 是否记录追踪区间。
+        sample (float): 根区间被记录的比例（0~1），子区间跟随其根区间。
+    """
+    global tracing_enabled, trace_sample
+    tracing_enabled = enabled
+    trace_sample = sample
+
+
+class span:
+    """
+    计时区间：结束时把耗时记入直方图，开启追踪时再以一条 DEBUG 日志输出区间信息
+    （trace_id、span_id、parent_id、名称、耗时和附加属性），
+    配合 JSON 日志格式即可按 trace_id 还原一次事件引起的全部处理过程。
+
+        with span('interviewer.message', MESSAGE_SECONDS.labels('interviewer', 'next'), room=room_id):
+            ...
+    """
+
+    __slots__ = ('name', 'histogram', 'attrs', '_start', '_ids', '_token')
+
+    def __init__(self, name: str, histogram: Optional[Any] = None, **attrs: Any) -> None:
+        """
+        Args:
+            name (str): 区间名称。
+            histogram: 记录耗时的直方图（或其子指标），为 None 时不记录。
+            **attrs: 追踪日志中附带的属性。
+        """
+        self.name = name
+        self.histogram = histogram
+        self.attrs = attrs
+        self._ids: Optional[tuple[str, str, Optional[str]]] = None
+        self._token: Optional[contextvars.Token[Optional[tuple[str, str]]]] = None
+
+    def set(self, **attrs: Any) -> None:
+        """
+        补充追踪日志中附带的属性。
+        """
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> 'span':
+        if tracing_enabled:
+            parent = _current_span.get()
+            if parent is _UNSAMPLED:
+                self._start = time.perf_counter()
+                return self
+            if parent is None and trace_sample < 1 and random.random() >= trace_sample:
+                self._token = _current_span.set(_UNSAMPLED)
+                self._start = time.perf_counter()
+                return self
+            trace_id = parent[0] if parent is not None else secrets.token_hex(8)
+            span_id = secrets.token_hex(4)
+            self._ids = (trace_id, span_id, parent[1] if parent is not None else None)
+            self._token = _current_span.set((trace_id, span_id))
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        elapsed = time.perf_counter() - self._start
+        if self.histogram is not None:
+            self.histogram.observe(elapsed)
+        if self._token is not None:
+            _current_span.reset(self._token)
+        if self._ids is None:
+            return
+        trace_id, span_id, parent_id = self._ids
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        trace_logger.debug(
+            "%s %.3fms", self.name, elapsed * 1000,
+            extra={
+                'span': self.name,
+                'trace_id': trace_id,
+                'span_id': span_id,
+                'parent_id': parent_id,
+                'duration_ms': round(elapsed * 1000, 3),
+                **self.attrs,
+            },
+        )
+
+
+async def handle_metrics_request(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, registry: Registry = REGISTRY
+) -> None:
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), 5)
+        while True:
+            line = await asyncio.wait_for(reader.readline(), 5)
+            if line in (b'\r\n', b'\n', b''):
+                break
+        parts = request_line.decode('latin-1').split()
+        path = parts[1].split('?', 1)[0] if len(parts) >= 2 else ''
+        if len(parts) >= 2 and parts[0] == 'GET' and path == '/metrics':
+            status = '200 OK'
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+            body = registry.render().encode('utf-8')
+        else:
+            status = '404 Not Found'
+            content_type = 'text/plain; charset=utf-8'
+            body = b'not found\n'
+        writer.write(
+            f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('latin-1')
+            + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_metrics(
+    host: str, port: int, registry: Registry = REGISTRY
+) -> asyncio.Server:
+    """
+    启动只提供 GET /metrics 的HTTP服务器，返回已开始监听的服务器。
+
+    Args:
+        host (str): 监听地址，默认只应绑定本机地址。
+        port (int): 监听端口。
+        registry (Registry): 导出的指标集合。
+    """
+    server = await asyncio.start_server(
+        lambda r, w: handle_metrics_request(r, w, registry), host, port
+    )
+    logger.info(f"指标服务已启动: http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,214 @@
+from websockets.asyncio.server import ServerConnection, broadcast
+from websockets.protocol import State
+
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Literal, Optional
+
+from codec import Frame
+from profiling import set_activity
+
+
+logger = logging.getLogger(__name__)
+
+# 发送队列溢出策略：
+#   - 'latest': 丢弃队列中过期的状态帧，只保留最新快照（通知系统重新同步）
+#   - 'disconnect': 直接断开该连接
+OverflowPolicy = Literal['latest', 'disconnect']
+
+
+class Outbox:
+    """
+    单个连接的有界发送队列。
+
+    发送方只把已编码的消息帧放入队列，不会等待网络写入；
+    当连接的写缓冲区空闲时消息帧直接写出，否则（包括没有底层传输的连接）
+    由该连接独立的写任务按顺序发送。
+    慢连接只会让自己的队列堆积，不会阻塞状态机或其他连接。
+    """
+
+    # 全局统计：累计发送、丢弃的帧数，因溢出断开的连接数和发送出错的次数
+    stats: dict[str, int] = {'sent': 0, 'dropped': 0, 'disconnected': 0, 'errors': 0}
+
+    # 写缓冲区低于该字节数时直接写出，不经过写任务
+    write_buffer_limit = 64 * 1024
+
+    def __init__(
+        self,
+        websocket: ServerConnection,
+        maxsize: int = 64,
+        policy: OverflowPolicy = 'latest',
+        on_resync: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """
+        Args:
+            websocket (ServerConnection): 目标连接。
+            maxsize (int): 队列中最多积压的帧数。
+            policy (OverflowPolicy): 队列溢出时的处理策略。
+            on_resync (Callable): 丢弃状态帧后调用，用于安排重新发送完整快照。
+        """
+        self.websocket = websocket
+        self.maxsize = maxsize
+        self.policy = policy
+        self.on_resync = on_resync
+        self.dropped = 0
+        self._queue: deque[tuple[Frame, bool]] = deque()  # (消息帧, 是否可丢弃)
+        self._writer: Optional[asyncio.Task[None]] = None
+        self._closed = False
+
+    @property
+    def depth(self) -> int:
+        """
+        当前积压的帧数。
+        """
+        return len(self._queue)
+
+    def put(self, frame: Frame, droppable: bool = True) -> bool:
+        """
+        发送一帧消息，不会阻塞。
+
+        Args:
+            frame (Frame): 已按连接的编码方式编码的消息帧。
+            droppable (bool): 该帧是否为可被后续快照取代的状态帧。
+
+        Returns:
+            bool: 消息帧是否被接受（写出或入队）。
+        """
+        if self._closed or self.websocket.state is not State.OPEN:
+            return False
+
+        transport = self.websocket.transport
+        if (
+            not self._queue and self._writer is None and transport is not None and
+            transport.get_write_buffer_size() < self.write_buffer_limit
+        ):
+            broadcast([self.websocket], frame)
+            Outbox.stats['sent'] += 1
+            return True
+
+        if len(self._queue) >= self.maxsize and not self._overflow(droppable):
+            return False
+
+        self._queue.append((frame, droppable))
+        if self._writer is None:
+            self._writer = asyncio.get_running_loop().create_task(self._drain())
+        return True
+
+    def _overflow(self, droppable: bool) -> bool:
+        """
+        处理队列溢出。
+
+        Returns:
+            bool: 新的消息帧是否仍应入队。
+        """
+        if self.policy == 'latest':
+            kept = deque(item for item in self._queue if not item[1])
+            dropped = len(self._queue) - len(kept) + (1 if droppable else 0)
+            self._queue = kept
+            self.dropped += dropped
+            Outbox.stats['dropped'] += dropped
+            logger.warning(
+                f"连接 {self.websocket.id} 发送队列溢出，丢弃 {dropped} 个过期状态帧"
+            )
+            if self.on_resync is not None:
+                self.on_resync()
+            if droppable:
+                return False
+            if len(self._queue) < self.maxsize:
+                return True
+
+        self._disconnect()
+        return False
+
+    def _disconnect(self) -> None:
+        dropped = len(self._queue) + 1
+        self._queue.clear()
+        self.dropped += dropped
+        Outbox.stats['dropped'] += dropped
+        Outbox.stats['disconnected'] += 1
+        self._closed = True
+        logger.warning(f"连接 {self.websocket.id} 发送过慢，断开连接")
+        asyncio.get_running_loop().create_task(
+            self.websocket.close(1013, 'send queue overflow')
+        )
+
+    async def _drain(self) -> None:
+        set_activity('outbox')
+        try:
+            while self._queue:
+                frame, _ = self._queue.popleft()
+                await self.websocket.send(frame)
+                Outbox.stats['sent'] += 1
+        except Exception as e:
+            Outbox.stats['errors'] += 1
+            logger.error(f"向连接 {self.websocket.id} 发送消息出错: {e}")
+            self._queue.clear()
+        finally:
+            self._writer = None
+
+    async def drained(self) -> None:
+        """
+        等待队列中已有的消息帧全部写出，用于在关闭连接之前送达最后的通知。
+        """
+        while self._writer is not None:
+            await asyncio.wait({self._writer})
+
+    def close(self) -> None:
+        """
+        关闭发送队列，丢弃尚未发送的消息帧。
+        """
+        self._closed = True
+        self._queue.clear()
+        if self._writer is not None:
+            self._writer.cancel()
+            self._writer = None
+
+
+_outboxes: dict[ServerConnection, Outbox] = {}
+
+
+def open_outbox(
+    websocket: ServerConnection,
+    maxsize: int = 64,
+    policy: OverflowPolicy = 'latest',
+    on_resync: Optional[Callable[[], None]] = None,
+) -> Outbox:
+    """
+    为连接创建发送队列并登记。
+    """
+    outbox = Outbox(websocket, maxsize, policy, on_resync)
+    _outboxes[websocket] = outbox
+    return outbox
+
+
+def get_outbox(websocket: ServerConnection) -> Optional[Outbox]:
+    """
+    获取连接的发送队列，连接未登记或已关闭时返回 None。
+    """
+    return _outboxes.get(websocket)
+
+
+def close_outbox(websocket: ServerConnection) -> None:
+    """
+    关闭并注销连接的发送队列。
+    """
+    outbox = _outboxes.pop(websocket, None)
+    if outbox is not None:
+        outbox.close()
+
+
+def outbox_metrics() -> dict[str, int]:
+    """
+    汇总所有发送队列的指标。
+
+    Returns:
+        dict: 包含连接数、总积压帧数、最大积压帧数以及累计发送/丢弃/断开/出错计数。
+    """
+    depths = [o.depth for o in _outboxes.values()]
+    return {
+        'connections': len(depths),
+        'queued': sum(depths),
+        'max_depth': max(depths, default=0),
+        **Outbox.stats,
+    }
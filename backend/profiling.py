@@ -0,0 +1,315 @@
+import asyncio
+import contextvars
+import cProfile
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter as Tally
+from typing import Any, Callable, Literal, Optional
+
+from metrics import Counter, Gauge, Histogram
+
+
+logger = logging.getLogger(__name__)
+
+# 性能剖析模式：
+#   - 'off': 不剖析
+#   - 'sample': 后台线程定期采样事件循环线程的调用栈，输出 collapsed 格式（可直接生成火焰图）
+#   - 'cprofile': 用 cProfile 确定性地记录每次函数调用，输出 pstats 格式，开销较大
+ProfileMode = Literal['off', 'sample', 'cprofile']
+PROFILE_MODES: tuple[ProfileMode, ...] = ('off', 'sample', 'cprofile')
+
+# 未指定 --profile 时从该环境变量读取剖析模式
+PROFILE_ENV = 'EZINTERVIEW_PROFILE'
+
+# 单个回调阻塞事件循环超过该时间（毫秒）时记录警告
+SLOW_CALLBACK_MS = 100.0
+
+# 采样模式的采样间隔（毫秒）
+SAMPLE_INTERVAL_MS = 5.0
+
+# 剖析结果按需导出的信号
+DUMP_SIGNAL = getattr(signal, 'SIGUSR1', None)
+
+# 当前任务正在进行的活动，事件循环的回调耗时按它归类；
+# 任务中设置的值会被之后创建的子任务继承，需要单独归类的任务应重新设置
+activity: contextvars.ContextVar[str] = contextvars.ContextVar('activity', default='other')
+
+CALLBACK_SECONDS = Histogram(
+    'ezinterview_loop_callback_seconds', "事件循环中每个回调（任务的每一步）的耗时（秒），仅在剖析模式下记录"
+)
+SLOW_CALLBACKS = Counter(
+    'ezinterview_loop_slow_callbacks_total', "阻塞事件循环超过阈值的回调次数，仅在剖析模式下记录"
+)
+ACTIVITY_CPU = Counter(
+    'ezinterview_loop_cpu_seconds_total', "事件循环线程按活动归类的CPU时间（秒），仅在剖析模式下记录",
+    ('activity',)
+)
+Gauge('ezinterview_loop_tasks', "事件循环中尚未结束的任务数", callback=lambda: len(asyncio.all_tasks()))
+
+
+def set_activity(name: str) -> None:
+    """
+    设置当前任务的活动名称，该任务之后每一步的耗时都归入这一活动。
+    """
+    activity.set(name)
+
+
+class LoopMonitor:
+    """
+    记录事件循环中每个回调的耗时和CPU时间。
+
+    通过替换 asyncio.Handle._run 实现，任务的每一步、定时器和 call_soon 回调都会经过这里；
+    耗时超过阈值的回调以警告记录其内容（对任务而言包括协程及其当前位置）。
+
+    这依赖 asyncio 的内部实现，安装前会检查当前事件循环的回调对象是否提供所需的属性；
+    不提供时（如 uvloop 或内部实现有变化的 Python 版本）改用 asyncio 的调试模式，
+    由事件循环自己记录超过 slow_callback_duration 的回调，不再统计单个回调的耗时和CPU时间。
+    """
+
+    def __init__(self, slow_callback: float = SLOW_CALLBACK_MS / 1000) -> None:
+        """
+        Args:
+            slow_callback (float): 慢回调阈值（秒）。
+        """
+        self.slow_callback = slow_callback
+        self._original: Optional[Callable[[asyncio.Handle], None]] = None
+        self._cpu: dict[str, Any] = {}
+        # 回退到调试模式时的事件循环及其原来的设置
+        self._debug_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._debug_settings: tuple[bool, float] = (False, 0.0)
+
+    def install(self) -> None:
+        """
+        在当前事件循环上开始记录，必须在事件循环所在的线程中调用。
+        """
+        if self._original is not None or self._debug_loop is not None:
+            return
+        loop = asyncio.get_running_loop()
+        if not handle_internals_available(loop):
+            logger.warning(
+                "当前事件循环不支持按回调统计耗时和CPU时间，改用 asyncio 调试模式记录慢回调"
+            )
+            self._debug_loop = loop
+            self._debug_settings = (loop.get_debug(), loop.slow_callback_duration)
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.slow_callback
+            return
+        original = self._original = asyncio.Handle._run  # type: ignore[attr-defined]
+        observe = CALLBACK_SECONDS.labels().observe
+        monitor = self
+
+        def _run(handle: asyncio.Handle) -> None:
+            start = time.perf_counter()
+            cpu = time.thread_time()
+            try:
+                original(handle)
+            finally:
+                elapsed = time.perf_counter() - start
+                cpu = time.thread_time() - cpu
+                context = handle._context  # type: ignore[attr-defined]
+                name = context.get(activity, 'other') if context is not None else 'other'
+                observe(elapsed)
+                monitor.charge(name, cpu)
+                if elapsed >= monitor.slow_callback:
+                    SLOW_CALLBACKS.inc()
+                    # 任务的每一步显示为任务本身，包括协程名称和当前位置
+                    target = getattr(handle._callback, '__self__', None)  # type: ignore[attr-defined]
+                    if not isinstance(target, asyncio.Task):
+                        target = handle
+                    logger.warning(
+                        f"事件循环被阻塞 {elapsed * 1000:.1f}ms（CPU {cpu * 1000:.1f}ms，"
+                        f"活动 {name}）: {target!r}"
+                    )
+
+        asyncio.Handle._run = _run  # type: ignore[attr-defined]
+
+    def charge(self, name: str, cpu: float) -> None:
+        child = self._cpu.get(name)
+        if child is None:
+            child = self._cpu[name] = ACTIVITY_CPU.labels(name)
+        child.inc(cpu)
+
+    def uninstall(self) -> None:
+        if self._original is not None:
+            asyncio.Handle._run = self._original  # type: ignore[attr-defined]
+            self._original = None
+        if self._debug_loop is not None:
+            debug, self._debug_loop.slow_callback_duration = self._debug_settings
+            self._debug_loop.set_debug(debug)
+            self._debug_loop = None
+
+
+def handle_internals_available(loop: asyncio.AbstractEventLoop) -> bool:
+    """
+    事件循环的回调对象是否为 asyncio.Handle 并提供 LoopMonitor 依赖的内部属性
+    （Handle._run、handle._callback 和 handle._context）。
+    """
+    if not callable(getattr(asyncio.Handle, '_run', None)):
+        return False
+    probe = loop.call_soon(lambda: None)
+    try:
+        return isinstance(probe, asyncio.Handle) and all(
+            hasattr(probe, name) for name in ('_callback', '_context')
+        )
+    finally:
+        probe.cancel()
+
+
+class StackSampler:
+    """
+    后台线程每隔 interval 秒采样一次目标线程的调用栈，按完整调用栈计数。
+
+    采样只读取帧对象，不影响事件循环线程；
+    事件循环被长时间阻塞时，采样线程仍能按解释器的线程切换间隔取得采样。
+    """
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL_MS / 1000) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Tally[str] = Tally()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                name = getattr(code, 'co_qualname', code.co_name)
+                stack.append(f'{os.path.basename(code.co_filename)}:{name}')
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                key = ';'.join(stack)
+                with self._lock:
+                    self.stacks[key] += 1
+
+    def dump(self, path: str) -> None:
+        """
+        以 collapsed 格式（每行 "帧;帧;帧 采样数"）写出目前为止的采样结果。
+        """
+        with self._lock:
+            stacks = self.stacks.most_common()
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in stacks:
+                f.write(f'{stack} {count}\n')
+
+
+class Profiler:
+    """
+    当前进程的剖析器：在事件循环线程中启动，按需或在退出时导出结果。
+    """
+
+    def __init__(
+        self,
+        mode: ProfileMode,
+        output_dir: str = '.',
+        slow_callback: float = SLOW_CALLBACK_MS / 1000,
+        interval: float = SAMPLE_INTERVAL_MS / 1000,
+    ) -> None:
+        """
+        Args:
+            mode (ProfileMode): 剖析模式。
+            output_dir (str): 剖析结果的输出目录。
+            slow_callback (float): 慢回调阈值（秒）。
+            interval (float): 采样模式的采样间隔（秒）。
+        """
+        self.mode = mode
+        self.output_dir = output_dir
+        self.interval = interval
+        self.monitor = LoopMonitor(slow_callback)
+        self._sampler: Optional[StackSampler] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._dumps = 0
+
+    def start(self) -> None:
+        """
+        开始剖析，必须在事件循环所在的线程中调用。
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.monitor.install()
+        if self.mode == 'sample':
+            self._sampler = StackSampler(threading.get_ident(), self.interval)
+            self._sampler.start()
+        elif self.mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        logger.info(f"性能剖析已开启，模式: {self.mode}，结果输出到 {self.output_dir}")
+
+    def dump(self) -> Optional[str]:
+        """
+        导出目前为止的剖析结果，剖析继续进行。
+
+        Returns:
+            str: 输出文件路径，没有可导出的结果时为 None。
+        """
+        self._dumps += 1
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        base = os.path.join(self.output_dir, f'profile-{os.getpid()}-{stamp}-{self._dumps}')
+        try:
+            if self._sampler is not None:
+                path = base + '.collapsed'
+                self._sampler.dump(path)
+            elif self._profile is not None:
+                path = base + '.pstats'
+                # 生成统计数据时 cProfile 会停止记录，导出后重新开启
+                pstats.Stats(self._profile).dump_stats(path)
+                self._profile.enable()
+            else:
+                return None
+        except OSError as e:
+            logger.error(f"导出剖析结果失败: {e}")
+            return None
+        logger.info(f"剖析结果已导出到 {path}")
+        return path
+
+    def stop(self) -> None:
+        """
+        停止剖析并导出最终结果。
+        """
+        self.dump()
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler = None
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile = None
+        self.monitor.uninstall()
+
+
+def start_profiling(
+    mode: ProfileMode,
+    output_dir: str = '.',
+    slow_callback_ms: float = SLOW_CALLBACK_MS,
+    interval_ms: float = SAMPLE_INTERVAL_MS,
+) -> Optional[Profiler]:
+    """
+    在当前事件循环中开启剖析，收到 SIGUSR1（在支持的平台上）时导出结果。
+
+    Returns:
+        Profiler: 已启动的剖析器，mode 为 'off' 时为 None。
+    """
+    if mode == 'off':
+        return None
+    profiler = Profiler(mode, output_dir, slow_callback_ms / 1000, interval_ms / 1000)
+    profiler.start()
+    if DUMP_SIGNAL is not None:
+        try:
+            asyncio.get_running_loop().add_signal_handler(DUMP_SIGNAL, profiler.dump)
+        except (NotImplementedError, RuntimeError):
+            pass
+    return profiler
@@ -0,0 +1,277 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Iterable, Iterator, NamedTuple, Optional, Union
+
+
+logger = logging.getLogger(__name__)
+
+
+class Question(NamedTuple):
+    """
+    题库中的一道题。
+    """
+    main: str  # 给面试官端的题目正文
+    keywords: str  # 给面试官端的题目要点
+    hint: str  # 给被面试者端的提示文字
+    category: str = ''
+    tags: tuple[str, ...] = ()
+    id: str = ''  # 题目的稳定标识，题库重新加载后题目的索引可能变化，标识不变
+
+
+def question_id(main: str) -> str:
+    """
+    没有指定标识的题目按正文生成标识，正文修改后视为另一道题。
+    """
+    return hashlib.sha1(main.encode('utf-8')).hexdigest()[:12]
+
+
+class QuestionBank:
+    """
+    一次加载得到的只读题库，题目以在文件中的顺序作为索引（从0开始）。
+
+    - 按标签和分类建立倒排索引，查询只与结果数量有关
+    - 每道题发给面试官的字段在第一次使用时编码为JSON片段并缓存，
+      所有题目正文组成的 questionMains 字段也只编码一次
+    """
+
+    def __init__(
+        self,
+        questions: list[Question],
+        startup: Optional[list[int]] = None,
+        version: int = 0,
+    ) -> None:
+        """
+        Args:
+            questions (list[Question]): 题目列表。
+            startup (list[int]): 每场面试默认选中的题目索引，缺省时为所有偶数索引的题目。
+            version (int): 题库版本号，每次重新加载加一。
+        """
+        self.questions = questions
+        self.version = version
+        if startup is None:
+            startup = [i for i in range(len(questions)) if i % 2 == 0]
+        self.startup = startup
+        self._by_tag: dict[str, list[int]] = {}
+        self._by_category: dict[str, list[int]] = {}
+        for i, q in enumerate(questions):
+            for tag in q.tags:
+                self._by_tag.setdefault(tag, []).append(i)
+            if q.category:
+                self._by_category.setdefault(q.category, []).append(i)
+        self._fragments: dict[int, str] = {}
+        self._mains_fragment: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def __getitem__(self, index: int) -> Question:
+        return self.questions[index]
+
+    def __iter__(self) -> Iterator[Question]:
+        return iter(self.questions)
+
+    def ids(self, indices: Iterable[int]) -> list[str]:
+        """
+        题目索引对应的稳定标识。
+        """
+        return [self.questions[i].id for i in indices]
+
+    def with_tag(self, tag: str) -> list[int]:
+        """
+        带有某个标签的题目索引，按索引升序排列。
+        """
+        return list(self._by_tag.get(tag, ()))
+
+    def in_category(self, category: str) -> list[int]:
+        """
+        属于某个分类的题目索引，按索引升序排列。
+        """
+        return list(self._by_category.get(category, ()))
+
+    def tags(self) -> list[str]:
+        return sorted(self._by_tag)
+
+    def categories(self) -> list[str]:
+        return sorted(self._by_category)
+
+    def fragment(self, index: int) -> str:
+        """
+        题目正文、要点和提示编码后的JSON片段（不含花括号），可直接拼接进消息帧。
+        """
+        fragment = self._fragments.get(index)
+        if fragment is None:
+            q = self.questions[index]
+            fragment = json.dumps({
+                'questionMain': q.main,
+                'questionKeywords': q.keywords,
+                'questionHint': q.hint,
+            })[1:-1]
+            self._fragments[index] = fragment
+        return fragment
+
+    def mains_fragment(self) -> str:
+        """
+        所有题目正文组成的 questionMains 字段编码后的JSON片段。
+        """
+        if self._mains_fragment is None:
+            self._mains_fragment = json.dumps(
+                {'questionMains': [q.main for q in self.questions]}
+            )[1:-1]
+        return self._mains_fragment
+
+
+def load_bank(path: str, version: int = 0) -> QuestionBank:
+    """
+    从JSON文件加载题库。文件格式：
+
+        {
+          "questions": [
+            {"id": "...", "main": "...", "keywords": "...", "hint": "...",
+             "category": "...", "tags": ["..."]}
+          ],
+          "startup": [0, 2]
+        }
+
+    id、category、tags 和 startup 均可省略；id 用于在题库修改前后识别同一道题，
+    面试结果和耗时统计都按 id 汇总，省略时按题目正文生成。
+
+    Raises:
+        OSError: 文件无法读取。
+        ValueError: 文件内容不合法。
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get('questions'), list):
+        raise ValueError("题库文件缺少 questions 列表")
+
+    questions = []
+    ids: dict[str, int] = {}
+    for i, item in enumerate(data['questions']):
+        if not isinstance(item, dict):
+            raise ValueError(f"第 {i} 道题不是对象")
+        fields = [item.get(k) for k in ('main', 'keywords', 'hint')]
+        if not all(isinstance(v, str) for v in fields):
+            raise ValueError(f"第 {i} 道题缺少 main、keywords 或 hint")
+        category = item.get('category', '')
+        tags = item.get('tags', [])
+        if not isinstance(category, str) or not isinstance(tags, list) or not all(
+            isinstance(t, str) for t in tags
+        ):
+            raise ValueError(f"第 {i} 道题的 category 或 tags 不合法")
+        id = item.get('id', question_id(fields[0]))
+        if not isinstance(id, str) or not id:
+            raise ValueError(f"第 {i} 道题的 id 不合法")
+        if id in ids:
+            raise ValueError(f"第 {i} 道题的 id {id!r} 与第 {ids[id]} 道题重复")
+        ids[id] = i
+        questions.append(Question(*fields, category, tuple(tags), id))
+    if not questions:
+        raise ValueError("题库为空")
+
+    startup = data.get('startup')
+    if startup is not None:
+        if not isinstance(startup, list) or not startup or not all(
+            isinstance(s, int) and 0 <= s < len(questions) for s in startup
+        ):
+            raise ValueError("startup 必须是非空的合法题目索引列表")
+        startup = sorted(set(startup))
+    return QuestionBank(questions, startup, version)
+
+
+class QuestionCatalog:
+    """
+    从文件加载的题库，支持在不重启服务的情况下热重载。
+
+    重新加载只替换 current 指向的题库对象，已经引用旧题库的面试不受影响；
+    新文件不合法时保留原来的题库。服务运行时在线程中读取和解析文件，不阻塞事件循环。
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): 题库JSON文件路径。
+        """
+        self.path = path
+        self.current = load_bank(path)
+        self._mtime = self._stat()
+        self._lock = asyncio.Lock()  # 后台加载依次进行，后读到的文件总是后生效
+        self._reload_task: Optional[asyncio.Task[bool]] = None
+        logger.info(f"已加载题库 {path}，共 {len(self.current)} 道题")
+
+    def _stat(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def _read(self) -> tuple[Optional[float], Union[QuestionBank, Exception]]:
+        """
+        读取并解析题库文件，可以在其他线程中调用。
+
+        Returns:
+            tuple: 读取前的文件修改时间，以及解析得到的题库或出错的异常。
+        """
+        mtime = self._stat()
+        try:
+            return mtime, load_bank(self.path)
+        except (OSError, ValueError) as e:
+            return mtime, e
+
+    def _apply(self, mtime: Optional[float], result: Union[QuestionBank, Exception]) -> bool:
+        self._mtime = mtime
+        if isinstance(result, Exception):
+            logger.error(f"重新加载题库 {self.path} 失败，继续使用原题库: {result}")
+            return False
+        result.version = self.current.version + 1
+        self.current = result
+        logger.info(
+            f"已重新加载题库 {self.path}，共 {len(result)} 道题，版本 {result.version}"
+        )
+        return True
+
+    def reload(self) -> bool:
+        """
+        重新加载题库文件。
+
+        Returns:
+            bool: 是否加载成功。
+        """
+        return self._apply(*self._read())
+
+    async def areload(self) -> bool:
+        """
+        与 reload 相同，但在线程中读取和解析文件，只在事件循环中替换题库。
+        """
+        async with self._lock:
+            return self._apply(*await asyncio.to_thread(self._read))
+
+    def schedule_reload(self) -> None:
+        """
+        在后台重新加载题库，供 SIGHUP 的信号处理函数调用；正在加载时不重复加载。
+        """
+        if self._reload_task is None or self._reload_task.done():
+            self._reload_task = asyncio.get_running_loop().create_task(self.areload())
+
+    async def check(self) -> bool:
+        """
+        文件修改时间发生变化时在后台重新加载。
+
+        Returns:
+            bool: 是否加载了新题库。
+        """
+        async with self._lock:
+            mtime = await asyncio.to_thread(self._stat)
+            if mtime == self._mtime:
+                return False
+            return self._apply(*await asyncio.to_thread(self._read))
+
+    async def run_watcher(self, interval: float = 5) -> None:
+        """
+        后台任务，每隔 interval 秒检查一次题库文件是否被修改。
+        """
+        while True:
+            await asyncio.sleep(interval)
+            await self.check()
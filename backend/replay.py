@@ -0,0 +1,420 @@
+from websockets.asyncio.client import connect
+from websockets.protocol import State
+
+import argparse
+import asyncio
+import heapq
+import json
+import logging
+import time
+import uuid
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from codec import CODECS, JSON_CODEC, Codec, Frame
+from loadtest import git_commit, percentile
+from traffic_capture import read_trace
+
+if TYPE_CHECKING:
+    # 只有 memory 模式才加载服务端模块
+    from server import InterviewServer
+
+
+logger = logging.getLogger(__name__)
+
+ROLE_PORTS = {'interviewee': 9009, 'interviewer': 9008}
+
+
+def merge_traces(paths: list[str]) -> Iterator[tuple[float, int, dict[str, Any]]]:
+    """
+    按时间顺序合并多个跟踪文件（例如多进程模式下各工作进程的文件）。
+
+    Returns:
+        Iterator: (相对最早的文件开始时间的秒数, 文件序号, 记录)。
+    """
+    traces = [read_trace(path) for path in paths]
+    base = min(header['started'] for header, _ in traces)
+
+    def timed(index: int, offset: float, records: Iterator[dict[str, Any]]):
+        for record in records:
+            yield offset + record['t'], index, record
+
+    streams = [
+        timed(i, header['started'] - base, records)
+        for i, (header, records) in enumerate(traces)
+    ]
+    return heapq.merge(*streams, key=lambda item: item[0])
+
+
+def message_type(codec: Codec, message: Frame) -> str:
+    try:
+        data = codec.decode(message)
+    except ValueError:
+        return 'undecodable'
+    kind = data.get('type') if isinstance(data, dict) else None
+    return kind if isinstance(kind, str) else 'other'
+
+
+class Transition:
+    """
+    一种状态转换（按角色和消息类型区分）的统计。
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.output_frames = 0
+        self.latencies: list[float] = []
+
+
+class Replayer:
+    """
+    按跟踪文件中的时间间隔（除以 speed）把消息重新发给服务，并统计每次状态转换的延迟和输出帧数。
+
+    每条注入的消息（以及连接的建立和断开）是一次状态转换；在下一次注入之前服务发出的消息帧
+    都计入这次转换，延迟为注入到其中最后一帧发出（live 模式为收到）的时间。
+    加速回放时转换之间可能重叠，此时后续转换的输出会被计入更早的转换。
+    """
+
+    def __init__(self, speed: float) -> None:
+        self.speed = speed
+        self.transitions: dict[str, Transition] = {}
+        self.connections: dict[tuple[int, int], 'ReplayConnection'] = {}
+        # 录制时的恢复令牌 -> 回放时服务重新发放的令牌
+        self.tokens: dict[str, str] = {}
+        self.inbound = 0
+        self.outbound = 0
+        self.outbound_bytes = 0
+        self.max_lag = 0.0
+        self._current: Optional[Transition] = None
+        self._started = 0.0
+        self._frames = 0
+        self._last = 0.0
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def begin(self, name: str) -> None:
+        """
+        开始一次新的状态转换，结束上一次转换的统计。
+        """
+        self.finish()
+        transition = self.transitions.get(name)
+        if transition is None:
+            transition = self.transitions[name] = Transition()
+        transition.count += 1
+        self._current = transition
+        self._started = time.perf_counter()
+        self._frames = 0
+
+    def finish(self) -> None:
+        if self._current is not None and self._frames:
+            self._current.output_frames += self._frames
+            self._current.latencies.append(self._last - self._started)
+        self._current = None
+
+    def output(self, connection: 'ReplayConnection', frame: bytes | str) -> None:
+        """
+        服务向回放连接发出（或回放连接收到）一帧消息。
+        """
+        self.outbound += 1
+        self.outbound_bytes += len(frame)
+        if self._current is not None:
+            self._frames += 1
+            self._last = time.perf_counter()
+        if connection.awaiting_session:
+            # 新会话的第一帧是服务发放的恢复令牌，记下新旧令牌的对应关系
+            connection.awaiting_session = False
+            try:
+                data = connection.codec.decode(frame)
+            except ValueError:
+                return
+            if isinstance(data, dict) and data.get('type') == 'session':
+                self.tokens[connection.recorded_token] = data['token']
+
+    def rewrite_path(self, path: str) -> str:
+        """
+        将重连请求中录制时的恢复令牌换成回放时对应的令牌。
+        """
+        parts = urlsplit(path)
+        query = [
+            (k, self.tokens.get(v, v) if k == 'token' else v)
+            for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        ]
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+    def spawn(self, coro: Any) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def open(self, key: tuple[int, int], record: dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    async def run(self, paths: list[str], settle: float) -> float:
+        """
+        回放所有记录，返回跟踪文件覆盖的时长（秒）。
+        """
+        start = time.perf_counter()
+        offset = 0.0
+        for offset, index, record in merge_traces(paths):
+            due = start + offset / self.speed
+            delay = due - time.perf_counter()
+            if delay < 0:
+                self.max_lag = max(self.max_lag, -delay)
+            # 已经落后时也让出一次事件循环，让服务先处理之前的消息
+            await asyncio.sleep(max(delay, 0))
+            key = (index, record['c'])
+            if record.get('k') == 'open':
+                self.open(key, record)
+                continue
+            connection = self.connections.get(key)
+            if connection is None:
+                continue
+            if record.get('k') == 'close':
+                del self.connections[key]
+                connection.shutdown()
+            else:
+                message = record['m'] if 'm' in record else record['b']
+                self.inbound += 1
+                connection.deliver(message_type(connection.codec, message), message)
+        await asyncio.sleep(settle)
+        self.finish()
+        for connection in self.connections.values():
+            connection.shutdown()
+        self.connections.clear()
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=settle + 5)
+        return offset
+
+    def report(self) -> dict[str, Any]:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            'inboundFrames': self.inbound,
+            'outboundFrames': self.outbound,
+            'outboundBytes': self.outbound_bytes,
+            'maxLagMs': ms(self.max_lag),
+            'transitions': {
+                name: {
+                    'count': t.count,
+                    'outputFrames': t.output_frames,
+                    'p50Ms': ms(percentile(t.latencies, 50)),
+                    'p95Ms': ms(percentile(t.latencies, 95)),
+                    'p99Ms': ms(percentile(t.latencies, 99)),
+                    'maxMs': ms(max(t.latencies, default=None)),
+                }
+                for name, t in sorted(self.transitions.items())
+            },
+        }
+
+
+class ReplayConnection:
+    """
+    回放中的一个客户端连接。
+    """
+
+    def __init__(self, replayer: Replayer, record: dict[str, Any]) -> None:
+        self.replayer = replayer
+        self.role = record['role']
+        self.path = replayer.rewrite_path(record['path'])
+        self.subprotocol: Optional[str] = record.get('proto')
+        self.codec = JSON_CODEC if self.subprotocol is None else CODECS[self.subprotocol]
+        self.recorded_token: Optional[str] = record.get('token')
+        # 录制时没有凭这个令牌恢复会话，说明是新会话，等待服务发放的新令牌
+        resumed = dict(parse_qsl(urlsplit(record['path']).query)).get('token')
+        self.awaiting_session = self.recorded_token is not None and resumed != self.recorded_token
+
+    def deliver(self, kind: str, message: Frame) -> None:
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryConnection(ReplayConnection):
+    """
+    内存中的假连接，直接交给服务的连接处理函数，实现了服务用到的 ServerConnection 接口。
+    """
+
+    def __init__(self, replayer: Replayer, record: dict[str, Any]) -> None:
+        super().__init__(replayer, record)
+        self.id = uuid.uuid4()
+        self.request = SimpleNamespace(path=self.path)
+        self.transport = None  # 没有底层传输，服务的发送队列经由 send 写出消息
+        self.state = State.OPEN
+        self.close_code: Optional[int] = None
+        self._inbox: asyncio.Queue[Optional[Frame]] = asyncio.Queue()
+
+    async def send(self, message: Frame) -> None:
+        self.replayer.output(self, message)
+
+    async def close(self, code: int = 1000, reason: str = '') -> None:
+        if self.state is State.OPEN:
+            self.state = State.CLOSED
+            self.close_code = code
+            self._inbox.put_nowait(None)
+
+    def __aiter__(self) -> 'MemoryConnection':
+        return self
+
+    async def __anext__(self) -> Frame:
+        message = await self._inbox.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    def deliver(self, kind: str, message: Frame) -> None:
+        if self.state is State.OPEN:
+            self.replayer.begin(f'{self.role}.{kind}')
+            self._inbox.put_nowait(message)
+
+    def shutdown(self) -> None:
+        if self.state is State.OPEN:
+            self.replayer.begin(f'{self.role}.close')
+            self.replayer.spawn(self.close())
+
+
+class MemoryReplayer(Replayer):
+    """
+    在本进程中运行服务的状态机，所有连接都是内存中的假连接，不经过网络。
+    """
+
+    def __init__(self, speed: float, server: 'InterviewServer') -> None:
+        super().__init__(speed)
+        self.server = server
+
+    def open(self, key: tuple[int, int], record: dict[str, Any]) -> None:
+        server = self.server
+        connection = MemoryConnection(self, record)
+        self.connections[key] = connection
+        self.begin(f'{connection.role}.open')
+        if record['role'] == 'interviewee':
+            self.spawn(server.interviewee_handler(connection))  # type: ignore[arg-type]
+        else:
+            # 旁观者同样由面试官的处理函数接收，按请求路径转交 observer_handler
+            self.spawn(server.interviewer_handler(connection))  # type: ignore[arg-type]
+
+
+class LiveConnection(ReplayConnection):
+    """
+    连接到正在运行的服务的真实客户端连接，按录制顺序发送消息。
+    """
+
+    def __init__(self, replayer: 'LiveReplayer', record: dict[str, Any]) -> None:
+        super().__init__(replayer, record)
+        # 旁观者与面试官连接同一个端口，由请求路径区分
+        port = replayer.ports['interviewer' if self.role == 'observer' else self.role]
+        self.url = f'ws://{replayer.host}:{port}{self.path}'
+        self._outbox: asyncio.Queue[Optional[tuple[str, Frame]]] = asyncio.Queue()
+        replayer.spawn(self.run())
+
+    async def run(self) -> None:
+        options = {} if self.subprotocol is None else {'subprotocols': [self.subprotocol]}
+        self.replayer.begin(f'{self.role}.open')
+        try:
+            async with connect(self.url, open_timeout=30, **options) as ws:  # type: ignore[arg-type]
+                reader = asyncio.create_task(self.read(ws))
+                try:
+                    while (item := await self._outbox.get()) is not None:
+                        self.replayer.begin(f'{self.role}.{item[0]}')
+                        await ws.send(item[1])
+                    self.replayer.begin(f'{self.role}.close')
+                finally:
+                    reader.cancel()
+        except Exception as e:
+            logger.warning(f"回放连接 {self.url} 出错: {e}")
+
+    async def read(self, ws: Any) -> None:
+        async for message in ws:
+            self.replayer.output(self, message)
+
+    def deliver(self, kind: str, message: Frame) -> None:
+        self._outbox.put_nowait((kind, message))
+
+    def shutdown(self) -> None:
+        self._outbox.put_nowait(None)
+
+
+class LiveReplayer(Replayer):
+    """
+    通过网络把消息发给正在运行的服务，输出帧在客户端收到时计数。
+    """
+
+    def __init__(self, speed: float, host: str, ports: dict[str, int]) -> None:
+        super().__init__(speed)
+        self.host = host
+        self.ports = ports
+
+    def open(self, key: tuple[int, int], record: dict[str, Any]) -> None:
+        self.connections[key] = LiveConnection(self, record)
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    replayer: Replayer
+    if args.target == 'memory':
+        import main
+        server = main.configure(main.parse_args(args.server_args))
+        replayer = MemoryReplayer(args.speed, server)
+    else:
+        replayer = LiveReplayer(args.speed, args.host, {
+            'interviewee': args.interviewee_port, 'interviewer': args.interviewer_port
+        })
+    started = time.perf_counter()
+    try:
+        duration = await replayer.run(args.traces, args.settle)
+    finally:
+        if args.target == 'memory':
+            server.rooms.close_all()
+    elapsed = time.perf_counter() - started
+    return {
+        'commit': git_commit(),
+        'timestamp': time.time(),
+        'params': {
+            'traces': args.traces,
+            'speed': args.speed,
+            'target': args.target,
+            'serverArgs': args.server_args if args.target == 'memory' else None,
+        },
+        'metrics': {
+            'traceSeconds': round(duration, 3),
+            'elapsedSeconds': round(elapsed, 3),
+            **replayer.report(),
+        },
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="回放 main.py --capture 记录的流量")
+    parser.add_argument('traces', nargs='+', help="跟踪文件，多个文件（如各工作进程的文件）按时间合并回放")
+    parser.add_argument('--speed', type=float, default=1.0, help="回放速度倍数，例如 10 表示10倍速")
+    parser.add_argument(
+        '--target', choices=['memory', 'live'], default='memory',
+        help="memory: 在本进程中用内存中的假连接驱动服务；live: 连接到正在运行的服务"
+    )
+    parser.add_argument('--host', default='127.0.0.1', help="live 模式下服务的地址")
+    parser.add_argument('--interviewee-port', type=int, default=ROLE_PORTS['interviewee'])
+    parser.add_argument('--interviewer-port', type=int, default=ROLE_PORTS['interviewer'])
+    parser.add_argument('--settle', type=float, default=1.0, help="最后一条记录之后等待服务输出的时间（秒）")
+    parser.add_argument('--output', default=None, help="将结果以JSON Lines格式追加写入该文件")
+    parser.add_argument(
+        '--server-args', nargs=argparse.REMAINDER, default=[],
+        help="memory 模式下传给服务的启动参数（同 main.py），必须放在最后"
+    )
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed 必须大于0")
+    return args
+
+
+def main() -> None:
+    args = parse_args()
+    result = asyncio.run(run(args))
+    line = json.dumps(result, ensure_ascii=False)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.output is not None:
+        with open(args.output, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,357 @@
+import argparse
+import asyncio
+import concurrent.futures
+import csv
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Iterator, Optional, TextIO
+
+
+logger = logging.getLogger(__name__)
+
+# 所有结果存储共用的写入线程；同一存储同时最多只有一批在写
+_writer = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='results-store')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    room_id TEXT NOT NULL,
+    candidate TEXT NOT NULL,
+    question INTEGER NOT NULL,
+    question_id TEXT NOT NULL,
+    rating REAL,
+    comment TEXT NOT NULL DEFAULT '',
+    hint INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (room_id, candidate, question)
+);
+CREATE INDEX IF NOT EXISTS idx_results_question_rating ON results (question_id, rating);
+CREATE INDEX IF NOT EXISTS idx_results_candidate ON results (candidate);
+
+CREATE TABLE IF NOT EXISTS candidates (
+    room_id TEXT NOT NULL,
+    candidate TEXT NOT NULL,
+    finished_at REAL,
+    PRIMARY KEY (room_id, candidate)
+);
+
+-- 每道题的评分汇总，按题目的稳定标识由触发器增量维护，查询平均分时无需扫描全表
+-- （触发器内的冲突策略会被外层 upsert 覆盖，因此用 NOT EXISTS 代替 INSERT OR IGNORE）
+CREATE TABLE IF NOT EXISTS question_stats (
+    question_id TEXT PRIMARY KEY,
+    rating_sum REAL NOT NULL DEFAULT 0,
+    rating_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS results_stats_insert AFTER INSERT ON results
+WHEN NEW.rating IS NOT NULL
+BEGIN
+    INSERT INTO question_stats (question_id) SELECT NEW.question_id
+    WHERE NOT EXISTS (SELECT 1 FROM question_stats WHERE question_id = NEW.question_id);
+    UPDATE question_stats
+    SET rating_sum = rating_sum + NEW.rating, rating_count = rating_count + 1
+    WHERE question_id = NEW.question_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS results_stats_update AFTER UPDATE OF rating, question_id ON results
+BEGIN
+    UPDATE question_stats
+    SET rating_sum = rating_sum - OLD.rating, rating_count = rating_count - 1
+    WHERE question_id = OLD.question_id AND OLD.rating IS NOT NULL;
+    INSERT INTO question_stats (question_id) SELECT NEW.question_id
+    WHERE NEW.rating IS NOT NULL
+    AND NOT EXISTS (SELECT 1 FROM question_stats WHERE question_id = NEW.question_id);
+    UPDATE question_stats
+    SET rating_sum = rating_sum + NEW.rating, rating_count = rating_count + 1
+    WHERE question_id = NEW.question_id AND NEW.rating IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS results_stats_delete AFTER DELETE ON results
+WHEN OLD.rating IS NOT NULL
+BEGIN
+    UPDATE question_stats
+    SET rating_sum = rating_sum - OLD.rating, rating_count = rating_count - 1
+    WHERE question_id = OLD.question_id;
+END;
+"""
+
+EXPORT_COLUMNS = [
+    'room_id', 'candidate', 'question', 'question_id', 'rating', 'comment', 'hint', 'updated_at'
+]
+
+
+class ResultsStore:
+    """
+    面试结果存储，按 (房间, 面试者, 题目索引) 保存每道题的评分、评语和提示情况。
+
+    题目索引只在一场面试所用的题库内有意义，题库重新加载后可能指向另一道题；
+    跨面试的查询和汇总都按同时保存的题目稳定标识（Question.id）进行。
+
+    数据保存在SQLite中：
+    - 按题目和评分建立索引，“某道题评分不低于x的面试者”之类的查询只需走索引
+    - 每道题的评分总和与数量由触发器增量维护，平均分查询为常数时间
+    - 导出时逐行读取游标，内存占用与数据量无关
+    - 在事件循环中写入的结果先进入缓冲区，提交窗口结束后由后台线程在一个事务中写入（组提交），
+      不会阻塞事件循环；查询前会先写入缓冲区中的结果
+    """
+
+    def __init__(self, path: str = ':memory:', commit_interval: float = 0.05) -> None:
+        """
+        Args:
+            path (str): SQLite数据库文件路径，默认为内存数据库。
+            commit_interval (float): 组提交窗口（秒）。
+        """
+        self.path = path
+        self.commit_interval = commit_interval
+        self._buffer: list[tuple[str, tuple[Any, ...]]] = []  # 尚未写入的 (SQL, 参数)
+        self._commit_task: Optional[asyncio.Task[None]] = None
+        self._inflight: Optional[concurrent.futures.Future[None]] = None  # 正在后台写入的一批
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=5
+        )
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def record(
+        self,
+        room_id: str,
+        candidate: str,
+        question: int,
+        question_id: str,
+        rating: Any,
+        comment: str,
+        hint: bool,
+    ) -> None:
+        """
+        写入或更新某位面试者在某道题上的结果；在事件循环中调用时于提交窗口结束后写入。
+
+        Args:
+            room_id (str): 房间号。
+            candidate (str): 面试者ID。
+            question (int): 题目索引（面试所用题库中的绝对索引，从0开始）。
+            question_id (str): 题目的稳定标识。
+            rating: 评分，非数字的评分按未评分处理。
+            comment (str): 评语。
+            hint (bool): 是否向面试者展示过提示。
+        """
+        if isinstance(rating, bool) or not isinstance(rating, (int, float)):
+            rating = None
+        self._execute(
+            'INSERT INTO results '
+            '(room_id, candidate, question, question_id, rating, comment, hint, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(room_id, candidate, question) DO UPDATE SET '
+            'question_id = excluded.question_id, rating = excluded.rating, '
+            'comment = excluded.comment, hint = excluded.hint, updated_at = excluded.updated_at',
+            (room_id, candidate, question, question_id, rating, str(comment), int(hint), time.time())
+        )
+
+    def finish(self, room_id: str, candidate: str) -> None:
+        """
+        记录面试者完成面试的时间；在事件循环中调用时于提交窗口结束后写入。
+        """
+        self._execute(
+            'INSERT INTO candidates (room_id, candidate, finished_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(room_id, candidate) DO UPDATE SET finished_at = excluded.finished_at',
+            (room_id, candidate, time.time())
+        )
+
+    def _execute(self, sql: str, params: tuple[Any, ...]) -> None:
+        self._buffer.append((sql, params))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 不在事件循环中（如命令行工具），直接同步写入
+            self.flush()
+            return
+        if self._commit_task is None:
+            self._commit_task = loop.create_task(self._commit())
+
+    async def _commit(self) -> None:
+        try:
+            await asyncio.sleep(self.commit_interval)
+            while self._buffer:
+                batch = self._buffer
+                self._buffer = []
+                self._inflight = _writer.submit(self._write, batch)
+                # 任务被取消时不能连带取消这次写入，flush 会等待它完成
+                await asyncio.shield(asyncio.wrap_future(self._inflight))
+                self._inflight = None
+        except Exception as e:
+            logger.error(f"写入面试结果 {self.path} 出错: {e}")
+        finally:
+            self._commit_task = None
+
+    def _write(self, batch: list[tuple[str, tuple[Any, ...]]]) -> None:
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                for sql, params in batch:
+                    self._conn.execute(sql, params)
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def flush(self) -> None:
+        """
+        同步写入缓冲区中的结果；正在后台写入的一批会先写完。
+        """
+        if self._commit_task is not None:
+            self._commit_task.cancel()
+            self._commit_task = None
+        if self._inflight is not None:
+            try:
+                self._inflight.result()
+            except Exception as e:
+                logger.error(f"写入面试结果 {self.path} 出错: {e}")
+            self._inflight = None
+        batch = self._buffer
+        self._buffer = []
+        if batch:
+            self._write(batch)
+
+    def candidates_with_rating(
+        self, question_id: str, min_rating: float, room_id: Optional[str] = None
+    ) -> list[tuple[str, str, float]]:
+        """
+        查询某道题（按稳定标识）评分不低于 min_rating 的面试者。
+
+        Returns:
+            list: (房间号, 面试者ID, 评分) 列表，按评分从高到低排序。
+        """
+        sql = (
+            'SELECT room_id, candidate, rating FROM results '
+            'WHERE question_id = ? AND rating >= ?'
+        )
+        params: list[Any] = [question_id, min_rating]
+        if room_id is not None:
+            sql += ' AND room_id = ?'
+            params.append(room_id)
+        sql += ' ORDER BY rating DESC'
+        self.flush()
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def average_ratings(self) -> dict[str, tuple[float, int]]:
+        """
+        每道题的平均评分。
+
+        Returns:
+            dict: 题目的稳定标识 -> (平均分, 评分数量)，没有评分的题目不出现。
+        """
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT question_id, rating_sum, rating_count FROM question_stats '
+                'WHERE rating_count > 0 ORDER BY question_id'
+            ).fetchall()
+        return {q: (total / count, count) for q, total, count in rows}
+
+    def candidate_results(self, candidate: str) -> list[dict[str, Any]]:
+        """
+        查询某位面试者所有题目的结果。
+        """
+        self.flush()
+        with self._lock:
+            cursor = self._conn.execute(
+                f'SELECT {", ".join(EXPORT_COLUMNS)} FROM results '
+                'WHERE candidate = ? ORDER BY question', (candidate,)
+            )
+            return [dict(zip(EXPORT_COLUMNS, row)) for row in cursor]
+
+    def iter_results(self, batch_size: int = 1000) -> Iterator[tuple[Any, ...]]:
+        """
+        按 (房间, 面试者, 题目) 顺序逐行遍历所有结果，每次只从数据库读取一批。
+        """
+        self.flush()
+        cursor = self._conn.cursor()
+        cursor.execute(
+            f'SELECT {", ".join(EXPORT_COLUMNS)} FROM results '
+            'ORDER BY room_id, candidate, question'
+        )
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+
+    def export_csv(self, out: TextIO) -> int:
+        """
+        以CSV格式流式导出所有结果。
+
+        Returns:
+            int: 导出的行数。
+        """
+        writer = csv.writer(out)
+        writer.writerow(EXPORT_COLUMNS)
+        count = 0
+        for row in self.iter_results():
+            writer.writerow(row)
+            count += 1
+        return count
+
+    def export_jsonl(self, out: TextIO) -> int:
+        """
+        以JSON Lines格式流式导出所有结果。
+
+        Returns:
+            int: 导出的行数。
+        """
+        count = 0
+        for row in self.iter_results():
+            out.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False))
+            out.write('\n')
+            count += 1
+        return count
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="查询和导出面试结果")
+    parser.add_argument('database', help="结果数据库文件路径")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export', help="导出全部结果到标准输出")
+    export.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+
+    query = commands.add_parser('query', help="查询某道题评分不低于给定值的面试者")
+    query.add_argument('--question', required=True, help="题目的稳定标识（题库中的 id）")
+    query.add_argument('--min-rating', type=float, required=True)
+    query.add_argument('--room', default=None)
+
+    commands.add_parser('averages', help="每道题的平均评分")
+
+    args = parser.parse_args()
+    store = ResultsStore(args.database)
+    try:
+        if args.command == 'export':
+            if args.format == 'csv':
+                store.export_csv(sys.stdout)
+            else:
+                store.export_jsonl(sys.stdout)
+        elif args.command == 'query':
+            for room_id, candidate, rating in store.candidates_with_rating(
+                args.question, args.min_rating, args.room
+            ):
+                print(f"{room_id}\t{candidate}\t{rating:g}")
+        elif args.command == 'averages':
+            for question, (average, count) in store.average_ratings().items():
+                print(f"{question}\t{average:.2f}\t{count}")
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
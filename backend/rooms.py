@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Callable, Generic, Optional, Protocol, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+# 合法的房间号：字母、数字、下划线和连字符，最长64个字符；空字符串表示默认房间
+ROOM_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{0,64}')
+
+
+class Room(Protocol):
+    detached_count: int  # 断线后仍保留会话、等待重连的人数
+
+    async def flush(self) -> None: ...
+
+    def close(self) -> None: ...
+
+
+R = TypeVar('R', bound=Room)
+
+
+def parse_room_id(path: str) -> Optional[str]:
+    """
+    从WebSocket请求路径中解析房间号，例如 '/abc?x=1' -> 'abc'，'/' -> ''。
+
+    Args:
+        path (str): 请求路径。
+
+    Returns:
+        Optional[str]: 房间号，路径不合法时返回 None。
+    """
+    room_id = path.split('?', 1)[0].strip('/')
+    if ROOM_ID_PATTERN.fullmatch(room_id) is None:
+        return None
+    return room_id
+
+
+class RoomRegistry(Generic[R]):
+    """
+    房间注册表，将连接按房间号路由到相互独立的房间实例。
+
+    房间在第一个连接到来时创建；当房间内没有任何连接、也没有保留着等待重连的会话，
+    且空闲超过设定时间后，由后台清理任务回收。
+    """
+
+    def __init__(self, factory: Callable[[str], R], idle_timeout: float = 600) -> None:
+        """
+        Args:
+            factory (Callable): 根据房间号创建房间实例的函数。
+            idle_timeout (float): 房间空闲多久（秒）后被回收。
+        """
+        self.factory = factory
+        self.idle_timeout = idle_timeout
+        self.rooms: dict[str, R] = {}
+        self._connections: dict[str, int] = {}  # 房间号 -> 当前连接数
+        self._idle_since: dict[str, float] = {}  # 房间号 -> 最后一个连接断开的时间
+
+    def __len__(self) -> int:
+        return len(self.rooms)
+
+    def get(self, room_id: str) -> R:
+        """
+        获取房间实例，不存在时创建。
+        """
+        room = self.rooms.get(room_id)
+        if room is None:
+            room = self.factory(room_id)
+            self.rooms[room_id] = room
+            self._connections[room_id] = 0
+            self._idle_since[room_id] = time.monotonic()
+            logger.info(f"创建房间 '{room_id}'，当前房间数: {len(self.rooms)}")
+        return room
+
+    def acquire(self, room_id: str) -> R:
+        """
+        新连接进入房间时调用，返回房间实例并增加连接计数。
+        """
+        room = self.get(room_id)
+        self._connections[room_id] += 1
+        self._idle_since.pop(room_id, None)
+        return room
+
+    def release(self, room_id: str) -> None:
+        """
+        连接离开房间时调用，减少连接计数并在房间无人时开始计算空闲时间。
+        """
+        if room_id not in self._connections:
+            return
+        self._connections[room_id] -= 1
+        if self._connections[room_id] <= 0:
+            self._connections[room_id] = 0
+            self._idle_since[room_id] = time.monotonic()
+
+    def _expired(self, room_id: str, now: float) -> bool:
+        since = self._idle_since.get(room_id)
+        return (
+            since is not None and now - since >= self.idle_timeout and
+            self.rooms[room_id].detached_count <= 0
+        )
+
+    async def sweep(self) -> int:
+        """
+        回收空闲超时的房间。仍有会话在等待重连（断线宽限期内或预约了时段）的房间不回收，
+        等到这些会话重连或过期后再回收。
+
+        房间先在后台写完状态和事件日志（等待期间不阻塞事件循环，房间仍可被新连接进入），
+        写完后仍然空闲才移出注册表并关闭，关闭时不再等待磁盘写入。
+
+        Returns:
+            int: 被回收的房间数量。
+        """
+        now = time.monotonic()
+        expired = [room_id for room_id in self._idle_since if self._expired(room_id, now)]
+        closed = 0
+        for room_id in expired:
+            room = self.rooms[room_id]
+            await room.flush()
+            if self.rooms.get(room_id) is not room or not self._expired(room_id, now):
+                continue
+            del self.rooms[room_id]
+            del self._connections[room_id]
+            del self._idle_since[room_id]
+            room.close()
+            closed += 1
+            logger.info(f"回收空闲房间 '{room_id}'，当前房间数: {len(self.rooms)}")
+        return closed
+
+    def close_all(self) -> None:
+        """
+        关闭所有房间并同步写完它们的状态和事件日志，用于进程退出前。
+        """
+        for room in self.rooms.values():
+            room.close()
+        self.rooms.clear()
+        self._connections.clear()
+        self._idle_since.clear()
+
+    async def run_sweeper(self, interval: float = 60) -> None:
+        """
+        后台清理任务，每隔 interval 秒回收一次空闲房间。
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"回收空闲房间出错: {e}")
@@ -0,0 +1,1112 @@
+from websockets.asyncio.server import Server, ServerConnection
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+from websockets.server import ServerProtocol
+import websockets
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import re
+import signal
+import socket
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from outbox import OverflowPolicy, close_outbox, get_outbox, open_outbox, outbox_metrics
+from rooms import RoomRegistry, parse_room_id
+from state_backend import StateBackend, create_state_backend
+from event_log import EventLog, log_path, logged_rooms
+from results_store import ResultsStore
+from traffic_capture import TrafficCapture
+from admin import AdminServer, Reply, request as admin_request
+from codec import Frame, codec_for, select_subprotocol
+from question_catalog import QuestionCatalog
+from log_pipeline import LazyQueueHandler, RateLimitedLogger
+from metrics import Counter, Gauge, Histogram, serve_metrics, span
+from profiling import (
+    SAMPLE_INTERVAL_MS, SLOW_CALLBACK_MS, ProfileMode, set_activity, start_profiling
+)
+from admission import AdmissionControl, MessageLimiter, TokenBucket, register_admission
+from tuning import loop_name, tune_socket
+from cluster import ROLE_INTERVIEWEE, ROLE_INTERVIEWER, receive_connections, worker_index
+from interview_system import (
+    BOOKING_HOLD, BOOKING_LEAD, FINISHED_LINGER, LANES, MAX_FINISHED, RESUME_GRACE, STATE_INTERVAL,
+    InterviewSystem, default_catalog, send_payload
+)
+
+
+logger = logging.getLogger(__name__)
+
+# 客户端可以任意触发的警告（异常消息、超速），按调用位置限流
+_rejected_log = RateLimitedLogger(logger)
+_limited_log = RateLimitedLogger(logger)
+# 每个连接断开时的调试日志，同样限流
+_interviewee_closed_log = RateLimitedLogger(logger)
+_interviewer_closed_log = RateLimitedLogger(logger)
+_observer_closed_log = RateLimitedLogger(logger)
+
+
+
+# 面试者和面试官发来的消息类型，其余类型在指标中统一记为 'other'
+INTERVIEWEE_MESSAGE_TYPES = frozenset({'ready', 'start', 'book'})
+INTERVIEWER_MESSAGE_TYPES = frozenset({'next', 'last', 'finish', 'select', 'hint', 'comment_patch'})
+
+MESSAGE_SECONDS = Histogram(
+    'ezinterview_message_seconds', "处理一条客户端消息的耗时（秒），含安排刷新但不含刷新本身",
+    ('role', 'type')
+)
+MESSAGES_REJECTED = Counter(
+    'ezinterview_messages_rejected_total', "无法解码或被状态机拒绝的客户端消息数", ('role', 'reason')
+)
+CONNECTIONS = Gauge('ezinterview_connections', "当前的WebSocket连接数", ('role',))
+CONNECTIONS_OPENED = Counter('ezinterview_connections_opened_total', "累计建立的连接数", ('role',))
+CONNECTIONS_CLOSED = Counter('ezinterview_connections_closed_total', "累计断开的连接数", ('role',))
+
+
+# 房间无人连接多久（秒）后被回收，以及检查的间隔
+ROOM_IDLE_TIMEOUT = 600
+ROOM_SWEEP_INTERVAL = 60
+
+
+# 每个连接发送队列最多积压的帧数
+OUTBOX_SIZE = 64
+
+# 发送队列溢出策略：'latest' 丢弃过期状态帧并重发最新快照，'disconnect' 断开慢连接
+OUTBOX_POLICY: OverflowPolicy = 'latest'
+
+# 旁观者发送队列最多积压的帧数；旁观者总是只保留最新快照，不受 OUTBOX_POLICY 影响
+OBSERVER_OUTBOX_SIZE = 8
+
+# 检查题库文件是否被修改的间隔（秒）
+QUESTIONS_CHECK_INTERVAL = 5
+
+# permessage-deflate 的窗口大小（2的幂次）和 zlib 内存等级，越小每个连接占用的内存越少
+DEFLATE_WINDOW_BITS = 12
+DEFLATE_MEM_LEVEL = 5
+
+# 进程交接或排空时关闭连接所用的关闭码（服务重启），关闭前发送的 reconnect 消息指明多久后重连
+CLOSE_SERVICE_RESTART = 1012
+
+# 排空连接时，排队和准备中的面试者以及旁观者的重连时间在多少秒内分散开，
+# 避免新进程同时收到大量重连；正在面试的面试者和面试官立即重连
+DRAIN_SPREAD = 10.0
+
+# 排空开始后最多等待多久（秒）让所有连接关闭，之后进程退出
+DRAIN_TIMEOUT = 10.0
+
+# 指标HTTP服务默认只监听本机地址
+METRICS_HOST = '127.0.0.1'
+
+# 单条消息的最大字节数，超出时连接以 1009 关闭；面试官的评语可能较长
+INTERVIEWEE_MAX_MESSAGE = 1024
+INTERVIEWER_MAX_MESSAGE = 64 * 1024
+
+# 每个连接每秒最多处理的消息数和允许的突发数
+INTERVIEWEE_MESSAGE_RATE = 5
+INTERVIEWEE_MESSAGE_BURST = 10
+INTERVIEWER_MESSAGE_RATE = 50
+INTERVIEWER_MESSAGE_BURST = 100
+
+# 每个进程所有面试者的消息合计每秒最多处理的条数，面试官的消息不受此限制
+GLOBAL_MESSAGE_RATE = 2000
+
+# 连接累计被限流多少条消息后断开
+RATE_LIMIT_STRIKES = 100
+
+# 每个进程的最大并发连接数，以及每秒最多接受的新连接数
+MAX_CONNECTIONS = 10000
+INTERVIEWER_MAX_CONNECTIONS = 1000
+CONNECT_RATE = 1000
+
+# 持续超速的连接被断开时使用的关闭码（策略违规）
+CLOSE_RATE_LIMITED = 1008
+
+# 每个连接已接收但尚未处理的消息上限，超出后暂停读取该连接
+WS_MAX_QUEUE = 16
+
+# 每个连接写缓冲区的高水位（字节），超出后写入方等待
+WS_WRITE_LIMIT = 32 * 1024
+
+# 心跳间隔和超时（秒）
+PING_INTERVAL = 20.0
+PING_TIMEOUT = 20.0
+
+# 监听套接字的连接等待队列长度
+LISTEN_BACKLOG = 1024
+
+
+def take_over(path: str) -> tuple[dict[str, Any], dict[bytes, socket.socket]]:
+    """
+    通过旧进程的管理接口接管其监听套接字和房间状态，旧进程随后开始排空。
+
+    Args:
+        path (str): 旧进程的管理接口套接字文件。
+
+    Returns:
+        tuple: 交接的内容，以及角色标记到监听套接字的映射。
+
+    Raises:
+        RuntimeError: 旧进程拒绝交接。
+    """
+    body, sockets = admin_request(path, 'handoff')
+    if not body.get('ok'):
+        for sock in sockets:
+            sock.close()
+        raise RuntimeError(f"接管失败: {body.get('error')}")
+    listeners = {role.encode('ascii'): sock for role, sock in zip(body['listeners'], sockets)}
+    logger.info(f"已从 {path} 接管 {len(listeners)} 个监听套接字和 {len(body['rooms'])} 个房间")
+    return body, listeners
+
+
+def listen_address(role: bytes, port: int, inherited: dict[bytes, socket.socket]) -> dict[str, Any]:
+    """
+    WebSocket服务器的监听地址：接管了旧进程的监听套接字时直接使用，否则监听端口。
+    """
+    sock = inherited.get(role)
+    if sock is None:
+        return {'host': '0.0.0.0', 'port': port}
+    return {'sock': sock}
+
+
+def parse_resume_token(path: str) -> Optional[str]:
+    """
+    从请求路径的查询参数中读取恢复令牌，例如 '/room1?token=abc' -> 'abc'。
+    """
+    values = parse_qs(urlsplit(path).query).get('token')
+    return values[0] if values else None
+
+
+def has_resume_token(path: str) -> bool:
+    """
+    握手请求是否携带恢复令牌；停止接纳新面试者时，已有会话的重连仍然放行。
+    """
+    return parse_resume_token(path) is not None
+
+
+def is_observer_request(path: str) -> bool:
+    """
+    面试官端口上的连接是否请求以只读旁观者身份加入，例如 '/room1?observe=1'。
+    """
+    values = parse_qs(urlsplit(path).query).get('observe')
+    return bool(values) and values[0] not in ('0', 'false')
+
+
+def parse_lane(path: str) -> Optional[int]:
+    """
+    从请求路径的查询参数中读取面试通道编号（从1开始），例如 '/room1?lane=2' -> 2。
+    没有指定时为 None，无法解析时为0（不存在的通道）。
+    """
+    values = parse_qs(urlsplit(path).query).get('lane')
+    if not values:
+        return None
+    return int(values[0]) if values[0].isdigit() else 0
+
+
+# JSON文本帧为对象时的开头：JSON允许的前导空白（以及可能的BOM，交给解码决定）之后是 '{'
+_JSON_OBJECT_START = re.compile(r'\ufeff?[ \t\n\r]*\{')
+
+
+def admit_message(
+    role: str, websocket: ServerConnection, limiter: MessageLimiter, message: Frame
+) -> bool:
+    """
+    在解码之前检查消息是否应被处理：连接和全局的限流，以及JSON文本帧是否为对象。
+    被拒绝的消息只计数，警告日志同样限流且只记录消息开头。
+
+    Returns:
+        bool: 是否继续解码和处理该消息。
+    """
+    reason = limiter.check()
+    if reason is None and isinstance(message, str) and not _JSON_OBJECT_START.match(message):
+        reason = 'not_dict'
+    if reason is None:
+        return True
+    MESSAGES_REJECTED.labels(role, reason).inc()
+    name = '面试者' if role == 'interviewee' else '面试官'
+    if reason == 'not_dict':
+        _rejected_log.warning("从%s %s 收到非字典消息: %.200r", name, websocket.id, message)
+    else:
+        _limited_log.warning("%s %s 的消息被限流（%s）", name, websocket.id, reason)
+    return False
+
+
+def message_type_label(data: dict[Any, Any], types: frozenset[str]) -> str:
+    """
+    消息在指标中使用的类型标签，未知类型统一记为 'other'，避免标签值无限增长。
+    """
+    message_type = data.get('type')
+    if isinstance(message_type, str) and message_type in types:
+        return message_type
+    return 'other'
+
+
+class InterviewServer:
+    """
+    一个进程中的面试服务：按启动参数配置的房间、存储、准入控制和WebSocket服务器。
+
+    连接处理函数、管理接口的命令以及排空和交接流程都是它的方法，
+    回放和测试可以在同一进程中创建各自的实例。
+    """
+
+    def __init__(self, args: Optional[argparse.Namespace] = None) -> None:
+        """
+        Args:
+            args (argparse.Namespace): 启动参数（见 main.parse_args），缺省时使用默认配置。
+        """
+        # 房间状态存储后端，以及写入的最短间隔（秒），期间的多次变化合并为一次写入
+        self.state_backend: Optional[StateBackend] = None
+        self.state_interval: float = STATE_INTERVAL
+
+        # 事件日志目录，为 None 时不记录事件日志
+        self.event_log_dir: Optional[str] = None
+
+        # 面试结果存储，为 None 时不保存结果
+        self.results_store: Optional[ResultsStore] = None
+
+        # 面试者断线后保留位置的宽限期，预约的面试者断线后保留位置的最长时间和提前重连的时间（秒）
+        self.resume_grace: float = RESUME_GRACE
+        self.booking_hold: float = BOOKING_HOLD
+        self.booking_lead: float = BOOKING_LEAD
+
+        # 已完成面试者连接的保留策略
+        self.finished_linger: float = FINISHED_LINGER
+        self.max_finished: int = MAX_FINISHED
+
+        # 每个房间的面试通道数
+        self.lane_count: int = LANES
+
+        # 流量记录：跟踪文件路径（多进程模式下每个工作进程在其后加上 .<序号>），以及当前的记录器
+        self.capture_path: Optional[str] = None
+        self.traffic_capture: Optional[TrafficCapture] = None
+
+        # 本机管理接口的套接字文件路径，以及启动时要接管的旧进程的管理接口，为 None 时不启用
+        self.admin_socket_path: Optional[str] = None
+        self.takeover_path: Optional[str] = None
+        self.drain_spread: float = DRAIN_SPREAD
+
+        # 开始排空后为 True：不再接受新连接，也不再处理收到的消息
+        self.draining = False
+
+        # WebSocket 服务器，交接时把它们的监听套接字交给新进程
+        self.servers: dict[bytes, Server] = {}
+
+        # 排空完成时设置结果，run 随之返回
+        self.stopping: Optional[asyncio.Future[None]] = None
+
+        # permessage-deflate 压缩设置
+        self.compression_enabled = True
+        self.deflate_window_bits = DEFLATE_WINDOW_BITS
+        self.deflate_mem_level = DEFLATE_MEM_LEVEL
+        self.deflate_no_context_takeover = False
+
+        # 消息限流
+        self.message_rate: float = INTERVIEWEE_MESSAGE_RATE
+        self.message_burst: float = INTERVIEWEE_MESSAGE_BURST
+        self.global_message_bucket = TokenBucket(GLOBAL_MESSAGE_RATE, GLOBAL_MESSAGE_RATE)
+
+        # WebSocket 和套接字参数
+        self.interviewee_max_message = INTERVIEWEE_MAX_MESSAGE
+        self.ws_max_queue = WS_MAX_QUEUE
+        self.ws_write_limit = WS_WRITE_LIMIT
+        self.ping_interval: Optional[float] = PING_INTERVAL
+        self.ping_timeout: Optional[float] = PING_TIMEOUT
+        self.listen_backlog = LISTEN_BACKLOG
+        self.reuse_port = False
+        self.tcp_nodelay = True
+
+        # 指标HTTP服务的监听地址和端口，端口为 None 时不启动
+        self.metrics_host = METRICS_HOST
+        self.metrics_port: Optional[int] = None
+
+        # 性能剖析设置
+        self.profile_mode: ProfileMode = 'off'
+        self.profile_dir = '.'
+        self.slow_callback_ms = SLOW_CALLBACK_MS
+        self.profile_interval_ms = SAMPLE_INTERVAL_MS
+
+        max_connections, connect_rate = MAX_CONNECTIONS, CONNECT_RATE
+        if args is not None:
+            max_connections, connect_rate = args.max_connections, args.connect_rate
+            self.interviewee_max_message = args.max_message_size
+            self.ws_max_queue = args.max_queue
+            self.ws_write_limit = args.write_limit
+            self.ping_interval = args.ping_interval or None
+            self.ping_timeout = args.ping_timeout or None
+            self.listen_backlog = args.backlog
+            self.reuse_port = args.reuse_port
+            self.tcp_nodelay = args.tcp_nodelay
+            self.message_rate = args.message_rate
+            self.message_burst = max(args.message_burst, 1)
+            self.global_message_bucket = TokenBucket(
+                args.global_message_rate, args.global_message_rate
+            )
+            self.metrics_host = args.metrics_host
+            self.metrics_port = args.metrics_port
+            self.profile_mode = args.profile
+            self.profile_dir = args.profile_dir
+            self.slow_callback_ms = args.slow_callback_ms
+            self.profile_interval_ms = args.profile_interval_ms
+            self.state_backend = create_state_backend(args.state_backend, args.state_path)
+            self.state_interval = max(args.state_interval, 0)
+            self.event_log_dir = args.event_log_dir
+            self.resume_grace = args.resume_grace
+            self.booking_hold = args.booking_hold
+            self.booking_lead = args.booking_lead
+            self.finished_linger = args.finished_linger
+            self.max_finished = args.max_finished
+            self.lane_count = max(args.lanes, 1)
+            self.capture_path = args.capture
+            self.admin_socket_path = args.admin_socket
+            self.takeover_path = args.takeover
+            self.drain_spread = max(args.drain_spread, 0)
+            self.compression_enabled = args.compression == 'deflate'
+            self.deflate_window_bits = args.deflate_window_bits
+            self.deflate_mem_level = args.deflate_mem_level
+            self.deflate_no_context_takeover = args.deflate_no_context_takeover
+            if args.results_db is not None:
+                self.results_store = ResultsStore(args.results_db)
+
+        # 题库：由启动参数指定，否则使用默认题库文件；文件被修改时热重载
+        self.catalog: QuestionCatalog = (
+            default_catalog() if args is None else QuestionCatalog(args.questions)
+        )
+
+        # 握手前的准入控制，连接数上限导出为指标
+        self.admission = {
+            ROLE_INTERVIEWEE: register_admission(
+                AdmissionControl(
+                    'interviewee', max_connections, connect_rate, exempt=has_resume_token
+                )
+            ),
+            ROLE_INTERVIEWER: register_admission(
+                AdmissionControl('interviewer', INTERVIEWER_MAX_CONNECTIONS, connect_rate)
+            ),
+        }
+
+        self.rooms: RoomRegistry[InterviewSystem] = RoomRegistry(
+            self.create_room, ROOM_IDLE_TIMEOUT
+        )
+        register_server(self)
+
+    def serve_options(self, role: bytes) -> dict[str, Any]:
+        """
+        WebSocket服务器的参数：按子协议协商消息编码，permessage-deflate 压缩设置，
+        该角色的最大消息长度和握手前的准入控制，以及接收队列、写缓冲、心跳和监听套接字的设置。
+        """
+        extensions = []
+        if self.compression_enabled:
+            extensions.append(ServerPerMessageDeflateFactory(
+                server_no_context_takeover=self.deflate_no_context_takeover,
+                server_max_window_bits=self.deflate_window_bits,
+                client_max_window_bits=self.deflate_window_bits,
+                compress_settings={'memLevel': self.deflate_mem_level},
+            ))
+        return {
+            'select_subprotocol': select_subprotocol,
+            'compression': None,
+            'extensions': extensions,
+            'max_size': (
+                self.interviewee_max_message if role == ROLE_INTERVIEWEE
+                else INTERVIEWER_MAX_MESSAGE
+            ),
+            'process_request': self.admission[role].process_request,
+            'max_queue': self.ws_max_queue,
+            'write_limit': self.ws_write_limit,
+            'ping_interval': self.ping_interval,
+            'ping_timeout': self.ping_timeout,
+            'backlog': self.listen_backlog,
+            'reuse_port': self.reuse_port,
+        }
+
+    def connection_factory(self, role: bytes, server: Server) -> Callable[[], ServerConnection]:
+        """
+        多进程模式下工作进程为收到的连接创建 ServerConnection 的工厂，参数与 serve_options 相同。
+
+        连接属于工作进程自己的WebSocket服务器 server，握手（包括准入控制）、
+        连接处理函数和关闭流程都与直接监听时一致。
+        """
+        options = self.serve_options(role)
+
+        def factory() -> ServerConnection:
+            protocol = ServerProtocol(
+                extensions=options['extensions'],
+                select_subprotocol=lambda _, protocols: select_subprotocol(connection, protocols),
+                max_size=options['max_size'],
+            )
+            connection = ServerConnection(
+                protocol,
+                server,
+                ping_interval=options['ping_interval'],
+                ping_timeout=options['ping_timeout'],
+                max_queue=options['max_queue'],
+                write_limit=options['write_limit'],
+            )
+            return connection
+
+        return factory
+
+    async def start_metrics_server(self, offset: int = 0) -> Optional[asyncio.Server]:
+        """
+        按启动参数启动指标HTTP服务；多进程模式下第 i 个工作进程监听 端口+i。
+        """
+        if self.metrics_port is None:
+            return None
+        return await serve_metrics(self.metrics_host, self.metrics_port + offset)
+
+    def watch_question_catalog(self) -> asyncio.Task[None]:
+        """
+        启动检查题库文件修改的后台任务；在支持的平台上收到 SIGHUP 时也会立即重新加载。
+        """
+        catalog = self.catalog
+        if hasattr(signal, 'SIGHUP'):
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, catalog.schedule_reload)
+            except (NotImplementedError, RuntimeError):
+                pass
+        return asyncio.create_task(catalog.run_watcher(QUESTIONS_CHECK_INTERVAL))
+
+    def start_traffic_capture(self, index: Optional[int] = None) -> None:
+        """
+        按启动参数开始记录流量，index 为工作进程序号。
+        """
+        if self.capture_path is not None:
+            self.traffic_capture = TrafficCapture(
+                self.capture_path if index is None else f'{self.capture_path}.{index}'
+            )
+
+    def stop_traffic_capture(self) -> None:
+        if self.traffic_capture is not None:
+            self.traffic_capture.close()
+            self.traffic_capture = None
+
+    def create_room(self, room_id: str) -> InterviewSystem:
+        """
+        创建房间对应的面试系统，并从状态后端和事件日志恢复已保存的状态。
+        """
+        event_log = None
+        if self.event_log_dir is not None:
+            event_log = EventLog(log_path(self.event_log_dir, room_id))
+        return InterviewSystem(
+            room_id,
+            state_backend=self.state_backend,
+            state_interval=self.state_interval,
+            event_log=event_log,
+            results_store=self.results_store,
+            resume_grace=self.resume_grace,
+            booking_hold=self.booking_hold,
+            booking_lead=self.booking_lead,
+            finished_linger=self.finished_linger,
+            max_finished=self.max_finished,
+            lanes=self.lane_count,
+            catalog=self.catalog,
+        )
+
+    def restore_logged_rooms(self, owns: Callable[[str], bool] = lambda room_id: True) -> None:
+        """
+        启动时重放事件日志目录中房间的日志，提前重建房间状态。
+
+        Args:
+            owns (Callable): 判断房间是否由当前进程负责，多进程模式下每个房间只在一个进程中恢复。
+        """
+        if self.event_log_dir is None:
+            return
+        for room_id in logged_rooms(self.event_log_dir):
+            if owns(room_id):
+                self.rooms.get(room_id)
+
+    def candidate_counts(self) -> dict[tuple[str, ...], float]:
+        """
+        所有房间中各状态的面试者人数，导出指标时调用。
+        """
+        counts = {'preparing': 0, 'waiting': 0, 'interviewing': 0, 'finished': 0, 'detached': 0}
+        for system in self.rooms.rooms.values():
+            for state, count in system.candidates.counts().items():
+                counts[state] += count
+            counts['detached'] += system.detached_count
+        return {(state,): count for state, count in counts.items()}
+
+    def start_draining(self, spread: float) -> int:
+        """
+        开始排空当前进程：停止接受新连接，通知所有连接稍后重连并关闭连接，全部关闭后进程退出。
+
+        每个连接在关闭（关闭码 1012）之前收到 {"type": "reconnect", "after": <秒>}：
+        正在面试的面试者和面试官立即重连；排队的面试者按排队位置（多个房间交错排列）、
+        其后是准备中的面试者和旁观者，在 spread 秒内依次分配重连时间并加入随机抖动，
+        避免接管的进程同时收到大量重连。已完成面试的面试者直接关闭。
+
+        Returns:
+            int: 收到重连提示的连接数。
+        """
+        self.draining = True
+        for control in self.admission.values():
+            control.paused = True
+        for server in self.servers.values():
+            server.close(close_connections=False)
+
+        urgent: list[ServerConnection] = []
+        ordered: list[tuple[tuple[int, int], ServerConnection]] = []
+        finished: list[ServerConnection] = []
+        for system in self.rooms.rooms.values():
+            for lane in system.lanes:
+                if lane.interviewer is not None:
+                    urgent.append(lane.interviewer)
+                if lane.candidate is not None and lane.candidate.detached is None:
+                    urgent.append(lane.candidate.websocket)
+                ordered.extend(((2, 0), observer) for observer in lane.observers)
+            for position, candidate in enumerate(system.candidates.queue):
+                if candidate.detached is None:
+                    ordered.append(((0, position), candidate.websocket))
+            ordered.extend(((1, 0), c.websocket) for c in system.candidates.preparing)
+            finished.extend(c.websocket for c in system.candidates.finished)
+            system.retire()
+
+        ordered.sort(key=lambda item: item[0])
+        slot = spread / max(len(ordered), 1)
+        hints = [(websocket, 0.0) for websocket in urgent]
+        hints.extend(
+            (websocket, round((i + random.random()) * slot, 2))
+            for i, (_, websocket) in enumerate(ordered)
+        )
+        for websocket, after in hints:
+            send_payload(websocket, {'type': 'reconnect', 'after': after}, droppable=False)
+        connections = [websocket for websocket, _ in hints] + finished
+        asyncio.get_running_loop().create_task(self.finish_draining(connections))
+        logger.info(f"开始排空，通知 {len(hints)} 个连接在 {spread} 秒内分批重连")
+        return len(hints)
+
+    async def finish_draining(self, connections: list[ServerConnection]) -> None:
+        """
+        在各连接的重连提示写出后关闭连接，全部关闭（或超时）后让主协程退出。
+        """
+        async def close(websocket: ServerConnection) -> None:
+            outbox = get_outbox(websocket)
+            if outbox is not None:
+                await outbox.drained()
+            await websocket.close(CLOSE_SERVICE_RESTART, 'service restart')
+
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(close(c) for c in connections), return_exceptions=True),
+                DRAIN_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            logger.warning("排空超时，仍有连接未关闭")
+        logger.info("排空完成，进程退出")
+        if self.stopping is not None and not self.stopping.done():
+            self.stopping.set_result(None)
+
+    def restore_handoff(self, body: dict[str, Any]) -> None:
+        """
+        按交接的内容恢复各房间的状态和面试者会话。
+        """
+        hold = max(body.get('hold', 0), self.resume_grace)
+        for room_id, saved in body['rooms'].items():
+            system = self.rooms.get(room_id)
+            system.restore_state(saved)
+            system.hold_sessions(hold)
+
+    async def admin_status(self, request: dict[str, Any]) -> Reply:
+        return Reply({
+            'ok': True,
+            'pid': os.getpid(),
+            'admitting': not self.admission[ROLE_INTERVIEWEE].paused,
+            'draining': self.draining,
+            'rooms': len(self.rooms),
+            'candidates': {
+                state: int(count) for (state,), count in self.candidate_counts().items()
+            },
+            'connections': {c.role: c.active for c in self.admission.values()},
+        })
+
+    async def admin_snapshot(self, request: dict[str, Any]) -> Reply:
+        """
+        导出所有房间的状态；配置了状态后端时同时写入。
+        """
+        rooms = list(self.rooms.rooms.items())
+        saved = await asyncio.gather(*(system.checkpoint() for _, system in rooms))
+        states = {room_id: state for (room_id, _), state in zip(rooms, saved)}
+        return Reply({'ok': True, 'rooms': states})
+
+    async def admin_pause(self, request: dict[str, Any]) -> Reply:
+        """
+        停止接纳新面试者：没有恢复令牌的握手返回 503，已有会话仍可重连。
+        """
+        self.admission[ROLE_INTERVIEWEE].paused = True
+        logger.info("停止接纳新面试者")
+        return Reply({'ok': True})
+
+    async def admin_resume(self, request: dict[str, Any]) -> Reply:
+        if self.draining:
+            return Reply({'ok': False, 'error': "进程正在排空"})
+        self.admission[ROLE_INTERVIEWEE].paused = False
+        logger.info("恢复接纳新面试者")
+        return Reply({'ok': True})
+
+    async def admin_drain(self, request: dict[str, Any]) -> Reply:
+        if self.draining:
+            return Reply({'ok': False, 'error': "进程已经在排空"})
+        spread = float(request.get('spread', self.drain_spread))
+        return Reply({'ok': True, 'connections': self.start_draining(spread)})
+
+    async def admin_handoff(self, request: dict[str, Any]) -> Reply:
+        """
+        把监听套接字和所有房间的状态（包括面试者的恢复令牌）交给新进程，回复发出后开始排空。
+
+        从导出状态起本进程不再处理收到的消息，保证新进程拿到的是最终状态；
+        回复发送失败时恢复正常服务。
+        """
+        if self.draining:
+            return Reply({'ok': False, 'error': "进程已经在排空"})
+        roles: list[str] = []
+        fds: list[int] = []
+        for role, server in self.servers.items():
+            for sock in server.sockets:
+                roles.append(role.decode('ascii'))
+                fds.append(os.dup(sock.fileno()))
+        self.draining = True
+        body = {
+            'ok': True,
+            'listeners': roles,
+            'rooms': {
+                room_id: system.export_state() for room_id, system in self.rooms.rooms.items()
+            },
+            # 新进程为交接的会话保留位置的时间，覆盖最晚的重连提示
+            'hold': self.drain_spread + self.resume_grace,
+        }
+
+        def then(sent: bool) -> None:
+            for fd in fds:
+                os.close(fd)
+            if sent:
+                self.start_draining(self.drain_spread)
+            else:
+                self.draining = False
+                logger.error("交接失败，继续提供服务")
+
+        return Reply(body, fds, then)
+
+    def start_admin_server(self) -> Optional[AdminServer]:
+        """
+        按启动参数启动本机管理接口。
+        """
+        if self.admin_socket_path is None:
+            return None
+        server = AdminServer(self.admin_socket_path, {
+            'status': self.admin_status,
+            'snapshot': self.admin_snapshot,
+            'pause': self.admin_pause,
+            'resume': self.admin_resume,
+            'drain': self.admin_drain,
+            'handoff': self.admin_handoff,
+        })
+        server.start()
+        return server
+
+    def enter_room(self, control: AdmissionControl, room_id: str) -> InterviewSystem:
+        """
+        连接的处理函数开始时调用：计入准入控制并进入房间。
+        进入房间失败（如恢复房间状态出错）时撤销准入计数；成功后由调用方在 finally 中释放两者。
+        """
+        control.enter()
+        try:
+            return self.rooms.acquire(room_id)
+        except BaseException:
+            control.leave()
+            raise
+
+    async def interviewee_handler(self, websocket: ServerConnection) -> None:
+        """
+        处理面试者WebSocket连接，管理消息收发与状态更新。
+        连接按请求路径中的房间号路由到对应的面试系统。
+
+        Args:
+            websocket (ServerConnection): 面试者连接对象。
+        """
+        id = websocket.id
+        room_id = parse_room_id(websocket.request.path)
+        if room_id is None:
+            logger.warning(f"面试者端 {id} 请求了非法的房间路径: {websocket.request.path!r}")
+            await websocket.close(1008, 'invalid room')
+            return
+        if self.draining:
+            await websocket.close(CLOSE_SERVICE_RESTART, 'service restart')
+            return
+
+        set_activity('interviewee_handler')
+        tune_socket(websocket, self.tcp_nodelay)
+        codec = codec_for(websocket)
+        limiter = MessageLimiter(
+            self.message_rate, self.message_burst, RATE_LIMIT_STRIKES, self.global_message_bucket
+        )
+        closer: Optional[asyncio.Task[None]] = None
+        control = self.admission[ROLE_INTERVIEWEE]
+        system = self.enter_room(control, room_id)
+        CONNECTIONS_OPENED.labels('interviewee').inc()
+        CONNECTIONS.labels('interviewee').inc()
+
+        # 从这里开始出错时，finally 会释放准入计数和房间的连接计数
+        try:
+            open_outbox(websocket, OUTBOX_SIZE, OUTBOX_POLICY, lambda: system.resync(websocket))
+            await system.add_interviewee(websocket, parse_resume_token(websocket.request.path))
+            logger.info(f"面试者端 {id} 连接到房间 '{room_id}'，编码方式: {codec.subprotocol}")
+            if self.traffic_capture is not None:
+                candidate = system.candidates.get(websocket)
+                self.traffic_capture.opened(
+                    websocket, 'interviewee', room_id,
+                    None if candidate is None else candidate.token
+                )
+
+            async for message in websocket:
+                if self.traffic_capture is not None:
+                    self.traffic_capture.frame(websocket, message)
+                if not admit_message('interviewee', websocket, limiter, message):
+                    if limiter.exhausted and closer is None:
+                        logger.warning(f"面试者 {id} 持续发送过多消息，断开连接")
+                        # 在后台关闭，这里继续读取并丢弃积压的消息，直到收到客户端的关闭帧
+                        closer = asyncio.create_task(
+                            websocket.close(CLOSE_RATE_LIMITED, 'rate limit exceeded')
+                        )
+                    continue
+                if self.draining:
+                    # 房间状态已交给新进程或已写入存储，之后收到的消息不再处理
+                    continue
+                try:
+                    data = codec.decode(message)
+                except ValueError:
+                    MESSAGES_REJECTED.labels('interviewee', 'undecodable').inc()
+                    _rejected_log.warning("从面试者 %s 收到无法解码的消息: %.200r", id, message)
+                    continue
+                if not isinstance(data, dict):
+                    MESSAGES_REJECTED.labels('interviewee', 'not_dict').inc()
+                    _rejected_log.warning("从面试者 %s 收到非字典消息: %.200r", id, message)
+                    continue
+                message_type = message_type_label(data, INTERVIEWEE_MESSAGE_TYPES)
+                with span(
+                    'interviewee.message', MESSAGE_SECONDS.labels('interviewee', message_type),
+                    room=room_id, connection=id, type=message_type,
+                ) as s:
+                    result = await system.parse_interviewee_message(websocket, data)
+                    s.set(ok=result)
+                if not result:
+                    MESSAGES_REJECTED.labels('interviewee', 'invalid').inc()
+                    _rejected_log.warning("从面试者 %s 收到异常消息: %.200r", id, message)
+        except websockets.ConnectionClosed as e:
+            # 会话被新连接接管或已完成面试被清理时，连接由服务器主动关闭
+            _interviewee_closed_log.debug("面试者 %s 的连接已关闭: %s", id, e)
+        except Exception as e:
+            logger.error(f"面试者 {id} 连接处理出错: {e}")
+        finally:
+            if self.traffic_capture is not None:
+                self.traffic_capture.closed(websocket)
+            if not self.draining:
+                # 排空时保留会话，面试者凭恢复令牌重连到新进程
+                await system.pop_interviewee(websocket)
+            close_outbox(websocket)
+            self.rooms.release(room_id)
+            control.leave()
+            CONNECTIONS.labels('interviewee').dec()
+            CONNECTIONS_CLOSED.labels('interviewee').inc()
+            logger.info(f"面试者端 {id} 断开")
+
+    async def interviewer_handler(self, websocket: ServerConnection) -> None:
+        """
+        处理面试官WebSocket连接，允许或拒绝连接，并等待断开。
+        连接按请求路径中的房间号路由到对应的面试系统。
+
+        Args:
+            websocket (ServerConnection): 面试官连接对象。
+        """
+        id = websocket.id
+        room_id = parse_room_id(websocket.request.path)
+        if room_id is None:
+            logger.warning(f"面试官端 {id} 请求了非法的房间路径: {websocket.request.path!r}")
+            await websocket.close(1008, 'invalid room')
+            return
+        if self.draining:
+            await websocket.close(CLOSE_SERVICE_RESTART, 'service restart')
+            return
+
+        number = parse_lane(websocket.request.path)
+        if number is not None and not 1 <= number <= self.lane_count:
+            logger.warning(f"面试官端 {id} 请求了不存在的通道: {websocket.request.path!r}")
+            await websocket.close(1008, 'invalid lane')
+            return
+
+        if is_observer_request(websocket.request.path):
+            await self.observer_handler(websocket, room_id, number or 1)
+            return
+
+        set_activity('interviewer_handler')
+        tune_socket(websocket, self.tcp_nodelay)
+        codec = codec_for(websocket)
+        limiter = MessageLimiter(
+            INTERVIEWER_MESSAGE_RATE, INTERVIEWER_MESSAGE_BURST, RATE_LIMIT_STRIKES
+        )
+        closer: Optional[asyncio.Task[None]] = None
+        control = self.admission[ROLE_INTERVIEWER]
+        system = self.enter_room(control, room_id)
+        CONNECTIONS_OPENED.labels('interviewer').inc()
+        CONNECTIONS.labels('interviewer').inc()
+        logger.info(f"面试官端 {id} 连接到房间 '{room_id}'，编码方式: {codec.subprotocol}")
+
+        # 从这里开始出错时，finally 会释放准入计数和房间的连接计数
+        try:
+            lane = system.choose_lane(number)
+            if lane.interviewer is not None:
+                send_payload(lane.interviewer, {'type': 'reject'}, droppable=False)
+                logger.warning(f"通道 {lane.name} 已有面试官连接，拒绝旧连接 {lane.interviewer.id}")
+
+            open_outbox(websocket, OUTBOX_SIZE, OUTBOX_POLICY, lambda: system.resync(websocket))
+            system.attach_interviewer(websocket, lane)
+            logger.info(f"面试官端 {id} 进入通道 {lane.name}")
+            if self.traffic_capture is not None:
+                self.traffic_capture.opened(websocket, 'interviewer', room_id)
+
+            async for message in websocket:
+                if self.traffic_capture is not None:
+                    self.traffic_capture.frame(websocket, message)
+                if not admit_message('interviewer', websocket, limiter, message):
+                    if limiter.exhausted and closer is None:
+                        logger.warning(f"面试官 {id} 持续发送过多消息，断开连接")
+                        # 在后台关闭，这里继续读取并丢弃积压的消息，直到收到客户端的关闭帧
+                        closer = asyncio.create_task(
+                            websocket.close(CLOSE_RATE_LIMITED, 'rate limit exceeded')
+                        )
+                    continue
+                if self.draining:
+                    # 房间状态已交给新进程或已写入存储，之后收到的消息不再处理
+                    continue
+                try:
+                    data = codec.decode(message)
+                except ValueError:
+                    MESSAGES_REJECTED.labels('interviewer', 'undecodable').inc()
+                    _rejected_log.warning("从面试官 %s 收到无法解码的消息: %.200r", id, message)
+                    continue
+                if not isinstance(data, dict):
+                    MESSAGES_REJECTED.labels('interviewer', 'not_dict').inc()
+                    _rejected_log.warning("从面试官 %s 收到非字典消息: %.200r", id, message)
+                    continue
+                message_type = message_type_label(data, INTERVIEWER_MESSAGE_TYPES)
+                with span(
+                    'interviewer.message', MESSAGE_SECONDS.labels('interviewer', message_type),
+                    room=room_id, connection=id, type=message_type,
+                ) as s:
+                    result = await system.parse_interviewer_message(websocket, data)
+                    s.set(ok=result)
+                if not result:
+                    MESSAGES_REJECTED.labels('interviewer', 'invalid').inc()
+                    _rejected_log.warning("从面试官 %s 收到异常消息: %.200r", id, message)
+        except websockets.ConnectionClosed as e:
+            # 进程排空等情况下连接由服务器主动关闭
+            _interviewer_closed_log.debug("面试官 %s 的连接已关闭: %s", id, e)
+        except Exception as e:
+            logger.error(f"面试官 {id} 连接处理出错: {e}")
+        finally:
+            if self.traffic_capture is not None:
+                self.traffic_capture.closed(websocket)
+            system.detach_interviewer(websocket)
+            close_outbox(websocket)
+            self.rooms.release(room_id)
+            control.leave()
+            CONNECTIONS.labels('interviewer').dec()
+            CONNECTIONS_CLOSED.labels('interviewer').inc()
+            logger.info(f"面试官端 {id} 断开")
+
+    async def observer_handler(
+        self, websocket: ServerConnection, room_id: str, number: int
+    ) -> None:
+        """
+        处理只读的旁观者连接：接收所在通道的面试官看到的状态视图，但不能发送任何指令。
+
+        旁观者使用独立的发送队列，溢出时只丢弃并重发自己的快照，
+        不会触发面试官或面试者的刷新，也不会阻塞其他连接。
+
+        Args:
+            websocket (ServerConnection): 旁观者连接对象。
+            room_id (str): 房间号。
+            number (int): 旁观的通道编号，从1开始。
+        """
+        id = websocket.id
+        set_activity('observer_handler')
+        tune_socket(websocket, self.tcp_nodelay)
+        control = self.admission[ROLE_INTERVIEWER]
+        system = self.enter_room(control, room_id)
+        CONNECTIONS_OPENED.labels('observer').inc()
+        CONNECTIONS.labels('observer').inc()
+
+        # 从这里开始出错时，finally 会释放准入计数和房间的连接计数
+        try:
+            open_outbox(
+                websocket, OBSERVER_OUTBOX_SIZE, 'latest', lambda: system.resync_observer(websocket)
+            )
+            system.attach_observer(websocket, system.lanes[number - 1])
+            logger.info(
+                f"旁观者 {id} 连接到房间 '{room_id}' 的通道 {number}，"
+                f"编码方式: {codec_for(websocket).subprotocol}"
+            )
+            if self.traffic_capture is not None:
+                self.traffic_capture.opened(websocket, 'observer', room_id)
+
+            async for message in websocket:
+                if self.traffic_capture is not None:
+                    self.traffic_capture.frame(websocket, message)
+                MESSAGES_REJECTED.labels('observer', 'read_only').inc()
+                _rejected_log.warning("旁观者 %s 发送的消息被忽略: %.200r", id, message)
+        except websockets.ConnectionClosed as e:
+            # 进程排空等情况下连接由服务器主动关闭
+            _observer_closed_log.debug("旁观者 %s 的连接已关闭: %s", id, e)
+        except Exception as e:
+            logger.error(f"旁观者 {id} 连接处理出错: {e}")
+        finally:
+            if self.traffic_capture is not None:
+                self.traffic_capture.closed(websocket)
+            system.detach_observer(websocket)
+            close_outbox(websocket)
+            self.rooms.release(room_id)
+            control.leave()
+            CONNECTIONS.labels('observer').dec()
+            CONNECTIONS_CLOSED.labels('observer').inc()
+            logger.info(f"旁观者 {id} 断开")
+
+    async def run(self) -> None:
+        """
+        单进程模式的入口，启动两个WebSocket服务器：
+        - 面试者端口9009
+        - 面试官端口9008
+        并保持服务器持续运行，直到排空完成。
+
+        连接路径中的房间号（如 ws://host:9009/room1）决定其所属的面试房间，
+        根路径对应默认房间。
+        """
+        handoff: Optional[dict[str, Any]] = None
+        inherited: dict[bytes, socket.socket] = {}
+        if self.takeover_path is not None:
+            handoff, inherited = take_over(self.takeover_path)
+        self.restore_logged_rooms()
+        if handoff is not None:
+            self.restore_handoff(handoff)
+        interviewee_server = websockets.serve(
+            self.interviewee_handler, **listen_address(ROLE_INTERVIEWEE, 9009, inherited),
+            **self.serve_options(ROLE_INTERVIEWEE)
+        )
+        interviewer_server = websockets.serve(
+            self.interviewer_handler, **listen_address(ROLE_INTERVIEWER, 9008, inherited),
+            **self.serve_options(ROLE_INTERVIEWER)
+        )
+
+        async with interviewee_server as s1, interviewer_server as s2:
+            logger.info(f"WebSocket 服务器已启动，事件循环: {loop_name()}")
+            self.servers[ROLE_INTERVIEWEE] = s1
+            self.servers[ROLE_INTERVIEWER] = s2
+            sweeper = asyncio.create_task(self.rooms.run_sweeper(ROOM_SWEEP_INTERVAL))
+            watcher = self.watch_question_catalog()
+            metrics_server = await self.start_metrics_server()
+            profiler = start_profiling(
+                self.profile_mode, self.profile_dir, self.slow_callback_ms, self.profile_interval_ms
+            )
+            self.start_traffic_capture()
+            admin_server = self.start_admin_server()
+            self.stopping = asyncio.get_running_loop().create_future()
+            try:
+                await self.stopping
+            finally:
+                if admin_server is not None:
+                    admin_server.close()
+                sweeper.cancel()
+                watcher.cancel()
+                if metrics_server is not None:
+                    metrics_server.close()
+                if profiler is not None:
+                    profiler.stop()
+                self.rooms.close_all()
+                if self.results_store is not None:
+                    self.results_store.flush()
+                self.stop_traffic_capture()
+
+    async def run_worker(self, channel: socket.socket, index: int, workers: int) -> None:
+        """
+        多进程模式下工作进程的入口。
+
+        工作进程不直接监听对外端口，而是从接收进程收取已经按房间分好的连接，
+        交给本进程的WebSocket服务器处理。
+        """
+        self.restore_logged_rooms(lambda room_id: worker_index(room_id, workers) == index)
+        interviewee_server = websockets.serve(
+            self.interviewee_handler, "127.0.0.1", 0, **self.serve_options(ROLE_INTERVIEWEE)
+        )
+        interviewer_server = websockets.serve(
+            self.interviewer_handler, "127.0.0.1", 0, **self.serve_options(ROLE_INTERVIEWER)
+        )
+
+        async with interviewee_server as s1, interviewer_server as s2:
+            sweeper = asyncio.create_task(self.rooms.run_sweeper(ROOM_SWEEP_INTERVAL))
+            watcher = self.watch_question_catalog()
+            metrics_server = await self.start_metrics_server(index)
+            profiler = start_profiling(
+                self.profile_mode, self.profile_dir, self.slow_callback_ms, self.profile_interval_ms
+            )
+            self.start_traffic_capture(index)
+            try:
+                await receive_connections(channel, {
+                    ROLE_INTERVIEWEE: self.connection_factory(ROLE_INTERVIEWEE, s1),
+                    ROLE_INTERVIEWER: self.connection_factory(ROLE_INTERVIEWER, s2),
+                })
+            finally:
+                sweeper.cancel()
+                watcher.cancel()
+                if metrics_server is not None:
+                    metrics_server.close()
+                if profiler is not None:
+                    profiler.stop()
+                self.rooms.close_all()
+                if self.results_store is not None:
+                    self.results_store.flush()
+                self.stop_traffic_capture()
+
+
+# 导出房间数和面试者人数指标的服务，为最近创建的 InterviewServer
+_current: Optional[InterviewServer] = None
+
+
+def register_server(server: InterviewServer) -> None:
+    """
+    登记导出房间和面试者指标的服务（替换之前登记的）。
+    """
+    global _current
+    _current = server
+
+
+Gauge(
+    'ezinterview_rooms', "当前进程中的房间数",
+    callback=lambda: 0 if _current is None else len(_current.rooms)
+)
+Gauge(
+    'ezinterview_candidates', "各状态的面试者人数，detached 为断线后等待重连的人数",
+    ('state',), callback=lambda: {} if _current is None else _current.candidate_counts()
+)
+Counter(
+    'ezinterview_outbox_frames_total', "发送队列累计写出和丢弃的消息帧数", ('result',),
+    callback=lambda: {(k,): outbox_metrics()[k] for k in ('sent', 'dropped')}
+)
+Counter(
+    'ezinterview_outbox_overflow_disconnects_total', "因发送队列溢出而断开的连接数",
+    callback=lambda: outbox_metrics()['disconnected']
+)
+Counter(
+    'ezinterview_outbox_send_errors_total', "发送队列写出消息时出错的次数",
+    callback=lambda: outbox_metrics()['errors']
+)
+Gauge(
+    'ezinterview_outbox_queued_frames', "所有发送队列中积压的消息帧数",
+    callback=lambda: outbox_metrics()['queued']
+)
+Gauge(
+    'ezinterview_outbox_max_depth', "积压最多的发送队列中的消息帧数",
+    callback=lambda: outbox_metrics()['max_depth']
+)
+Counter(
+    'ezinterview_log_records_dropped_total', "日志队列已满而被丢弃的日志记录数",
+    callback=lambda: LazyQueueHandler.dropped
+)
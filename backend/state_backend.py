@@ -0,0 +1,162 @@
+import concurrent.futures
+import json
+import logging
+import sqlite3
+import threading
+from typing import Any, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# 在后台写入房间状态的线程；只有一个线程，各次写入按提交的顺序依次执行
+_writer = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='state-backend')
+
+
+class StateBackend:
+    """
+    房间状态存储后端的基类。
+
+    每个房间的权威状态（题目进度、评分、评语、提示、排队情况等）以可JSON序列化的
+    字典形式保存，房间在创建时从后端恢复，在状态变化后写回后端。
+    """
+
+    def load(self, room_id: str) -> Optional[dict[str, Any]]:
+        """
+        读取房间状态，不存在时返回 None。
+        """
+        raise NotImplementedError
+
+    def save(self, room_id: str, state: dict[str, Any]) -> None:
+        """
+        保存房间状态，覆盖之前的内容。
+        """
+        self.save_encoded(room_id, json.dumps(state, ensure_ascii=False))
+
+    def save_encoded(self, room_id: str, raw: str) -> None:
+        """
+        保存已序列化为JSON字符串的房间状态，覆盖之前的内容。
+        """
+        raise NotImplementedError
+
+    def save_in_background(self, room_id: str, raw: str) -> concurrent.futures.Future[None]:
+        """
+        在后台线程中保存已序列化的房间状态，不阻塞事件循环。
+
+        所有后端共用同一个写入线程，先提交的写入总是先完成；
+        等待最后一次提交的写入完成，即可保证之前的写入都已完成。
+        """
+        return _writer.submit(self.save_encoded, room_id, raw)
+
+    def delete(self, room_id: str) -> None:
+        """
+        删除房间状态。
+        """
+        raise NotImplementedError
+
+    def rooms(self) -> list[str]:
+        """
+        列出所有保存了状态的房间号。
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """
+        释放后端占用的资源。
+        """
+
+
+class MemoryStateBackend(StateBackend):
+    """
+    保存在进程内存中的状态后端，主要用于测试和单进程部署。
+
+    状态以JSON字符串保存，读写语义与持久化后端保持一致。
+    """
+
+    def __init__(self) -> None:
+        self._states: dict[str, str] = {}
+
+    def load(self, room_id: str) -> Optional[dict[str, Any]]:
+        raw = self._states.get(room_id)
+        return None if raw is None else json.loads(raw)
+
+    def save_encoded(self, room_id: str, raw: str) -> None:
+        self._states[room_id] = raw
+
+    def delete(self, room_id: str) -> None:
+        self._states.pop(room_id, None)
+
+    def rooms(self) -> list[str]:
+        return list(self._states)
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    基于本地SQLite文件的状态后端，可在多个工作进程之间共享，
+    进程重启后状态依然保留。
+
+    数据库使用WAL模式，读写互不阻塞；每个房间只由一个工作进程写入。
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): SQLite数据库文件路径。
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS room_state ('
+            'room_id TEXT PRIMARY KEY, state TEXT NOT NULL)'
+        )
+        logger.info(f"SQLite 状态后端已打开: {path}")
+
+    def load(self, room_id: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT state FROM room_state WHERE room_id = ?', (room_id,)
+            ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def save_encoded(self, room_id: str, raw: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO room_state (room_id, state) VALUES (?, ?) '
+                'ON CONFLICT(room_id) DO UPDATE SET state = excluded.state',
+                (room_id, raw)
+            )
+
+    def delete(self, room_id: str) -> None:
+        with self._lock:
+            self._conn.execute('DELETE FROM room_state WHERE room_id = ?', (room_id,))
+
+    def rooms(self) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute('SELECT room_id FROM room_state').fetchall()
+        return [r[0] for r in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_state_backend(kind: str, path: Optional[str] = None) -> Optional[StateBackend]:
+    """
+    根据名称创建状态后端。
+
+    Args:
+        kind (str): 'none'、'memory' 或 'sqlite'。
+        path (str): SQLite数据库文件路径，仅在 kind 为 'sqlite' 时使用。
+
+    Returns:
+        Optional[StateBackend]: 创建的后端，kind 为 'none' 时返回 None。
+    """
+    if kind == 'none':
+        return None
+    if kind == 'memory':
+        return MemoryStateBackend()
+    if kind == 'sqlite':
+        return SQLiteStateBackend(path or 'interview_state.db')
+    raise ValueError(f"未知的状态后端: {kind}")
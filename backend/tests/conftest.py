@@ -0,0 +1,51 @@
+import json
+import os
+import sys
+from collections import defaultdict
+from typing import Any, Callable
+
+import pytest
+
+# 后端各模块按模块名直接导入（与 python main.py 的运行方式一致）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeConnection:
+    """
+    只提供服务用到的标识和关闭接口的假连接，发出的消息由 sent 夹具截获。
+    """
+
+    subprotocol = None
+
+    def __init__(self, id: str) -> None:
+        self.id = id
+        self.close_code: Any = None
+
+    async def close(self, code: int = 1000, reason: str = '') -> None:
+        self.close_code = code
+
+    def __repr__(self) -> str:
+        return f'FakeConnection({self.id!r})'
+
+
+@pytest.fixture
+def connection() -> Callable[[str], FakeConnection]:
+    """
+    创建假连接。
+    """
+    return FakeConnection
+
+
+@pytest.fixture
+def sent(monkeypatch) -> dict[Any, list[dict[str, Any]]]:
+    """
+    截获发往各连接的消息帧，按连接保存解码后的消息。
+    """
+    import interview_system
+    frames: dict[Any, list[dict[str, Any]]] = defaultdict(list)
+
+    def put_frame(websocket: Any, frame: Any, droppable: bool = True) -> None:
+        frames[websocket].append(json.loads(frame))
+
+    monkeypatch.setattr(interview_system, 'put_frame', put_frame)
+    return frames
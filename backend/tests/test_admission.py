@@ -0,0 +1,24 @@
+from typing import Any
+
+import pytest
+
+from admission import MessageLimiter
+from server import admit_message
+
+
+class FakeConnection:
+    id = 'c1'
+
+
+@pytest.mark.parametrize('message, admitted', [
+    ('{"type": "ready"}', True),
+    (' \r\n\t{"type": "ready"}', True),
+    ('\ufeff{"type": "ready"}', True),
+    ('["ready"]', False),
+    ('  "ready"', False),
+    ('', False),
+    (b'\x81\xa4type', True),
+])
+def test_admit_message_checks_json_objects(message: Any, admitted: bool) -> None:
+    limiter = MessageLimiter(0, 1, 0)
+    assert admit_message('interviewee', FakeConnection(), limiter, message) is admitted  # type: ignore[arg-type]
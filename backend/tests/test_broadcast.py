@@ -0,0 +1,43 @@
+import asyncio
+import json
+from typing import Any
+
+import codec
+import interview_system
+from codec import Codec
+
+
+def test_preparing_frame_is_encoded_once_per_codec(monkeypatch, connection) -> None:
+    encoded: list[Any] = []
+
+    def encode(payload: Any) -> bytes:
+        encoded.append(payload)
+        return b'x'
+
+    binary = Codec('test.binary', encode, json.loads, binary=True)
+    monkeypatch.setitem(codec.CODECS, binary.subprotocol, binary)
+    frames: list[tuple[Any, Any]] = []
+    monkeypatch.setattr(
+        interview_system, 'put_frame', lambda websocket, frame, droppable=True: frames.append((websocket, frame))
+    )
+
+    async def run() -> None:
+        system = interview_system.InterviewSystem('r')
+        connections = [connection(f'c{i}') for i in range(4)]
+        connections[2].subprotocol = connections[3].subprotocol = binary.subprotocol
+        for c in connections:
+            await system.add_interviewee(c)
+        frames.clear()
+        encoded.clear()
+        await system.flusher.flush_now()
+
+        # 四个准备中的面试者视图相同，JSON 连接共享同一个字符串，二进制连接共享同一次编码的结果
+        by_connection = dict(frames)
+        assert by_connection.keys() == set(connections)
+        assert by_connection[connections[0]] is by_connection[connections[1]]
+        assert by_connection[connections[2]] is by_connection[connections[3]] == b'x'
+        assert len(encoded) == 1 and encoded[0]['type'] == 'preparing'
+        assert json.loads(by_connection[connections[0]]) == encoded[0]
+        system.close()
+
+    asyncio.run(run())
@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from candidate_queue import CandidateQueue
+
+
+def check(queue: CandidateQueue[int], model: list[int]) -> None:
+    assert len(queue) == len(model)
+    assert list(queue) == model
+    for i, item in enumerate(model):
+        assert queue.position(item) == i
+
+
+def test_positions_follow_appends_and_pops() -> None:
+    queue: CandidateQueue[int] = CandidateQueue()
+    model = []
+    for i in range(10):
+        queue.append(i)
+        model.append(i)
+    check(queue, model)
+    assert queue.popleft() == model.pop(0)
+    check(queue, model)
+
+
+def test_remove_head_middle_and_tail() -> None:
+    queue: CandidateQueue[int] = CandidateQueue()
+    model = list(range(8))
+    for i in model:
+        queue.append(i)
+    for item in (0, 7, 4):
+        queue.remove(item)
+        model.remove(item)
+        check(queue, model)
+    assert not queue.discard(4)
+    with pytest.raises(KeyError):
+        queue.position(4)
+
+
+def test_rebuild_keeps_order() -> None:
+    queue: CandidateQueue[int] = CandidateQueue()
+    model = []
+    # 反复入队和出队，让序号多次用尽并重新编号
+    for i in range(1000):
+        queue.append(i)
+        model.append(i)
+        if i % 3 == 0:
+            queue.remove(model.pop(len(model) // 2))
+        if i % 5 == 0 and model:
+            assert queue.popleft() == model.pop(0)
+    check(queue, model)
+    queue._rebuild()
+    check(queue, model)
+
+
+def test_replace_keeps_position() -> None:
+    queue: CandidateQueue[int] = CandidateQueue()
+    for i in range(5):
+        queue.append(i)
+    queue.replace(2, 20)
+    check(queue, [0, 1, 20, 3, 4])
+    with pytest.raises(ValueError):
+        queue.replace(3, 20)
+    with pytest.raises(ValueError):
+        queue.append(20)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_operations_match_list(seed: int) -> None:
+    rng = random.Random(seed)
+    queue: CandidateQueue[int] = CandidateQueue()
+    model: list[int] = []
+    next_item = 0
+    for _ in range(2000):
+        action = rng.random()
+        if action < 0.5 or not model:
+            queue.append(next_item)
+            model.append(next_item)
+            next_item += 1
+        elif action < 0.65:
+            assert queue.popleft() == model.pop(0)
+        elif action < 0.75:
+            queue.remove(model.pop())
+        elif action < 0.95:
+            queue.remove(model.pop(rng.randrange(len(model))))
+        else:
+            queue._rebuild()
+        if rng.random() < 0.05:
+            check(queue, model)
+    check(queue, model)
@@ -0,0 +1,54 @@
+import asyncio
+from typing import Any
+
+import interview_system
+from candidates import CandidateRegistry, CandidateState
+
+
+def test_registry_indexes_candidates_by_connection_token_and_state(connection) -> None:
+    registry = CandidateRegistry()
+    a, b = connection('a'), connection('b')
+    ca = registry.add(a, 'ta', 0.0)
+    cb = registry.add(b, 'tb', 0.0)
+    assert registry.get(a) is ca and registry.session('tb') is cb
+    assert registry.counts() == {'preparing': 2, 'waiting': 0, 'interviewing': 0, 'finished': 0}
+
+    registry.move(ca, CandidateState.WAITING, 1.0)
+    registry.move(cb, CandidateState.WAITING, 2.0)
+    assert list(registry.queue) == [ca, cb] and ca.changed == 1.0
+    registry.move(ca, CandidateState.INTERVIEWING, 3.0)
+    registry.move(ca, CandidateState.FINISHED, 4.0)
+    registry.move(cb, CandidateState.FINISHED, 5.0)
+    assert registry.oldest_finished() is ca
+    assert registry.counts() == {'preparing': 0, 'waiting': 0, 'interviewing': 0, 'finished': 2}
+
+    # 重连换上新连接后，旧连接不再对应任何记录
+    a2 = connection('a2')
+    registry.rebind(ca, a2)
+    assert registry.get(a) is None and registry.get(a2) is ca and ca.id == 'a'
+
+    registry.remove(ca)
+    assert registry.session('ta') is None and registry.get(a2) is None
+    assert registry.oldest_finished() is cb and len(registry) == 1
+
+
+def test_finished_connections_beyond_limit_are_evicted(sent, connection) -> None:
+    async def run() -> None:
+        system = interview_system.InterviewSystem('r', max_finished=1, finished_linger=0)
+        interviewer = connection('interviewer')
+        system.attach_interviewer(interviewer, system.lanes[0])  # type: ignore[arg-type]
+        candidates: list[Any] = [connection(f'c{i}') for i in range(3)]
+        for websocket in candidates:
+            await system.add_interviewee(websocket)
+            await system.parse_interviewee_message(websocket, {'type': 'ready'})
+        for _ in candidates:
+            assert await system.parse_interviewer_message(interviewer, {'type': 'finish'})
+        await asyncio.sleep(0)
+
+        # 只保留最近结束的一位，更早结束的连接被关闭、记录被删除
+        assert [c.close_code for c in candidates] == [interview_system.CLOSE_FINISHED, interview_system.CLOSE_FINISHED, None]
+        assert [system.candidates.get(c) is None for c in candidates] == [True, True, False]
+        assert all(sent[c][-1] == {'type': 'finish'} for c in candidates)
+        system.close()
+
+    asyncio.run(run())
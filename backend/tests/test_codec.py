@@ -0,0 +1,53 @@
+import asyncio
+import json
+from typing import Any, Optional
+
+import pytest
+import websockets
+
+from codec import CODECS, JSON_CODEC, codec_for, select_subprotocol
+
+
+def negotiate(subprotocols: Optional[list[str]]) -> tuple[Optional[str], Any]:
+    """
+    用 select_subprotocol 完成一次真实的握手，返回协商出的子协议和服务端按其编码发来的消息。
+    """
+    async def handler(websocket: Any) -> None:
+        await websocket.send(codec_for(websocket).encode({'type': 'idle'}))
+
+    async def run() -> tuple[Optional[str], Any]:
+        async with websockets.serve(
+            handler, '127.0.0.1', 0, select_subprotocol=select_subprotocol
+        ) as server:
+            port = server.sockets[0].getsockname()[1]
+            async with websockets.connect(
+                f'ws://127.0.0.1:{port}/', subprotocols=subprotocols  # type: ignore[arg-type]
+            ) as websocket:
+                return websocket.subprotocol, await websocket.recv()
+
+    return asyncio.run(run())
+
+
+def test_unknown_subprotocol_falls_back_to_json() -> None:
+    assert select_subprotocol(None, ['ezinterview.unknown']) is None  # type: ignore[arg-type,list-item]
+    # 客户端只请求了不支持的子协议时握手照常完成，不选择子协议，消息使用JSON文本帧
+    subprotocol, frame = negotiate(['ezinterview.unknown'])
+    assert subprotocol is None
+    assert isinstance(frame, str) and json.loads(frame) == {'type': 'idle'}
+    # 没有请求子协议时同样使用JSON
+    assert negotiate(None) == (None, '{"type": "idle"}')
+
+
+def test_first_supported_subprotocol_is_selected() -> None:
+    subprotocol, frame = negotiate(['ezinterview.unknown', JSON_CODEC.subprotocol])
+    assert subprotocol == JSON_CODEC.subprotocol
+    assert json.loads(frame) == {'type': 'idle'}
+
+
+@pytest.mark.parametrize('subprotocol', ['ezinterview.msgpack', 'ezinterview.cbor'])
+def test_binary_subprotocol_when_installed(subprotocol: str) -> None:
+    if subprotocol not in CODECS:
+        pytest.skip(f"未安装 {subprotocol} 对应的库")
+    selected, frame = negotiate(['ezinterview.unknown', subprotocol, JSON_CODEC.subprotocol])
+    assert selected == subprotocol
+    assert isinstance(frame, bytes) and CODECS[subprotocol].decode(frame) == {'type': 'idle'}
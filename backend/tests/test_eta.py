@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+import interview_system
+from eta import (
+    DEFAULT_COUNTING_SECONDS, DEFAULT_QUESTION_SECONDS, DurationStats, InterviewTimer,
+    round_eta, start_offsets
+)
+from rooms import RoomRegistry
+
+
+def test_start_offsets_fill_the_earliest_free_lane() -> None:
+    assert start_offsets([0.0], 100.0, 3) == [0.0, 100.0, 200.0]
+    # 两条通道分别还有 30 秒和 80 秒空闲
+    assert start_offsets([80.0, 30.0], 100.0, 4) == [30.0, 80.0, 130.0, 180.0]
+
+
+def test_duration_stats_learn_from_finished_interviews() -> None:
+    stats = DurationStats(alpha=0.5)
+    assert stats.interview_estimate(['a', 'b']) == DEFAULT_COUNTING_SECONDS + 2 * DEFAULT_QUESTION_SECONDS
+
+    timer = InterviewTimer(0.0)
+    timer.switch('a', 10.0)
+    timer.switch('b', 70.0)
+    timer.switch('a', 100.0)  # 回到第一题，累计到同一道题上
+    timer.switch(None, 120.0)
+    assert timer.counting == 10.0 and timer.spent == {'a': 80.0, 'b': 30.0}
+    stats.observe(timer)
+    # 没有数据的题目按所有题目的平均值估计
+    assert stats.question_estimate('a') == 80.0
+    assert stats.question_estimate('c') == stats.question_mean
+    assert stats.interview_estimate(['a', 'b']) == 10.0 + 80.0 + 30.0
+
+    # 正在第二题上花了 20 秒：剩余 10 秒，之后没有题目
+    timer = InterviewTimer(0.0)
+    timer.switch('b', 10.0)
+    assert stats.remaining(timer, ['a', 'b'], 1, 30.0) == pytest.approx(10.0)
+    assert stats.remaining(timer, ['a', 'b', 'c'], 1, 30.0) == pytest.approx(10.0 + stats.question_estimate('c'))
+
+
+def test_round_eta_rounds_up() -> None:
+    assert round_eta(1_000_000.0) == 1_000_020
+    assert round_eta(1_000_020.0) == 1_000_020
+    assert round_eta(1_000_020.5) == 1_000_050
+
+
+def test_booking_reports_estimated_start(monkeypatch, sent, connection) -> None:
+    monkeypatch.setattr(time, 'time', lambda: 1_000_000.0)
+
+    async def run() -> None:
+        system = interview_system.InterviewSystem('r', booking_lead=60)
+        a, b = connection('a'), connection('b')
+        for websocket in (a, b):
+            await system.add_interviewee(websocket)
+            await system.parse_interviewee_message(websocket, {'type': 'ready'})
+        # 预约只对排队中的面试者有效
+        assert not await system.parse_interviewee_message(a, {'type': 'book'})
+        assert await system.parse_interviewee_message(b, {'type': 'book'})
+
+        per_interview = system.durations.interview_estimate(
+            system.catalog.current.ids(system.get_startup_question_list())
+        )
+        booked = sent[b][-1]
+        assert booked['type'] == 'booked'
+        assert booked['estimatedStart'] == system.candidates.get(b).booked
+        assert booked['estimatedStart'] >= 1_000_000 + per_interview - 1
+        assert booked['reconnectAt'] == booked['estimatedStart'] - 60
+        system.close()
+
+    asyncio.run(run())
+
+
+def test_booked_session_keeps_idle_room_alive(sent, connection) -> None:
+    async def run() -> None:
+        registry: RoomRegistry[interview_system.InterviewSystem] = RoomRegistry(
+            lambda room_id: interview_system.InterviewSystem(room_id, booking_hold=3600, resume_grace=0), 0
+        )
+        system = registry.acquire('r')
+        b, a = connection('b'), connection('a')
+        for websocket in (b, a):
+            await system.add_interviewee(websocket)
+            await system.parse_interviewee_message(websocket, {'type': 'ready'})
+        assert await system.parse_interviewee_message(a, {'type': 'book'})
+        token = system.candidates.get(a).token
+
+        # 所有连接断开后房间里只剩预约者等待重连的会话，房间不被回收
+        await system.pop_interviewee(a)
+        await system.pop_interviewee(b)
+        registry.release('r')
+        assert await registry.sweep() == 0
+        assert registry.get('r') is system
+
+        a2 = connection('a2')
+        await registry.acquire('r').add_interviewee(a2, token)
+        assert system.candidates.session(token).websocket is a2
+        assert sent[a2][0]['type'] != 'session'
+        registry.release('r')
+        await system.pop_interviewee(a2)
+
+        # 没有保留的会话后，空闲超时的房间照常回收
+        assert await registry.sweep() == 1 and len(registry) == 0
+
+    asyncio.run(run())
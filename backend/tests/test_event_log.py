@@ -0,0 +1,117 @@
+import asyncio
+import os
+import threading
+from typing import Any
+
+from event_log import EventLog
+
+
+def write(path: str, events: list[dict[str, Any]], snapshot: Any = None, after: int = 0) -> None:
+    """
+    追加 events，在追加了前 after 个之后记录快照 snapshot，最后同步写入并关闭日志。
+    """
+    async def run() -> None:
+        # 与房间启动时一样先读快照和重放，新事件的序号接在已有事件之后
+        log = EventLog(path, commit_interval=0)
+        log.load_snapshot()
+        list(log.replay())
+        for i, event in enumerate(events):
+            if snapshot is not None and i == after:
+                log.snapshot(snapshot)
+            log.append(event)
+        if snapshot is not None and after == len(events):
+            log.snapshot(snapshot)
+        log.close()
+
+    asyncio.run(run())
+
+
+def replay(path: str) -> tuple[Any, list[dict[str, Any]], EventLog]:
+    log = EventLog(path)
+    snapshot = log.load_snapshot()
+    events = list(log.replay())
+    return snapshot, events, log
+
+
+def test_replay_returns_all_events_without_snapshot(tmp_path) -> None:
+    path = str(tmp_path / 'room-r.log')
+    write(path, [{'event': 'move', 'current': i} for i in range(3)])
+    snapshot, events, log = replay(path)
+    log.close()
+    assert snapshot is None
+    assert [e['seq'] for e in events] == [1, 2, 3]
+    assert [e['current'] for e in events] == [0, 1, 2]
+
+
+def test_replay_starts_after_snapshot(tmp_path) -> None:
+    path = str(tmp_path / 'room-r.log')
+    write(path, [{'event': 'move', 'current': i} for i in range(3)], snapshot={'n': 3}, after=3)
+    write(path, [{'event': 'move', 'current': i} for i in range(3, 5)])
+    snapshot, events, log = replay(path)
+    log.close()
+    assert snapshot == {'n': 3}
+    assert [e['seq'] for e in events] == [4, 5]
+    assert log.seq == 5
+
+
+def test_snapshot_of_uncommitted_events_skips_them(tmp_path) -> None:
+    # 快照记录时前两个事件还在缓冲区中，快照的文件偏移在它们之前，重放时按序号跳过
+    path = str(tmp_path / 'room-r.log')
+    write(path, [{'event': 'move', 'current': i} for i in range(3)], snapshot={'n': 2}, after=2)
+    snapshot, events, log = replay(path)
+    log.close()
+    assert snapshot == {'n': 2}
+    assert [e['seq'] for e in events] == [3]
+
+
+def test_torn_last_record_is_truncated(tmp_path) -> None:
+    path = str(tmp_path / 'room-r.log')
+    write(path, [{'event': 'move', 'current': i} for i in range(2)], snapshot={'n': 2}, after=2)
+    write(path, [{'event': 'move', 'current': i} for i in range(2, 5)])
+    with open(path, 'rb') as f:
+        lines = f.readlines()
+    committed = sum(len(line) for line in lines[:-1])
+    # 最后一个事件只写了一半时进程崩溃
+    with open(path, 'r+b') as f:
+        f.truncate(committed + len(lines[-1]) // 2)
+
+    snapshot, events, log = replay(path)
+    log.close()
+    assert snapshot == {'n': 2}
+    assert [e['seq'] for e in events] == [3, 4]
+    assert os.path.getsize(path) == committed
+
+    # 截断后追加的事件接在最后一个完整事件之后
+    write(path, [{'event': 'hint', 'question': 0}])
+    _, events, log = replay(path)
+    log.close()
+    assert [(e['seq'], e['event']) for e in events] == [(3, 'move'), (4, 'move'), (5, 'hint')]
+
+
+def test_close_waits_for_inflight_batch(tmp_path) -> None:
+    path = str(tmp_path / 'room-r.log')
+    started = threading.Event()
+    release = threading.Event()
+
+    async def run() -> None:
+        log = EventLog(path, commit_interval=0)
+        write = log._write
+
+        def slow_write(batch: bytes, snapshot: Any) -> None:
+            started.set()
+            release.wait()
+            write(batch, snapshot)
+
+        log._write = slow_write  # type: ignore[method-assign]
+        log.append({'event': 'move', 'current': 0})
+        await asyncio.sleep(0)
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        # 第一批已交给写入线程但尚未开始写入时，追加新事件并关闭日志
+        log.append({'event': 'move', 'current': 1})
+        threading.Timer(0.05, release.set).start()
+        log.close()
+
+    asyncio.run(run())
+    _, events, log = replay(path)
+    log.close()
+    assert [e['seq'] for e in events] == [1, 2]
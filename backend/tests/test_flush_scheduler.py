@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from flush_scheduler import FlushScheduler
+
+
+def test_marks_are_coalesced_and_flushed_in_order() -> None:
+    calls: list[str] = []
+
+    async def run() -> None:
+        def flusher(name: str):
+            async def flush() -> None:
+                calls.append(name)
+                if name == 'current' and calls.count('current') == 1:
+                    # 刷新过程中产生的新标记在这一轮结束后再刷新一次
+                    scheduler.mark('queue')
+            return flush
+
+        scheduler = FlushScheduler({name: flusher(name) for name in ('current', 'queue')}, 0.01)
+        for _ in range(3):
+            scheduler.mark('queue')
+            scheduler.mark('current')
+        assert scheduler.pending
+        await asyncio.sleep(0)
+        assert calls == []
+        await asyncio.sleep(0.05)
+        assert calls == ['current', 'queue', 'queue']
+        assert not scheduler.pending
+
+        # 关闭后尚未执行的刷新被取消
+        scheduler.mark('current')
+        scheduler.close()
+        await asyncio.sleep(0.05)
+        assert calls == ['current', 'queue', 'queue']
+
+    asyncio.run(run())
+
+
+def test_failing_flusher_does_not_stop_others() -> None:
+    calls: list[str] = []
+
+    async def run() -> None:
+        async def fail() -> None:
+            raise RuntimeError('boom')
+
+        async def queue() -> None:
+            calls.append('queue')
+
+        scheduler = FlushScheduler({'current': fail, 'queue': queue})
+        scheduler.mark('current', 'queue')
+        await scheduler.flush_now()
+        assert calls == ['queue']
+        with pytest.raises(KeyError):
+            scheduler.mark('unknown')
+
+    asyncio.run(run())
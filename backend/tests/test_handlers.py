@@ -0,0 +1,32 @@
+import asyncio
+from typing import Any
+
+import websockets
+
+from cluster import ROLE_INTERVIEWEE
+from interview_system import InterviewSystem
+from server import InterviewServer
+
+
+def test_failed_setup_releases_admission_and_room(monkeypatch) -> None:
+    service = InterviewServer()
+    registry = service.rooms
+
+    async def fail(self: Any, websocket: Any, token: Any) -> None:
+        raise websockets.ConnectionClosedError(None, None)
+
+    monkeypatch.setattr(InterviewSystem, 'add_interviewee', fail)
+    control = service.admission[ROLE_INTERVIEWEE]
+    active = control.active
+
+    async def run() -> None:
+        async with websockets.serve(service.interviewee_handler, '127.0.0.1', 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            async with websockets.connect(f'ws://127.0.0.1:{port}/r1') as websocket:
+                await websocket.wait_closed()
+            # 处理函数结束后服务器才关闭连接，此时房间已没有连接计数
+            assert registry._connections == {'r1': 0}
+        registry.close_all()
+
+    asyncio.run(run())
+    assert control.active == active
@@ -0,0 +1,65 @@
+import asyncio
+import socket
+from types import SimpleNamespace
+from typing import Any
+
+from admin import AdminServer
+from cluster import ROLE_INTERVIEWEE
+from server import CLOSE_SERVICE_RESTART, InterviewServer, take_over
+
+
+def test_handoff_transfers_listeners_and_sessions(tmp_path, sent, connection) -> None:
+    service = InterviewServer()
+    service.drain_spread = 1.0
+    old = service.rooms
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    server = SimpleNamespace(sockets=[listener], close=lambda close_connections=True: None)
+    service.servers = {ROLE_INTERVIEWEE: server}  # type: ignore[dict-item]
+    path = str(tmp_path / 'admin.sock')
+
+    async def run() -> None:
+        system = old.acquire('r')
+        interviewer = connection('i')
+        system.attach_interviewer(interviewer, system.lanes[0])
+        a, b, c = connection('a'), connection('b'), connection('c')
+        for websocket in (a, b, c):
+            await system.add_interviewee(websocket)
+            await system.parse_interviewee_message(websocket, {'type': 'ready'})
+        token = system.candidates.get(c).token
+
+        admin = AdminServer(path, {'handoff': service.admin_handoff})
+        admin.start()
+        body, listeners = await asyncio.get_running_loop().run_in_executor(None, take_over, path)
+        await asyncio.sleep(0.05)
+        admin.close()
+
+        # 新进程拿到同一个监听套接字的副本和房间的全部会话
+        inherited = listeners[ROLE_INTERVIEWEE]
+        assert inherited.getsockname() == listener.getsockname()
+        assert inherited.fileno() != listener.fileno()
+        inherited.close()
+        assert [s['token'] for s in body['rooms']['r']['sessions']][-1] == token
+
+        # 旧进程开始排空：面试中的连接立即重连，排队者按位置在 spread 秒内分批重连
+        assert service.draining
+        assert sent[interviewer][-1] == sent[a][-1] == {'type': 'reconnect', 'after': 0.0}
+        after: list[Any] = [sent[websocket][-1]['after'] for websocket in (b, c)]
+        assert 0 <= after[0] < 0.5 <= after[1] < 1.0
+        assert all(w.close_code == CLOSE_SERVICE_RESTART for w in (interviewer, a, b, c))
+        assert service.admission[ROLE_INTERVIEWEE].paused
+
+        # 新进程恢复交接的状态，面试者凭令牌重连回到原来的排队位置
+        successor = InterviewServer()
+        successor.restore_handoff(body)
+        new = successor.rooms
+        c2 = connection('c2')
+        await new.get('r').add_interviewee(c2, token)
+        assert sent[c2][0]['type'] == 'waiting' and sent[c2][0]['queueCount'] == 2
+        new.close_all()
+
+    try:
+        asyncio.run(run())
+    finally:
+        listener.close()
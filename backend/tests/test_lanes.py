@@ -0,0 +1,63 @@
+import asyncio
+
+import interview_system
+
+
+def test_lanes_share_one_queue(sent, connection) -> None:
+    async def run() -> None:
+        system = interview_system.InterviewSystem('r', lanes=2)
+        first, second = connection('i1'), connection('i2')
+        for interviewer in (first, second):
+            # 不指定通道时进入第一条没有面试官的通道
+            system.attach_interviewer(interviewer, system.choose_lane(None))
+        assert [lane.interviewer for lane in system.lanes] == [first, second]
+        assert system.choose_lane(2) is system.lanes[1]
+
+        candidates = [connection(f'c{i}') for i in range(4)]
+        for websocket in candidates:
+            await system.add_interviewee(websocket)
+            await system.parse_interviewee_message(websocket, {'type': 'ready'})
+        lanes = [system.lane_of(system.candidates.get(c)) for c in candidates]
+        assert lanes == [system.lanes[0], system.lanes[1], None, None]
+        assert [c.websocket for c in system.candidates.queue] == candidates[2:]
+
+        # 第二条通道先结束，队首的面试者进入该通道；第一条通道不受影响
+        assert await system.parse_interviewer_message(second, {'type': 'finish'})
+        assert system.lane_of(system.candidates.get(candidates[2])) is system.lanes[1]
+        assert system.lanes[0].candidate.websocket is candidates[0]
+        assert [c.websocket for c in system.candidates.queue] == candidates[3:]
+
+        # 面试官的消息只作用于自己的通道
+        assert await system.parse_interviewer_message(first, {'type': 'next', 'rating': 5})
+        assert system.lanes[0].current_question == 1
+        assert system.lanes[1].current_question == 0
+
+        await system.flusher.flush_now()
+        # 排队者看到的剩余题数取最快结束的那场面试
+        remaining = len(system.lanes[0].current_questions_list) - 1
+        assert sent[candidates[3]][-1]['queueQuestionCount'] == remaining
+        assert sent[candidates[2]][-1]['type'] != 'waiting'
+        system.close()
+
+    asyncio.run(run())
+
+
+def test_interviewer_commands_on_idle_lane_are_rejected(sent, connection) -> None:
+    async def run() -> None:
+        system = interview_system.InterviewSystem('r', lanes=2)
+        interviewer = connection('i2')
+        system.attach_interviewer(interviewer, system.choose_lane(2))
+        await system.flusher.flush_now()
+        frames = len(sent[interviewer])
+
+        # 通道上还没有面试者，切题、提示、结束等指令都被拒绝，不影响连接
+        for message_type in ('next', 'last', 'hint', 'finish', 'select', 'comment_patch'):
+            assert not await system.parse_interviewer_message(
+                interviewer, {'type': message_type, 'rating': 5, 'selection': [0], 'question': 0, 'version': 0}
+            )
+        await system.flusher.flush_now()
+        assert len(sent[interviewer]) == frames
+        assert system.lanes[1].state == 'idle' and system.lanes[1].current_questions_list == []
+        system.close()
+
+    asyncio.run(run())
@@ -0,0 +1,107 @@
+import json
+import logging
+import queue
+from typing import Any
+
+import pytest
+
+import log_pipeline
+from log_pipeline import LazyQueueHandler, RateLimitedLogger, setup_logging, stop_logging
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def records() -> Any:
+    """
+    直接截获测试记录器的日志记录。
+    """
+    captured: list[logging.LogRecord] = []
+    handler = logging.Handler()
+    handler.emit = captured.append  # type: ignore[method-assign]
+    logger = logging.getLogger('test_log_pipeline')
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.addHandler(handler)
+    yield logger, captured
+    logger.removeHandler(handler)
+    logger.propagate = True
+
+
+def test_rate_limited_logger_reports_suppressed(monkeypatch, records) -> None:
+    logger, captured = records
+    clock = Clock()
+    monkeypatch.setattr(log_pipeline.time, 'monotonic', clock)
+    monkeypatch.setattr(log_pipeline, '_debug_rate', 5.0)
+    limited = RateLimitedLogger(logger)
+
+    for i in range(20):
+        limited.debug("消息 %d", i)
+    assert [r.getMessage() for r in captured] == [f"消息 {i}" for i in range(5)]
+    assert not any(hasattr(r, 'suppressed') for r in captured)
+
+    # 一秒后令牌补满，下一条放行的记录带上期间丢弃的条数
+    clock.now += 1
+    limited.warning("警告")
+    assert captured[-1].getMessage() == "警告" and captured[-1].suppressed == 15
+
+    # 速率为0时不限流
+    monkeypatch.setattr(log_pipeline, '_debug_rate', 0.0)
+    captured.clear()
+    for i in range(50):
+        limited.debug("消息 %d", i)
+    assert len(captured) == 50
+
+
+def test_pipeline_limits_each_call_site_once(monkeypatch, tmp_path) -> None:
+    clock = Clock()
+    monkeypatch.setattr(log_pipeline.time, 'monotonic', clock)
+    path = tmp_path / 'server.log'
+    root = logging.getLogger()
+    saved = (root.level, list(root.handlers))
+    try:
+        setup_logging(str(path), json_lines=True, debug_rate=5, console_level=logging.CRITICAL)
+        # 日志队列上没有第二个限流器，限流完全由 RateLimitedLogger 决定
+        assert all(not handler.filters for handler in root.handlers)
+        limited = RateLimitedLogger(logging.getLogger('test_log_pipeline.site'))
+        for i in range(20):
+            limited.debug("消息 %d", i)
+        clock.now += 1
+        limited.debug("之后")
+        stop_logging()
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.setLevel(saved[0])
+        for handler in saved[1]:
+            root.addHandler(handler)
+
+    entries = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [e['message'] for e in entries] == [f"消息 {i}" for i in range(5)] + ["之后"]
+    assert entries[-1]['suppressed'] == 15
+
+
+def test_queue_handler_snapshots_mutable_args() -> None:
+    handler = LazyQueueHandler(queue.Queue())
+    logger = logging.getLogger('test_log_pipeline.queue')
+    payload: dict[str, Any] = {'type': 'waiting', 'queueCount': 1}
+
+    mutable = logger.makeRecord(logger.name, logging.DEBUG, __file__, 1, "发送 %s", (payload,), None)
+    handler.handle(mutable)
+    payload['queueCount'] = 2
+    queued = handler.queue.get_nowait()  # type: ignore[union-attr]
+    # 可变参数在入队时就格式化，之后的修改不影响日志内容
+    assert queued.args is None
+    assert queued.getMessage() == "发送 {'type': 'waiting', 'queueCount': 1}"
+
+    # 参数都是不可变的标量时保持原样，格式化留给监听线程
+    scalar = logger.makeRecord(logger.name, logging.DEBUG, __file__, 1, "%s 第 %d 题", ('r', 3), None)
+    handler.handle(scalar)
+    queued = handler.queue.get_nowait()  # type: ignore[union-attr]
+    assert queued.msg == "%s 第 %d 题" and queued.args == ('r', 3)
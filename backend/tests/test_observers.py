@@ -0,0 +1,165 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import Any
+
+import websockets
+from websockets.protocol import State
+
+import interview_system
+from interview_system import InterviewSystem
+from outbox import close_outbox, get_outbox, open_outbox
+from server import MESSAGES_REJECTED, OBSERVER_OUTBOX_SIZE, OUTBOX_SIZE, InterviewServer
+
+
+class QueuedConnection:
+    """
+    写缓冲区总是满的连接，所有帧都经过发送队列的写任务；release 之前写任务卡在第一帧上。
+    """
+
+    subprotocol = None
+
+    def __init__(self, id: str, slow: bool = False) -> None:
+        self.id = id
+        self.state = State.OPEN
+        self.transport = SimpleNamespace(get_write_buffer_size=lambda: 1 << 20)
+        self.release = asyncio.Event()
+        if not slow:
+            self.release.set()
+        self.sent: list[Any] = []
+
+    async def send(self, frame: Any) -> None:
+        await self.release.wait()
+        self.sent.append(json.loads(frame))
+
+    def __repr__(self) -> str:
+        return f'QueuedConnection({self.id!r})'
+
+
+async def start_interview(system: InterviewSystem, interviewer: Any, candidate: Any) -> None:
+    system.attach_interviewer(interviewer, system.lanes[0])
+    await system.add_interviewee(candidate)
+    await system.parse_interviewee_message(candidate, {'type': 'ready'})
+    await system.parse_interviewee_message(candidate, {'type': 'start'})
+    await system.flusher.flush_now()
+
+
+def test_observers_share_one_encoded_frame(monkeypatch, connection) -> None:
+    frames: list[tuple[Any, Any]] = []
+    monkeypatch.setattr(
+        interview_system, 'put_frame', lambda websocket, frame, droppable=True: frames.append((websocket, frame))
+    )
+    views: list[tuple[bool, bool]] = []
+    interviewer_view = InterviewSystem.interviewer_view
+
+    def counting_view(self: Any, lane: Any, with_mains: bool, with_comment: bool = True) -> str:
+        views.append((with_mains, with_comment))
+        return interviewer_view(self, lane, with_mains, with_comment)
+
+    monkeypatch.setattr(InterviewSystem, 'interviewer_view', counting_view)
+
+    async def run() -> None:
+        system = InterviewSystem('r')
+        observers = [connection(f'o{i}') for i in range(5)]
+        for observer in observers:
+            system.attach_observer(observer, system.lanes[0])
+        interviewer = connection('i')
+        await start_interview(system, interviewer, connection('c'))
+        frames.clear()
+        views.clear()
+
+        assert await system.parse_interviewer_message(interviewer, {'type': 'next', 'rating': 3})
+        await system.flusher.flush_now()
+
+        # 五个旁观者共享同一份编码后的帧，视图的构造次数与旁观者人数无关
+        by_connection = dict(frames)
+        assert {interviewer, *observers} <= by_connection.keys()
+        shared = by_connection[observers[0]]
+        assert all(by_connection[o] is shared for o in observers)
+        assert json.loads(shared)['currentQuestion'] == 1
+        assert len(views) == len(set(views)) <= 2
+        system.close()
+
+    asyncio.run(run())
+
+
+def test_slow_observer_resyncs_alone(monkeypatch) -> None:
+    async def run() -> None:
+        system = InterviewSystem('r')
+        interviewer, fast, slow = QueuedConnection('i'), QueuedConnection('o1'), QueuedConnection('o2', True)
+        candidate = QueuedConnection('c')
+        connections = (interviewer, fast, slow, candidate)
+        open_outbox(interviewer, OUTBOX_SIZE, 'latest', lambda: system.resync(interviewer))  # type: ignore[arg-type]
+        open_outbox(candidate, OUTBOX_SIZE, 'latest', lambda: system.resync(candidate))  # type: ignore[arg-type]
+        for observer in (fast, slow):
+            open_outbox(
+                observer, OBSERVER_OUTBOX_SIZE, 'latest',  # type: ignore[arg-type]
+                lambda observer=observer: system.resync_observer(observer)  # type: ignore[misc]
+            )
+            system.attach_observer(observer, system.lanes[0])  # type: ignore[arg-type]
+        await start_interview(system, interviewer, candidate)
+        resyncs: list[Any] = []
+        monkeypatch.setattr(system, 'resync', resyncs.append)
+        resync_observer = system.resync_observer
+        observer_resyncs: list[Any] = []
+
+        def counting_resync(websocket: Any) -> None:
+            observer_resyncs.append(websocket)
+            resync_observer(websocket)
+
+        monkeypatch.setattr(system, 'resync_observer', counting_resync)
+        await asyncio.sleep(0)
+        initial = len(interviewer.sent)
+
+        # 面试官连续切题，慢旁观者的发送队列溢出
+        rounds = OBSERVER_OUTBOX_SIZE * 2
+        for _ in range(rounds):
+            await system.parse_interviewer_message(interviewer, {'type': 'next'})
+            await system.parse_interviewer_message(interviewer, {'type': 'last'})
+            await system.flusher.flush_now()
+            await asyncio.sleep(0)
+        await system.flusher.flush_now()
+        await asyncio.sleep(0)
+
+        # 面试官和其他旁观者每次刷新都收到一帧，没有被延迟、丢弃或重新同步
+        assert len(interviewer.sent) == len(fast.sent) == initial + rounds
+        assert get_outbox(interviewer).dropped == get_outbox(fast).dropped == 0  # type: ignore[arg-type,union-attr]
+        assert resyncs == []
+        assert sum('questionMains' in frame for frame in fast.sent) == 1
+
+        # 只有慢旁观者丢弃了过期帧并重新同步，之后收到带题库的完整快照，最终追上最新状态
+        assert get_outbox(slow).dropped > 0  # type: ignore[arg-type,union-attr]
+        assert observer_resyncs and set(observer_resyncs) == {slow}
+        slow.release.set()
+        await get_outbox(slow).drained()  # type: ignore[arg-type,union-attr]
+        assert len(slow.sent) < len(fast.sent)
+        assert sum('questionMains' in frame for frame in slow.sent) > 1
+        assert slow.sent[-1]['currentQuestion'] == fast.sent[-1]['currentQuestion'] == 0
+        for websocket in connections:
+            close_outbox(websocket)  # type: ignore[arg-type]
+        system.close()
+
+    asyncio.run(run())
+
+
+def test_observer_messages_are_rejected() -> None:
+    service = InterviewServer()
+    registry = service.rooms
+    rejected = MESSAGES_REJECTED.labels('observer', 'read_only')
+    before = rejected.value
+
+    async def run() -> None:
+        async with websockets.serve(service.interviewer_handler, '127.0.0.1', 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            async with websockets.connect(f'ws://127.0.0.1:{port}/r?observe=1') as websocket:
+                assert json.loads(await websocket.recv()) == {'type': 'idle'}
+                await websocket.send(json.dumps({'type': 'start'}))
+                await websocket.send(json.dumps({'type': 'finish'}))
+        system = registry.get('r')
+        # 旁观者的指令全部被忽略，通道仍然空闲，也没有被当作面试官
+        assert rejected.value == before + 2
+        assert system.lanes[0].state == 'idle' and system.lanes[0].interviewer is None
+        assert not system.lanes[0].observers
+        registry.close_all()
+
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
+from websockets.protocol import State
+
+from outbox import Outbox
+
+
+class SlowConnection:
+    """
+    写缓冲区总是满的连接，写任务在 release 之前卡在第一帧上。
+    """
+
+    id = 'slow'
+
+    def __init__(self) -> None:
+        self.state = State.OPEN
+        self.transport = SimpleNamespace(get_write_buffer_size=lambda: 1 << 20)
+        self.release = asyncio.Event()
+        self.sent: list[Any] = []
+        self.close_code: Any = None
+
+    async def send(self, frame: Any) -> None:
+        await self.release.wait()
+        self.sent.append(frame)
+
+    async def close(self, code: int = 1000, reason: str = '') -> None:
+        self.close_code = code
+        self.state = State.CLOSED
+
+
+def test_latest_policy_drops_stale_frames_and_resyncs() -> None:
+    async def run() -> None:
+        websocket = SlowConnection()
+        resyncs: list[int] = []
+        outbox = Outbox(websocket, 3, 'latest', lambda: resyncs.append(outbox.depth))  # type: ignore[arg-type]
+        assert outbox.put('s0')
+        await asyncio.sleep(0)  # 写任务取走 s0 并卡住
+        assert outbox.put('s1') and outbox.put('finish', droppable=False) and outbox.put('s2')
+        assert outbox.depth == 3
+
+        # 队列已满：丢弃所有状态帧（包括新的这一帧），保留一次性通知，并要求重新同步
+        assert not outbox.put('s3')
+        assert outbox.depth == 1 and outbox.dropped == 3
+        assert resyncs == [1]
+
+        # 队列已满时的一次性通知在丢弃状态帧后仍能入队
+        assert outbox.put('s4') and outbox.put('s5')
+        assert outbox.put('reject', droppable=False)
+        assert outbox.dropped == 5 and resyncs == [1, 1]
+
+        websocket.release.set()
+        await outbox.drained()
+        assert websocket.sent == ['s0', 'finish', 'reject']
+        assert websocket.close_code is None
+
+    asyncio.run(run())
+
+
+def test_disconnect_policy_closes_slow_connection() -> None:
+    async def run() -> None:
+        websocket = SlowConnection()
+        outbox = Outbox(websocket, 2, 'disconnect')  # type: ignore[arg-type]
+        for frame in ('s0', 's1', 's2'):
+            assert outbox.put(frame)
+            await asyncio.sleep(0)
+        assert not outbox.put('s3')
+        await asyncio.sleep(0)
+        assert websocket.close_code == 1013
+        assert outbox.depth == 0
+        # 断开后不再接受任何帧
+        assert not outbox.put('finish', droppable=False)
+        outbox.close()
+
+    asyncio.run(run())
@@ -0,0 +1,36 @@
+import asyncio
+import time
+
+import profiling
+from profiling import SLOW_CALLBACKS, LoopMonitor
+
+
+def test_slow_callback_is_counted() -> None:
+    async def run() -> None:
+        monitor = LoopMonitor(slow_callback=0.01)
+        monitor.install()
+        try:
+            before = SLOW_CALLBACKS.labels().value
+            asyncio.get_running_loop().call_soon(time.sleep, 0.02)
+            await asyncio.sleep(0.01)
+            assert SLOW_CALLBACKS.labels().value == before + 1
+        finally:
+            monitor.uninstall()
+
+    asyncio.run(run())
+
+
+def test_falls_back_to_debug_mode_without_handle_internals(monkeypatch) -> None:
+    monkeypatch.setattr(profiling, 'handle_internals_available', lambda loop: False)
+    run = asyncio.Handle._run  # type: ignore[attr-defined]
+
+    async def check() -> None:
+        loop = asyncio.get_running_loop()
+        monitor = LoopMonitor(slow_callback=0.25)
+        monitor.install()
+        assert asyncio.Handle._run is run  # type: ignore[attr-defined]
+        assert loop.get_debug() and loop.slow_callback_duration == 0.25
+        monitor.uninstall()
+        assert not loop.get_debug() and loop.slow_callback_duration == 0.1
+
+    asyncio.run(check(), debug=False)
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import threading
+
+import pytest
+
+import question_catalog
+from interview_system import InterviewSystem
+from question_catalog import QuestionCatalog, load_bank, question_id
+
+
+def write_bank(path, questions: list[dict], **extra) -> str:
+    path.write_text(json.dumps({'questions': questions, **extra}, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def question(main: str, **fields) -> dict:
+    return {'main': main, 'keywords': '', 'hint': '', **fields}
+
+
+def test_question_ids_are_explicit_or_derived_from_text(tmp_path) -> None:
+    bank = load_bank(write_bank(tmp_path / 'q.json', [question('甲', id='a'), question('乙')]))
+    assert bank.ids([0, 1]) == ['a', question_id('乙')]
+
+    # 调整顺序后同一道题的标识不变
+    bank = load_bank(write_bank(tmp_path / 'q.json', [question('乙'), question('甲', id='a')]))
+    assert bank.ids([1, 0]) == ['a', question_id('乙')]
+
+    with pytest.raises(ValueError):
+        load_bank(write_bank(tmp_path / 'q.json', [question('甲', id='a'), question('乙', id='a')]))
+
+
+def rewrite(path, questions: list[dict], **extra) -> None:
+    write_bank(path, questions, **extra)
+    # 保证修改时间与上次加载时不同
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_check_reloads_changed_file_in_a_thread(monkeypatch, tmp_path) -> None:
+    path = tmp_path / 'q.json'
+    catalog = QuestionCatalog(write_bank(path, [question('甲')]))
+    threads: list[int] = []
+
+    def traced_load(*args):
+        threads.append(threading.get_ident())
+        return load_bank(*args)
+
+    monkeypatch.setattr(question_catalog, 'load_bank', traced_load)
+
+    async def run() -> None:
+        assert not await catalog.check()
+        rewrite(path, [question('甲'), question('乙')])
+        assert await catalog.check()
+        # 文件没有再变化时不重复加载
+        assert not await catalog.check()
+
+    asyncio.run(run())
+    assert [q.main for q in catalog.current] == ['甲', '乙'] and catalog.current.version == 1
+    assert threads and threading.get_ident() not in threads
+
+
+def test_malformed_file_keeps_previous_bank(tmp_path) -> None:
+    path = tmp_path / 'q.json'
+    catalog = QuestionCatalog(write_bank(path, [question('甲')]))
+    previous = catalog.current
+
+    async def run() -> None:
+        rewrite(path, [{'main': '缺少要点和提示'}])
+        assert not await catalog.check()
+        assert catalog.current is previous
+        path.write_text('{', encoding='utf-8')
+        assert not await catalog.areload()
+        assert catalog.current is previous
+        # 修复文件后照常加载
+        rewrite(path, [question('乙')])
+        assert await catalog.check()
+
+    asyncio.run(run())
+    assert [q.main for q in catalog.current] == ['乙'] and catalog.current.version == 1
+
+
+def test_lanes_keep_their_bank_until_the_next_interview(tmp_path, sent, connection) -> None:
+    path = tmp_path / 'q.json'
+    catalog = QuestionCatalog(write_bank(path, [question('甲'), question('乙')], startup=[0, 1]))
+    old = catalog.current
+
+    async def run() -> None:
+        system = InterviewSystem('r', catalog=catalog)
+        lane = system.lanes[0]
+        interviewer = connection('i')
+        system.attach_interviewer(interviewer, lane)
+        a, b = connection('a'), connection('b')
+        for websocket in (a, b):
+            await system.add_interviewee(websocket)
+            await system.parse_interviewee_message(websocket, {'type': 'ready'})
+        await system.parse_interviewee_message(a, {'type': 'start'})
+        assert lane.bank is old
+
+        # 面试进行中重新加载题库，当前面试继续使用旧题库
+        rewrite(path, [question('丙'), question('丁')], startup=[0, 1])
+        assert await catalog.check()
+        assert await system.parse_interviewer_message(interviewer, {'type': 'next'})
+        await system.flusher.flush_now()
+        assert lane.bank is old and sent[interviewer][-1]['questionMain'] == '乙'
+
+        # 下一场面试开始时换用新题库
+        assert await system.parse_interviewer_message(interviewer, {'type': 'finish'})
+        await system.parse_interviewee_message(b, {'type': 'start'})
+        await system.flusher.flush_now()
+        assert lane.bank is catalog.current is not old
+        assert sent[interviewer][-1]['questionMain'] == '丙'
+        system.close()
+
+    asyncio.run(run())
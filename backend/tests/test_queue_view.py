@@ -0,0 +1,58 @@
+import asyncio
+import time
+from typing import Any
+
+import interview_system
+
+
+def test_queue_view_sends_full_view_then_only_changed_fields(monkeypatch, sent, connection) -> None:
+    # 固定墙上时间，预计开始时间只随排队情况变化
+    monkeypatch.setattr(time, 'time', lambda: 1_000_000.0)
+
+    async def run() -> None:
+        system = interview_system.InterviewSystem('r')
+        a, b, c = connection('a'), connection('b'), connection('c')
+        await system.add_interviewee(a)
+        await system.flusher.flush_now()
+        session, full = sent[a]
+        assert session['type'] == 'session'
+        assert set(full) == {
+            'type', 'queueCount', 'estimatedStart', 'questionTitles', 'queueQuestionCount'
+        }
+        assert full['type'] == 'preparing' and full['queueCount'] == 0
+
+        # b 直接进入空闲的通道，a 只收到排队人数、预计开始时间和剩余题数的变化
+        await system.add_interviewee(b)
+        await system.parse_interviewee_message(b, {'type': 'ready'})
+        await system.flusher.flush_now()
+        delta = sent[a][-1]
+        assert set(delta) == {'type', 'queueCount', 'estimatedStart', 'queueQuestionCount'}
+        assert delta['queueCount'] == 1
+
+        # 视图没有变化时不发送任何消息
+        count = len(sent[a])
+        system.schedule_flush('queue')
+        await system.flusher.flush_now()
+        assert len(sent[a]) == count
+
+        # c 排队，收到完整的等待视图；a 前面的人数随之增加
+        await system.add_interviewee(c)
+        await system.parse_interviewee_message(c, {'type': 'ready'})
+        await system.flusher.flush_now()
+        assert set(sent[c][-1]) == set(full) and sent[c][-1]['type'] == 'waiting'
+        assert sent[c][-1]['queueCount'] == 1
+        assert sent[a][-1] == {
+            'type': 'preparing', 'queueCount': 2,
+            'estimatedStart': sent[a][-1]['estimatedStart'],
+        }
+        assert sent[a][-1]['estimatedStart'] > delta['estimatedStart']
+
+        # 发送队列丢弃过期帧后重新同步，再次发送完整视图
+        system.resync(a)
+        await system.flusher.flush_now()
+        resynced: dict[str, Any] = sent[a][-1]
+        assert set(resynced) == set(full)
+        assert resynced['queueCount'] == 2
+        system.close()
+
+    asyncio.run(run())
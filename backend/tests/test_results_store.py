@@ -0,0 +1,55 @@
+import asyncio
+import sqlite3
+
+from results_store import ResultsStore
+
+
+def count_rows(path: str) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_results_are_group_committed_off_the_loop(tmp_path) -> None:
+    path = str(tmp_path / 'results.db')
+    store = ResultsStore(path, commit_interval=0.05)
+
+    async def run() -> None:
+        for q in range(3):
+            store.record('r', 'c1', q, f'q{q}', q + 1, '', False)
+        store.finish('r', 'c1')
+        # 记录只进入缓冲区，不在事件循环中写库
+        assert count_rows(path) == 0
+        await asyncio.sleep(0.2)
+        assert count_rows(path) == 3
+
+        # 查询前先写入缓冲区中的结果
+        store.record('r', 'c1', 0, 'q0', 5, '很好', True)
+        assert store.candidate_results('c1')[0]['rating'] == 5
+        assert store.average_ratings()['q0'] == (5, 1)
+
+    asyncio.run(run())
+    store.close()
+
+
+def test_record_outside_event_loop_writes_immediately(tmp_path) -> None:
+    path = str(tmp_path / 'results.db')
+    store = ResultsStore(path)
+    store.record('r', 'c1', 0, 'q0', 4, '', False)
+    assert count_rows(path) == 1
+    assert store.candidates_with_rating('q0', 3) == [('r', 'c1', 4)]
+    store.close()
+
+
+def test_stats_follow_question_ids_across_bank_reloads() -> None:
+    store = ResultsStore()
+    # 题库重新加载后同一道题从索引 0 移到了索引 2，另一道题占用了索引 0
+    store.record('r', 'c1', 0, 'alpha', 4, '', False)
+    store.record('r', 'c2', 2, 'alpha', 2, '', False)
+    store.record('r', 'c2', 0, 'beta', 5, '', False)
+    assert store.average_ratings() == {'alpha': (3, 2), 'beta': (5, 1)}
+    assert store.candidates_with_rating('alpha', 3) == [('r', 'c1', 4)]
+    assert [row['question_id'] for row in store.candidate_results('c2')] == ['beta', 'alpha']
+    store.close()
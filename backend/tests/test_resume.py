@@ -0,0 +1,51 @@
+import asyncio
+
+import interview_system
+
+
+def test_resume_keeps_queue_slot_and_rejects_stale_tokens(sent, connection) -> None:
+    async def run() -> None:
+        system = interview_system.InterviewSystem('r', resume_grace=0.05)
+        b, a, c = connection('b'), connection('a'), connection('c')
+        for websocket in (b, a, c):
+            await system.add_interviewee(websocket)
+            await system.parse_interviewee_message(websocket, {'type': 'ready'})
+        await system.flusher.flush_now()
+        token = sent[a][0]['token']
+
+        # a 断线后凭令牌重连，回到原来的排队位置，只收到一帧完整快照
+        await system.pop_interviewee(a)
+        assert system.detached_count == 1
+        a2 = connection('a2')
+        await system.add_interviewee(a2, token)
+        assert sent[a2] == [{
+            'type': 'waiting', 'queueCount': 1,
+            'estimatedStart': sent[a2][0]['estimatedStart'],
+            **system.queue_shared_data(),
+        }]
+        assert system.detached_count == 0
+        assert list(system.candidates.queue)[0].websocket is a2
+
+        # 旧连接尚未断开时，新连接接管会话并关闭旧连接
+        a3 = connection('a3')
+        await system.add_interviewee(a3, token)
+        await asyncio.sleep(0)
+        assert a2.close_code == interview_system.CLOSE_SESSION_RESUMED
+        assert system.candidates.session(token).websocket is a3
+
+        # 未知的令牌按新会话处理
+        d = connection('d')
+        await system.add_interviewee(d, 'unknown')
+        assert sent[d][0]['type'] == 'session' and sent[d][0]['token'] != 'unknown'
+
+        # 宽限期过后会话被移除，旧令牌失效，后面的人依次前移
+        await system.pop_interviewee(a3)
+        await asyncio.sleep(0.1)
+        assert system.candidates.session(token) is None
+        assert list(system.candidates.queue)[0].websocket is c
+        a4 = connection('a4')
+        await system.add_interviewee(a4, token)
+        assert sent[a4][0]['type'] == 'session' and sent[a4][0]['token'] != token
+        system.close()
+
+    asyncio.run(run())
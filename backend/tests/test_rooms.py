@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+import rooms
+from interview_system import InterviewSystem
+from rooms import RoomRegistry, parse_room_id
+
+
+class FakeRoom:
+    def __init__(self, room_id: str) -> None:
+        self.room_id = room_id
+        self.detached_count = 0
+        self.flushed = 0
+        self.closed = 0
+
+    async def flush(self) -> None:
+        self.flushed += 1
+
+    def close(self) -> None:
+        self.closed += 1
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(rooms.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.mark.parametrize('path, room_id', [
+    ('/', ''),
+    ('', ''),
+    ('/room1', 'room1'),
+    ('/room-1_A/', 'room-1_A'),
+    ('/abc?token=x&lane=2', 'abc'),
+    ('/' + 'a' * 64, 'a' * 64),
+])
+def test_parse_room_id(path: str, room_id: str) -> None:
+    assert parse_room_id(path) == room_id
+
+
+@pytest.mark.parametrize('path', ['/a/b', '/房间', '/a b', '/a.b', '/' + 'a' * 65])
+def test_parse_room_id_rejects_invalid_paths(path: str) -> None:
+    assert parse_room_id(path) is None
+
+
+def test_rooms_do_not_share_queues(sent, connection) -> None:
+    async def run() -> None:
+        registry: RoomRegistry[InterviewSystem] = RoomRegistry(InterviewSystem, 600)
+        first, second = registry.acquire('a'), registry.acquire('b')
+        assert first is not second and registry.acquire('a') is first and len(registry) == 2
+        a1, a2, b1 = connection('a1'), connection('a2'), connection('b1')
+        for system, websocket in ((first, a1), (first, a2), (second, b1)):
+            await system.add_interviewee(websocket)
+            await system.parse_interviewee_message(websocket, {'type': 'ready'})
+        await first.flusher.flush_now()
+        await second.flusher.flush_now()
+
+        # 每个房间各自把第一位面试者安排进自己的通道，a2 只排在同一房间的 a1 之后
+        assert first.lanes[0].candidate.websocket is a1
+        assert second.lanes[0].candidate.websocket is b1
+        assert [c.websocket for c in first.candidates.queue] == [a2]
+        assert not second.candidates.queue
+        assert sent[a2][-1]['type'] == 'waiting' and sent[a2][-1]['queueCount'] == 1
+        assert sent[b1][-1]['type'] == sent[a1][-1]['type'] == 'counting'
+        registry.close_all()
+
+    asyncio.run(run())
+
+
+def test_idle_room_is_closed_after_timeout(clock) -> None:
+    async def run() -> None:
+        registry: RoomRegistry[FakeRoom] = RoomRegistry(FakeRoom, 60)
+        room = registry.acquire('r')
+        registry.acquire('r')
+        registry.release('r')
+        clock.now += 120
+        # 还有连接的房间不回收
+        assert await registry.sweep() == 0
+
+        registry.release('r')
+        clock.now += 59
+        assert await registry.sweep() == 0 and room.closed == 0
+        clock.now += 1
+        assert await registry.sweep() == 1
+        assert room.flushed == 1 and room.closed == 1
+        assert len(registry) == 0 and registry._connections == {} and registry._idle_since == {}
+
+        # 多余的 release 不会让计数变为负数，也不会重新创建房间
+        registry.release('r')
+        assert len(registry) == 0
+
+    asyncio.run(run())
+
+
+def test_room_reacquired_before_timeout_survives(clock) -> None:
+    async def run() -> None:
+        registry: RoomRegistry[FakeRoom] = RoomRegistry(FakeRoom, 60)
+        room = registry.acquire('r')
+        registry.release('r')
+        clock.now += 30
+        assert registry.acquire('r') is room
+        clock.now += 60
+        assert await registry.sweep() == 0 and room.closed == 0
+
+        # 再次空闲时从最后一个连接断开起重新计时
+        registry.release('r')
+        clock.now += 30
+        assert await registry.sweep() == 0
+        clock.now += 30
+        assert await registry.sweep() == 1 and room.closed == 1
+
+        # 回收后同一房间号创建新的实例
+        assert registry.acquire('r') is not room
+
+    asyncio.run(run())
+
+
+def test_room_with_detached_sessions_is_kept(clock) -> None:
+    async def run() -> None:
+        registry: RoomRegistry[FakeRoom] = RoomRegistry(FakeRoom, 60)
+        room = registry.acquire('r')
+        registry.release('r')
+        room.detached_count = 1
+        clock.now += 120
+        assert await registry.sweep() == 0 and room.closed == 0
+        room.detached_count = 0
+        assert await registry.sweep() == 1 and room.closed == 1
+
+    asyncio.run(run())
+
+
+def test_close_all_closes_every_room(clock) -> None:
+    registry: RoomRegistry[FakeRoom] = RoomRegistry(FakeRoom, 60)
+    busy, idle = registry.acquire('a'), registry.get('b')
+    registry.close_all()
+    assert busy.closed == idle.closed == 1
+    assert len(registry) == 0 and registry._connections == {} and registry._idle_since == {}
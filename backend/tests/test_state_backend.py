@@ -0,0 +1,98 @@
+import asyncio
+import time
+
+import interview_system
+from event_log import EventLog, log_path
+from rooms import RoomRegistry
+from state_backend import MemoryStateBackend
+
+
+class CountingBackend(MemoryStateBackend):
+    def __init__(self) -> None:
+        super().__init__()
+        self.saves = 0
+
+    def save_encoded(self, room_id: str, raw: str) -> None:
+        self.saves += 1
+        super().save_encoded(room_id, raw)
+
+
+def test_state_writes_are_throttled_and_coalesced() -> None:
+    backend = CountingBackend()
+
+    async def run() -> None:
+        system = interview_system.InterviewSystem('r', state_backend=backend, state_interval=0.05)
+        lane = system.lanes[0]
+        for i in range(10):
+            lane.hints[i] = True
+            system.mark_state()
+        await asyncio.sleep(0)
+        assert backend.saves == 0
+        await asyncio.sleep(0.2)
+        assert backend.saves == 1
+        assert len(backend.load('r')['lanes'][0]['hints']) == 10
+
+        # 回收房间时写入尚未保存的变化
+        lane.hints.clear()
+        system.mark_state()
+        system.close()
+        assert backend.saves == 2
+        assert backend.load('r')['lanes'][0]['hints'] == {}
+
+    asyncio.run(run())
+
+
+class SlowBackend(CountingBackend):
+    def __init__(self, delay: float) -> None:
+        super().__init__()
+        self.delay = delay
+
+    def save_encoded(self, room_id: str, raw: str) -> None:
+        time.sleep(self.delay)
+        super().save_encoded(room_id, raw)
+
+
+def test_sweep_writes_state_without_blocking_the_loop(tmp_path) -> None:
+    backend = SlowBackend(0.2)
+
+    def create(room_id: str) -> interview_system.InterviewSystem:
+        return interview_system.InterviewSystem(
+            room_id, state_backend=backend, state_interval=60,
+            event_log=EventLog(log_path(str(tmp_path), room_id)),
+        )
+
+    async def run() -> None:
+        registry: RoomRegistry[interview_system.InterviewSystem] = RoomRegistry(create, 0)
+        system = registry.acquire('r')
+        system.lanes[0].hints[0] = True
+        system.mark_state()
+        registry.release('r')
+
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        # 写入状态期间事件循环照常运行，写完后房间被回收
+        assert await registry.sweep() == 1
+        ticker.cancel()
+        assert ticks >= 5
+        assert backend.saves == 1 and backend.load('r')['lanes'][0]['hints'] == {'0': True}
+        assert system.event_log is None and len(registry) == 0
+
+        # 写入期间有新连接进入的房间不被回收
+        system = registry.acquire('r2')
+        system.mark_state()
+        registry.release('r2')
+        sweep = asyncio.create_task(registry.sweep())
+        await asyncio.sleep(0.05)
+        assert registry.acquire('r2') is system
+        assert await sweep == 0
+        assert registry.get('r2') is system and system.event_log is not None
+        registry.close_all()
+
+    asyncio.run(run())
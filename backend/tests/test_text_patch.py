@@ -0,0 +1,76 @@
+import asyncio
+from typing import Any
+
+import pytest
+
+import interview_system
+from candidates import Candidate
+from text_patch import apply_patch
+
+
+def test_insert_and_delete() -> None:
+    assert apply_patch('', [[0, 0, '回答正确']]) == '回答正确'
+    assert apply_patch('回答正确', [[2, 2, '基本'], [0, 2, '']]) == '基本正确'
+
+
+def test_offsets_count_code_points() -> None:
+    # 表情符号在 UTF-16 中占两个单位，这里按一个码点计
+    text = apply_patch('思路😀清晰', [[3, 3, '👍']])
+    assert text == '思路😀👍清晰'
+    assert apply_patch(text, [[2, 4, ''], [len('思路清晰'), len('思路清晰'), '，代码规范']]) == '思路清晰，代码规范'
+
+
+@pytest.mark.parametrize('ops', [
+    [[3, 2, '']],
+    [[0, 5, '']],
+    [[-1, 0, 'x']],
+    [[0, 0, 'x'], [6, 6, 'y']],
+    [[0, 0]],
+    [[0, 0, 1]],
+    [[True, 0, 'x']],
+    'abc',
+])
+def test_invalid_ops_raise(ops: Any) -> None:
+    with pytest.raises(ValueError):
+        apply_patch('abcd', ops)
+
+
+def test_length_limit() -> None:
+    with pytest.raises(ValueError):
+        apply_patch('ab', [[2, 2, 'cd']], limit=3)
+    assert apply_patch('ab', [[1, 2, 'cd']], limit=3) == 'acd'
+
+
+class FakeConnection:
+    def __init__(self, id: str) -> None:
+        self.id = id
+
+
+def test_stale_version_gets_comment_sync(monkeypatch) -> None:
+    sent: list[dict[str, Any]] = []
+    monkeypatch.setattr(interview_system, 'send_payload', lambda websocket, payload, droppable=True: sent.append(payload))
+
+    async def run() -> None:
+        system = interview_system.InterviewSystem()
+        lane = system.lanes[0]
+        websocket: Any = FakeConnection('interviewer')
+        lane.candidate = Candidate('c1', 'token', FakeConnection('c1'), 0.0)  # type: ignore[arg-type]
+        lane.reset(lane.bank, [0, 1])
+        lane.set_comment(0, '原有评语')
+
+        # 面试官持有的版本落后于服务端，补丁不应用，回复服务端的完整评语
+        assert system.patch_comment(websocket, lane, {
+            'type': 'comment_patch', 'question': 0, 'version': 0, 'ops': [[0, 0, '新']],
+        })
+        assert sent[-1] == {'type': 'comment_sync', 'question': 0, 'version': 1, 'comment': '原有评语'}
+        assert lane.comments[0] == '原有评语'
+
+        # 按同步后的版本编辑则正常应用
+        assert system.patch_comment(websocket, lane, {
+            'type': 'comment_patch', 'question': 0, 'version': 1, 'ops': [[4, 4, '，很好']],
+        })
+        assert sent[-1] == {'type': 'comment_ack', 'question': 0, 'version': 2}
+        assert lane.comments[0] == '原有评语，很好'
+        system.close()
+
+    asyncio.run(run())
@@ -0,0 +1,44 @@
+from typing import Any
+
+
+# 评语的最大长度（字符数），超出的补丁会被拒绝
+MAX_COMMENT_LENGTH = 10000
+
+# 一个补丁最多包含的编辑操作数
+MAX_PATCH_OPS = 64
+
+
+def apply_patch(text: str, ops: Any, limit: int = MAX_COMMENT_LENGTH) -> str:
+    """
+    将文本补丁应用到 text 上。
+
+    补丁是编辑操作的列表，每个操作为 [start, end, insert]：把 text[start:end] 替换为 insert。
+    偏移量以 Unicode 码点计（前端用 Array.from 拆分字符串即可得到相同的下标），
+    多个操作依次应用，后一个操作的偏移量基于前一个操作之后的文本。
+    例如在末尾追加为 [[len, len, "追加的内容"]]，删除前两个字为 [[0, 2, ""]]。
+
+    Args:
+        text (str): 原文本。
+        ops (Any): 客户端发来的补丁，未经检查。
+        limit (int): 应用后文本的最大长度。
+
+    Returns:
+        str: 应用补丁后的文本。
+
+    Raises:
+        ValueError: 补丁格式错误、偏移量越界或结果超出长度限制。
+    """
+    if not isinstance(ops, list) or len(ops) > MAX_PATCH_OPS:
+        raise ValueError(f"补丁必须是不超过 {MAX_PATCH_OPS} 个编辑操作的列表")
+    for op in ops:
+        if not isinstance(op, list) or len(op) != 3:
+            raise ValueError(f"无效的编辑操作: {op!r}")
+        start, end, insert = op
+        if type(start) is not int or type(end) is not int or not isinstance(insert, str):
+            raise ValueError(f"无效的编辑操作: {op!r}")
+        if not 0 <= start <= end <= len(text):
+            raise ValueError(f"编辑操作越界: {op!r}，文本长度 {len(text)}")
+        if len(text) - (end - start) + len(insert) > limit:
+            raise ValueError(f"应用补丁后文本超过 {limit} 个字符")
+        text = text[:start] + insert + text[end:]
+    return text
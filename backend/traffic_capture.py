@@ -0,0 +1,154 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import time
+from typing import Any, Iterator, Optional
+
+from websockets.asyncio.server import ServerConnection
+
+from codec import Frame
+
+
+logger = logging.getLogger(__name__)
+
+# 跟踪文件的格式版本；版本 2 起旁观者连接的角色记录为 'observer'
+TRACE_VERSION = 2
+
+# 写入缓冲区的大小，以及缓冲内容最迟多久写入文件（秒）
+CAPTURE_BUFFER_SIZE = 1 << 20
+CAPTURE_FLUSH_INTERVAL = 1.0
+
+
+class TrafficCapture:
+    """
+    将服务收到的每一帧客户端消息记录到跟踪文件，用于复现线上问题和在真实流量上做基准测试。
+
+    跟踪文件为 JSON Lines 格式，第一行是文件头，其后每行一条记录：
+    - {"trace": 1, "started": <Unix 时间戳>, "pid": <进程号>}
+    - {"t": <秒>, "c": <连接序号>, "k": "open", "role": "interviewee" | "interviewer" | "observer",
+       "room": <房间号>, "path": <请求路径>, "proto": <子协议>, "token": <恢复令牌>}
+    - {"t": <秒>, "c": <连接序号>, "m": <文本帧>} 或 {"t": ..., "c": ..., "b": <Base64 二进制帧>}
+    - {"t": <秒>, "c": <连接序号>, "k": "close"}
+
+    t 为相对文件头 started 的单调时钟秒数；连接在文件内用递增的小整数编号，
+    open 记录同时保存连接ID。记录先写入内存缓冲区，最迟 CAPTURE_FLUSH_INTERVAL 秒后写入文件。
+    跟踪文件包含面试官的评语和面试者的恢复令牌，应按面试数据同等保管。
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): 跟踪文件路径，已存在时覆盖。
+        """
+        self.path = path
+        self._started = time.monotonic()
+        self._ids: dict[ServerConnection, int] = {}
+        self._next_id = 0
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self.records = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'w', encoding='utf-8', buffering=CAPTURE_BUFFER_SIZE)
+        self._write({'trace': TRACE_VERSION, 'started': time.time(), 'pid': os.getpid()})
+        logger.info(f"开始记录流量到 {path}")
+
+    def _write(self, record: dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        if self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(
+                CAPTURE_FLUSH_INTERVAL, self.flush
+            )
+
+    def _record(self, websocket: ServerConnection, **fields: Any) -> None:
+        id = self._ids.get(websocket)
+        if id is None:
+            id = self._ids[websocket] = self._next_id
+            self._next_id += 1
+        self.records += 1
+        self._write({'t': round(time.monotonic() - self._started, 6), 'c': id, **fields})
+
+    def opened(
+        self, websocket: ServerConnection, role: str, room_id: str, token: Optional[str] = None
+    ) -> None:
+        """
+        记录新连接。
+
+        Args:
+            websocket (ServerConnection): 新连接。
+            role (str): 'interviewee'、'interviewer' 或 'observer'。
+            room_id (str): 房间号。
+            token (str): 面试者会话的恢复令牌，回放时用于改写重连请求中的令牌。
+        """
+        self._record(
+            websocket, k='open', role=role, room=room_id, path=websocket.request.path,
+            proto=websocket.subprotocol, id=str(websocket.id), token=token,
+        )
+
+    def frame(self, websocket: ServerConnection, message: Frame) -> None:
+        """
+        记录连接收到的一帧消息，在任何检查和解码之前调用。
+        """
+        if isinstance(message, str):
+            self._record(websocket, m=message)
+        else:
+            self._record(websocket, b=base64.b64encode(message).decode('ascii'))
+
+    def closed(self, websocket: ServerConnection) -> None:
+        if websocket not in self._ids:
+            # 连接在记录打开之前就已出错，没有任何记录
+            return
+        self._record(websocket, k='close')
+        self._ids.pop(websocket, None)
+
+    def flush(self) -> None:
+        self._flush_timer = None
+        try:
+            self._file.flush()
+        except OSError as e:
+            logger.error(f"写入跟踪文件 {self.path} 出错: {e}")
+
+    def close(self) -> None:
+        """
+        写入缓冲区中的记录并关闭跟踪文件。
+        """
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        self._file.close()
+        logger.info(f"流量记录已写入 {self.path}，共 {self.records} 条")
+
+
+def read_trace(path: str) -> tuple[dict[str, Any], Iterator[dict[str, Any]]]:
+    """
+    读取跟踪文件。
+
+    Returns:
+        tuple: 文件头和按时间顺序排列的记录迭代器；二进制帧的 b 字段已解码为 bytes。
+            进程崩溃时写了一半的最后一行会被忽略。
+
+    Raises:
+        ValueError: 文件不是支持的跟踪文件。
+    """
+    f = open(path, 'r', encoding='utf-8')
+    try:
+        header = json.loads(f.readline())
+    except json.JSONDecodeError:
+        header = None
+    if not isinstance(header, dict) or header.get('trace') != TRACE_VERSION:
+        f.close()
+        raise ValueError(f"{path} 不是版本 {TRACE_VERSION} 的跟踪文件")
+
+    def records() -> Iterator[dict[str, Any]]:
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"跟踪文件 {path} 的最后一行不完整，已忽略")
+                    return
+                if 'b' in record:
+                    record['b'] = base64.b64decode(record['b'])
+                yield record
+
+    return header, records()
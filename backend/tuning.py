@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+from typing import Any, Callable, Coroutine, Literal
+
+try:
+    import tomllib
+except ImportError:  # Python 3.10 没有 tomllib，只能使用JSON配置文件
+    tomllib = None  # type: ignore[assignment]
+
+try:
+    import uvloop
+except ImportError:  # 未安装时只能使用 asyncio 自带的事件循环
+    uvloop = None  # type: ignore[assignment]
+
+from websockets.asyncio.server import ServerConnection
+
+
+logger = logging.getLogger(__name__)
+
+# 事件循环实现：'auto' 在安装了 uvloop 时使用 uvloop，否则使用 asyncio 自带的事件循环
+EventLoopType = Literal['auto', 'asyncio', 'uvloop']
+EVENT_LOOPS: tuple[EventLoopType, ...] = ('auto', 'asyncio', 'uvloop')
+
+
+def load_config(path: str) -> dict[str, Any]:
+    """
+    读取配置文件，按扩展名解析为 TOML（.toml）或 JSON。
+    配置项与启动参数同名，参数名中的 '-' 可以写作 '_'，例如 max_connections = 5000。
+
+    Raises:
+        OSError: 文件无法读取。
+        ValueError: 文件内容不合法。
+    """
+    if path.endswith('.toml'):
+        if tomllib is None:
+            raise ValueError("读取 TOML 配置文件需要 Python 3.11 或更高版本，请改用JSON配置文件")
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("配置文件的顶层必须是键值对")
+    return {key.replace('-', '_'): value for key, value in data.items()}
+
+
+def apply_config(parser: argparse.ArgumentParser, path: str) -> None:
+    """
+    将配置文件中的值设为启动参数的默认值，命令行中显式给出的参数优先。
+
+    配置项的值按对应参数的类型和可选值检查，未知的配置项视为错误。
+    """
+    try:
+        config = load_config(path)
+    except (OSError, ValueError) as e:
+        parser.error(f"无法读取配置文件 {path}: {e}")
+
+    # 把配置项转换成等价的命令行参数交给 parser 解析，类型和可选值由 argparse 按参数定义检查
+    known = vars(parser.parse_args([]))
+    argv = []
+    defaults = {}
+    for key, value in config.items():
+        if key not in known or key == 'config':
+            parser.error(f"配置文件 {path} 中有未知的配置项: {key}")
+        option = '--' + key.replace('_', '-')
+        if value is None:
+            defaults[key] = None
+        elif isinstance(value, bool):
+            # 开关参数：默认开启的参数用 --no-<name> 关闭，与默认值相同时无需给出
+            if value != known[key]:
+                argv.append(option if value else '--no-' + key.replace('_', '-'))
+        elif isinstance(value, (str, int, float)):
+            argv += [option, str(value)]
+        else:
+            parser.error(f"配置项 {key} 的值不合法: {value!r}")
+    parsed = vars(parser.parse_args(argv))
+    for key in config:
+        defaults.setdefault(key, parsed[key])
+    parser.set_defaults(**defaults)
+
+
+def event_loop_runner(kind: EventLoopType) -> Callable[[Coroutine[Any, Any, Any]], Any]:
+    """
+    按设置选择事件循环，返回用于运行入口协程的函数（代替 asyncio.run）。
+
+    Raises:
+        RuntimeError: 指定了 uvloop 但没有安装。
+    """
+    if kind == 'uvloop' and uvloop is None:
+        raise RuntimeError("未安装 uvloop，请先 pip install uvloop")
+    if kind == 'asyncio' or uvloop is None:
+        return asyncio.run
+    return uvloop.run
+
+
+def loop_name() -> str:
+    """
+    当前事件循环的实现名称。
+    """
+    loop = asyncio.get_running_loop()
+    return f'{type(loop).__module__}.{type(loop).__name__}'
+
+
+def tune_socket(websocket: ServerConnection, nodelay: bool) -> None:
+    """
+    设置连接的套接字选项。asyncio 和 uvloop 默认都会开启 TCP_NODELAY，
+    关闭后小消息会由内核合并发送，减少包数量但增加延迟。
+    """
+    if nodelay or websocket.transport is None:
+        return
+    sock = websocket.transport.get_extra_info('socket')
+    if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 0)
+        except OSError as e:
+            logger.debug(f"设置套接字选项失败: {e}")
+
+
+def reuse_port_supported() -> bool:
+    return hasattr(socket, 'SO_REUSEPORT') and os.name != 'nt'
@@ -2,8 +2,8 @@ import QuestionPreparing from './QuestionViews/QuestionPreparing.vue'
 import QuestionCounting from './QuestionViews/QuestionCounting.vue'
 import QuestionInterviewing from './QuestionViews/QuestionInterviewing.vue'
 import QuestionFinished from './QuestionViews/QuestionFinished.vue'
-import { getSocket } from '@/socket'
-import { COUNTDOWN_TOTAL_TIME } from '@/constants'
+import { getSocket, setResumeToken, clearResumeToken } from '@/socket'
+import { COUNTDOWN_TOTAL_TIME, RECONNECT_MAX_DELAY } from '@/constants'
 
 import { defineComponent } from 'vue'
 
@@ -12,14 +12,19 @@ export default defineComponent({
   data() {
     return {
       connectionStatus: 'connecting' as 'connecting' | 'connected' | 'error',
-      mode: '' as '' | 'preparing' | 'waiting' | 'counting' | 'interviewing' | 'finished',
+      mode: '' as '' | 'preparing' | 'waiting' | 'booked' | 'counting' | 'interviewing' | 'finished',
       queueCount: 0,
+      estimatedStart: 0,
+      reconnectAt: 0,
       queueQuestionCount: 0,
       questionTitles: [],
       currentQuestion: -1,
       countdown: -1,
       countdownTimer: null as null | number,
       questionHint: '' as string,
+      reconnectDelay: 500,
+      reconnectTimer: null as null | number,
+      reconnectHint: null as null | number,
     }
   },
   computed: {
@@ -34,95 +39,138 @@ export default defineComponent({
     QuestionFinished,
   },
   mounted() {
-    const socket = getSocket()
-
-    socket.onopen = () => {
-      console.log('WebSocket 已连接')
-      this.connectionStatus = 'connected'
-    }
+    this.connect()
+  },
+  methods: {
+    connect() {
+      const socket = getSocket()
 
-    socket.onmessage = (event) => {
-      try {
-        const data = JSON.parse(event.data)
+      socket.onopen = () => {
+        console.log('WebSocket 已连接')
+        this.connectionStatus = 'connected'
+        this.reconnectDelay = 500
+      }
 
-        if (data.type === '') {
-          this.mode = ''
-        } else if (
-          data.type === 'preparing' &&
-          Array.isArray(data.questionTitles) &&
-          typeof data.queueCount === 'number' &&
-          typeof data.queueQuestionCount === 'number'
-        ) {
-          this.mode = 'preparing'
-          this.questionTitles = data.questionTitles
-          this.queueCount = data.queueCount
-          this.queueQuestionCount = data.queueQuestionCount
-        } else if (
-          data.type === 'waiting' &&
-          Array.isArray(data.questionTitles) &&
-          typeof data.queueCount === 'number' &&
-          typeof data.queueQuestionCount === 'number'
-        ) {
-          this.mode = 'waiting'
-          this.questionTitles = data.questionTitles
-          this.queueCount = data.queueCount
-          this.queueQuestionCount = data.queueQuestionCount
-        } else if (data.type === 'counting') {
-          if (this.mode !== 'counting') {
-            this.mode = 'counting'
-            this.countdown = COUNTDOWN_TOTAL_TIME
+      socket.onmessage = (event) => {
+        try {
+          const data = JSON.parse(event.data)
 
-            if (this.countdownTimer) {
-              clearInterval(this.countdownTimer)
+          if (data.type === 'session' && typeof data.token === 'string') {
+            // 新会话：保存恢复令牌，断线重连时凭它找回原来的位置
+            setResumeToken(data.token)
+          } else if (data.type === '') {
+            this.mode = ''
+          } else if (data.type === 'preparing' || data.type === 'waiting') {
+            // 排队视图为增量消息：只包含发生变化的字段
+            this.mode = data.type
+            if (Array.isArray(data.questionTitles)) {
+              this.questionTitles = data.questionTitles
+            }
+            if (typeof data.queueCount === 'number') {
+              this.queueCount = data.queueCount
+            }
+            if (typeof data.queueQuestionCount === 'number') {
+              this.queueQuestionCount = data.queueQuestionCount
             }
+            if (typeof data.estimatedStart === 'number') {
+              this.estimatedStart = data.estimatedStart
+            }
+          } else if (data.type === 'booked') {
+            // 预约成功：断开连接，在预计开始时间之前重新连接，排队位置由服务器保留
+            this.mode = 'booked'
+            this.estimatedStart = data.estimatedStart
+            this.reconnectAt = data.reconnectAt
+            socket.close(1000)
+          } else if (data.type === 'reconnect' && typeof data.after === 'number') {
+            // 服务重启：按服务端分配的时间重连，避免所有面试者同时重连
+            this.reconnectHint = data.after * 1000
+          } else if (data.type === 'counting') {
+            // 断线期间倒计时已被清除，重连后收到快照时重新开始倒计时
+            if (this.mode !== 'counting' || this.countdownTimer === null) {
+              this.mode = 'counting'
+              this.countdown = COUNTDOWN_TOTAL_TIME
 
-            this.countdownTimer = window.setInterval(() => {
-              if (this.countdown > 0) {
-                this.countdown--
-              } else {
-                clearInterval(this.countdownTimer!)
-                this.countdownTimer = null
-                socket.send(JSON.stringify({ type: 'start' }))
+              if (this.countdownTimer) {
+                clearInterval(this.countdownTimer)
               }
-            }, 1000)
+
+              this.countdownTimer = window.setInterval(() => {
+                if (this.countdown > 0) {
+                  this.countdown--
+                } else {
+                  clearInterval(this.countdownTimer!)
+                  this.countdownTimer = null
+                  getSocket().send(JSON.stringify({ type: 'start' }))
+                }
+              }, 1000)
+            }
+          } else if (
+            data.type === 'interviewing' &&
+            typeof data.currentQuestion === 'number' &&
+            typeof data.questionHint == 'string' &&
+            Array.isArray(data.questionTitles)
+          ) {
+            this.mode = 'interviewing'
+            this.currentQuestion = data.currentQuestion
+            this.questionHint = data.questionHint
+            this.questionTitles = data.questionTitles
+          } else if (data.type === 'finish') {
+            clearResumeToken()
+            this.mode = 'finished'
+            this.currentQuestion = this.questionTitles.length
+          } else {
+            console.warn('未知数据格式', data)
           }
-        } else if (
-          data.type === 'interviewing' &&
-          typeof data.currentQuestion === 'number' &&
-          typeof data.questionHint == 'string' &&
-          Array.isArray(data.questionTitles)
-        ) {
-          this.mode = 'interviewing'
-          this.currentQuestion = data.currentQuestion
-          this.questionHint = data.questionHint
-          this.questionTitles = data.questionTitles
-        } else if (data.type === 'finish') {
-          this.mode = 'finished'
-          this.currentQuestion = this.questionTitles.length
-        } else {
-          console.warn('未知数据格式', data)
+        } catch (e) {
+          console.error('接收到非JSON格式数据:', event.data)
         }
-      } catch (e) {
-        console.error('接收到非JSON格式数据:', event.data)
       }
-    }
 
-    socket.onerror = (error) => {
-      console.error('WebSocket 错误:', error)
-    }
+      socket.onerror = (error) => {
+        console.error('WebSocket 错误:', error)
+      }
 
-    socket.onclose = () => {
-      this.connectionStatus = 'error'
-      if (this.countdownTimer) {
-        clearInterval(this.countdownTimer)
-        this.countdownTimer = null
+      socket.onclose = (event) => {
+        if (this.mode === 'booked') {
+          this.reconnectTimer = window.setTimeout(() => {
+            this.reconnectTimer = null
+            this.connectionStatus = 'connecting'
+            this.connect()
+          }, Math.max(this.reconnectAt * 1000 - Date.now(), 0))
+          return
+        }
+        this.connectionStatus = 'error'
+        if (this.countdownTimer) {
+          clearInterval(this.countdownTimer)
+          this.countdownTimer = null
+        }
+        // 面试已结束，或会话已在其他页面恢复时不再重连
+        if (this.mode === 'finished' || event.code === 4001) {
+          return
+        }
+        let delay = this.reconnectDelay
+        if (this.reconnectHint !== null) {
+          delay = this.reconnectHint
+          this.reconnectHint = null
+        } else {
+          this.reconnectDelay = Math.min(this.reconnectDelay * 2, RECONNECT_MAX_DELAY)
+        }
+        this.reconnectTimer = window.setTimeout(() => {
+          this.reconnectTimer = null
+          this.connectionStatus = 'connecting'
+          this.connect()
+        }, delay)
       }
-    }
+    },
   },
   beforeUnmount() {
     if (this.countdownTimer) {
       clearInterval(this.countdownTimer)
       this.countdownTimer = null
     }
+    if (this.reconnectTimer) {
+      clearTimeout(this.reconnectTimer)
+      this.reconnectTimer = null
+    }
   },
 })
@@ -1,2 +1,3 @@
 export let COUNTDOWN_TOTAL_TIME = 5
 export let INTERVIEWEE_PORT = '9009'
+export let RECONNECT_MAX_DELAY = 10000
@@ -2,11 +2,31 @@ import { INTERVIEWEE_PORT } from '@/constants'
 
 let socket: WebSocket | null = null
 
+// 通过 ?room=xxx 指定面试房间，缺省时进入默认房间
+function getRoom(): string {
+  return new URLSearchParams(window.location.search).get('room') ?? ''
+}
+
+// 恢复令牌按房间保存在 sessionStorage 中，刷新页面或断线重连后凭令牌找回排队位置
+function tokenKey(): string {
+  return `ezinterview-resume-token:${getRoom()}`
+}
+
+export function setResumeToken(token: string): void {
+  sessionStorage.setItem(tokenKey(), token)
+}
+
+export function clearResumeToken(): void {
+  sessionStorage.removeItem(tokenKey())
+}
+
 export function getSocket(): WebSocket {
   if (!socket || socket.readyState === WebSocket.CLOSED) {
     const host = window.location.hostname
     const port = INTERVIEWEE_PORT
-    socket = new WebSocket(`ws://${host}:${port}/`)
+    const token = sessionStorage.getItem(tokenKey())
+    const query = token ? `?token=${encodeURIComponent(token)}` : ''
+    socket = new WebSocket(`ws://${host}:${port}/${encodeURIComponent(getRoom())}${query}`)
   }
   return socket
 }
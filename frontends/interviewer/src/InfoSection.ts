@@ -4,6 +4,7 @@ import {
   getAvailableQuestions,
   getQuestionMains,
   getRealCurrentQuestion,
+  isObserver,
 } from '@/socket'
 
 interface Student {
@@ -29,6 +30,7 @@ export default defineComponent({
   },
   methods: {
     sendChange() {
+      if (isObserver()) return
       socket.send(JSON.stringify({ type: 'select', selection: this.availableQuestions }))
     },
   },
@@ -42,6 +44,7 @@ export default defineComponent({
       availableQuestions,
       questionMains,
       realCurrentQuestion,
+      observer: isObserver(),
     }
   },
 })
@@ -6,7 +6,10 @@ import {
   getSocket,
   getAvailableQuestions,
   getQuestionMains,
+  getComment,
+  getRealCurrentQuestion,
   setAvailableQuestions,
+  setComment,
   setQuestionMains,
   setRealCurrentQuestion,
 } from '@/socket'
@@ -62,14 +65,16 @@ export default defineComponent({
         } else if (
           data.type === 'counting' &&
           Array.isArray(data.questionTitles) &&
-          Array.isArray(data.availableQuestions) &&
-          Array.isArray(data.questionMains)
+          Array.isArray(data.availableQuestions)
         ) {
           this.mode = 'counting'
           this.questionTitles = data.questionTitles
           this.currentQuestion = -1
           setAvailableQuestions(data.availableQuestions)
-          setQuestionMains(data.questionMains)
+          // 题库未变化时服务端不再重复发送 questionMains
+          if (Array.isArray(data.questionMains)) {
+            setQuestionMains(data.questionMains)
+          }
           setRealCurrentQuestion(-1)
         } else if (
           data.type === 'interviewing' &&
@@ -79,9 +84,8 @@ export default defineComponent({
           typeof data.questionHint === 'string' &&
           Array.isArray(data.questionTitles) &&
           (data.rating === null || typeof data.rating === 'number') &&
-          typeof data.comment === 'string' &&
+          typeof data.commentVersion === 'number' &&
           Array.isArray(data.availableQuestions) &&
-          Array.isArray(data.questionMains) &&
           typeof data.realCurrentQuestion === 'number' &&
           typeof data.hint === 'boolean'
         ) {
@@ -92,11 +96,35 @@ export default defineComponent({
           this.questionHint = data.questionHint
           this.questionTitles = data.questionTitles
           this.currentRate = data.rating
-          this.currentComment = data.comment
+          // 面试官已经持有最新评语时服务端不再回传评语正文，沿用本地副本
+          if (typeof data.comment === 'string') {
+            setComment(data.realCurrentQuestion, data.comment, data.commentVersion)
+            this.currentComment = data.comment
+          } else if (data.realCurrentQuestion !== getRealCurrentQuestion().value) {
+            this.currentComment = getComment(data.realCurrentQuestion)
+          }
           setAvailableQuestions(data.availableQuestions)
-          setQuestionMains(data.questionMains)
+          // 题库未变化时服务端不再重复发送 questionMains
+          if (Array.isArray(data.questionMains)) {
+            setQuestionMains(data.questionMains)
+          }
           setRealCurrentQuestion(data.realCurrentQuestion)
           this.showHint = data.hint
+        } else if (data.type === 'reconnect' && typeof data.after === 'number') {
+          // 服务重启：稍后重新加载页面，连接到接管的新进程
+          window.setTimeout(() => window.location.reload(), data.after * 1000)
+        } else if (data.type === 'comment_ack') {
+          // 评语补丁已保存，本地的版本号在发出补丁时已经更新
+        } else if (
+          data.type === 'comment_sync' &&
+          typeof data.question === 'number' &&
+          typeof data.version === 'number' &&
+          typeof data.comment === 'string'
+        ) {
+          setComment(data.question, data.comment, data.version)
+          if (data.question === getRealCurrentQuestion().value) {
+            this.currentComment = data.comment
+          }
         } else {
           console.warn('未知数据格式', data)
         }
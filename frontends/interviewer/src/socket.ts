@@ -4,11 +4,27 @@ import type { Ref } from 'vue'
 
 let socket: WebSocket | null = null
 
+// 通过 ?observe=1 以只读旁观者身份加入，只接收面试状态，不能操作
+const observer = ['1', 'true'].includes(new URLSearchParams(window.location.search).get('observe') ?? '')
+
+export function isObserver(): boolean {
+  return observer
+}
+
 export function getSocket(): WebSocket {
   if (!socket || socket.readyState === WebSocket.CLOSED) {
     const host = window.location.hostname
     const port = INTERVIEWER_PORT
-    socket = new WebSocket(`ws://${host}:${port}/`)
+    // 通过 ?room=xxx 指定面试房间，缺省时进入默认房间
+    const params = new URLSearchParams(window.location.search)
+    const room = params.get('room') ?? ''
+    // 房间有多条面试通道时，通过 ?lane=N 指定通道（从1开始），缺省时进入空闲的通道
+    const query = new URLSearchParams()
+    if (observer) query.set('observe', '1')
+    const lane = params.get('lane')
+    if (lane) query.set('lane', lane)
+    const search = query.toString()
+    socket = new WebSocket(`ws://${host}:${port}/${encodeURIComponent(room)}${search ? '?' + search : ''}`)
   }
   return socket
 }
@@ -42,3 +58,38 @@ export function getShowHint(): Ref<boolean> {
 export function setShowHint(b: boolean): void {
   showHint.value = b
 }
+
+// 每道题评语的本地副本及其版本号；服务端只在版本变化时才在状态帧中附带评语正文
+const comments = new Map<number, { text: string; version: number }>()
+
+export function getComment(question: number): string {
+  return comments.get(question)?.text ?? ''
+}
+export function setComment(question: number, text: string, version: number): void {
+  comments.set(question, { text, version })
+}
+
+// 把评语的修改以增量补丁发给服务端：[start, end, insert] 表示把第 start 到 end 个字符
+// （按码点计，不含 end）替换为 insert。补丁基于本地持有的版本，发出后版本号随即加一，
+// 不必等待服务端确认；版本冲突时服务端会回复 comment_sync，以其中的评语为准
+export function sendCommentPatch(question: number, text: string): void {
+  const entry = comments.get(question) ?? { text: '', version: 0 }
+  if (entry.text === text) return
+  const before = Array.from(entry.text)
+  const after = Array.from(text)
+  let start = 0
+  while (start < before.length && start < after.length && before[start] === after[start]) start++
+  let end = 0
+  while (
+    end < before.length - start &&
+    end < after.length - start &&
+    before[before.length - 1 - end] === after[after.length - 1 - end]
+  ) end++
+  getSocket().send(JSON.stringify({
+    type: 'comment_patch',
+    question,
+    version: entry.version,
+    ops: [[start, before.length - end, after.slice(start, after.length - end).join('')]],
+  }))
+  comments.set(question, { text, version: entry.version + 1 })
+}